@@ -21,7 +21,7 @@ from db_auth import (
     set_department_mapping,
     set_employee_role,
 )
-from auth import lookup_employee
+from auth import lookup_employee, lookup_employees
 from mutations import try_log_mutation
 
 logger = logging.getLogger("acdb-api.admin")
@@ -29,14 +29,23 @@ logger = logging.getLogger("acdb-api.admin")
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
 
-def _enrich_with_hr(role_row: dict) -> RoleAssignmentResponse:
-    """Add name/email from HR portal to a role assignment."""
-    emp = lookup_employee(role_row["employee_id"])
-    return RoleAssignmentResponse(
+def _enrich_with_hr(role_row: dict, emp: Optional[dict] = None) -> RoleAssignmentResponse:
+    """Add name/email from HR portal to a role assignment.
+
+    ``emp`` may be passed pre-fetched (see ``list_roles``) to avoid a
+    per-row HR round-trip.
+
+    Built with ``model_construct``: every field is already a plain str/None
+    from SQLite or HR, and the route's ``response_model`` serialises (and
+    checks) the list once on the way out, so per-row validation is redundant.
+    """
+    if emp is None:
+        emp = lookup_employee(role_row["employee_id"])
+    return RoleAssignmentResponse.model_construct(
         employee_id=role_row["employee_id"],
         cc_role=role_row["cc_role"],
-        assigned_by=role_row.get("assigned_by", ""),
-        assigned_at=role_row.get("assigned_at", ""),
+        assigned_by=role_row.get("assigned_by") or "",
+        assigned_at=role_row.get("assigned_at") or "",
         name=emp.get("name") if emp else None,
         email=emp.get("email") if emp else None,
     )
@@ -46,7 +55,8 @@ def _enrich_with_hr(role_row: dict) -> RoleAssignmentResponse:
 def list_roles(user: CurrentUser = Depends(require_role(CCRole.superadmin))):
     """List all employee CC role assignments, enriched with HR portal names."""
     roles = list_employee_roles()
-    return [_enrich_with_hr(r) for r in roles]
+    emp_map = lookup_employees([r["employee_id"] for r in roles])
+    return [_enrich_with_hr(r, emp_map.get(r["employee_id"].strip(), {})) for r in roles]
 
 
 @router.post("/roles", response_model=RoleAssignmentResponse, status_code=201)
@@ -166,16 +176,8 @@ class EmployeeEmailMapping(BaseModel):
 @router.get("/employee-emails")
 def list_employee_emails(user: CurrentUser = Depends(require_role(CCRole.superadmin))):
     """List all employee_id → email mappings stored locally."""
-    from pr_lookup import get_employee_email
-    import sqlite3, os
-    db_path = os.path.join(os.path.dirname(__file__), "cc_auth.db")
-    try:
-        conn = sqlite3.connect(db_path)
-        rows = conn.execute("SELECT employee_id, email FROM cc_employee_emails ORDER BY employee_id").fetchall()
-        conn.close()
-        return [{"employee_id": r[0], "email": r[1]} for r in rows]
-    except Exception:
-        return []
+    from pr_lookup import list_employee_emails as _list_employee_emails
+    return _list_employee_emails()
 
 
 @router.post("/employee-emails", status_code=201)
@@ -196,11 +198,9 @@ def bulk_set_employee_emails(
     user: CurrentUser = Depends(require_role(CCRole.superadmin)),
 ):
     """Bulk store employee_id → email mappings."""
-    from pr_lookup import set_employee_email
-    results = []
-    for m in mappings:
-        set_employee_email(m.employee_id, m.email)
-        results.append({"employee_id": m.employee_id, "email": m.email.lower().strip()})
+    from pr_lookup import set_employee_emails_bulk
+    set_employee_emails_bulk([(m.employee_id, m.email) for m in mappings])
+    results = [{"employee_id": m.employee_id, "email": m.email.lower().strip()} for m in mappings]
     logger.info("Bulk email mapping: %d entries set by %s", len(results), user.user_id)
     return {"count": len(results), "mappings": results}
 
@@ -277,6 +277,17 @@ def list_pr_departments(
     return get_all_pr_departments()
 
 
+@router.delete("/hr-cache")
+def clear_hr_cache(
+    user: CurrentUser = Depends(require_role(CCRole.superadmin)),
+):
+    """Drop cached HR sign-in lookups (e.g. right after a name/email fix in HR)."""
+    from hr_directory import clear_lookup_cache
+    cleared = clear_lookup_cache()
+    logger.info("HR lookup cache cleared (%d entries) by %s", cleared, user.user_id)
+    return {"cleared": cleared}
+
+
 # ---------------------------------------------------------------------------
 # Monthly staff-PIN broadcast (manual trigger)
 # ---------------------------------------------------------------------------
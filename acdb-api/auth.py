@@ -12,8 +12,13 @@ Customer identity:
   (XXXNNNN) and normalise to NNNNXXX for storage.
 """
 
+import copy
+import functools
+import hmac as _hmac
 import re
 import logging
+import threading
+import time
 from datetime import datetime
 from typing import Optional
 
@@ -36,12 +41,15 @@ from models import (
 )
 from middleware import create_token, get_current_user, require_employee
 from middleware import security as _verify_security
+from db_errors import PoolExhausted
 from db_auth import (
     customer_is_registered,
+    get_customer_credentials,
     get_customer_password_hash,
     get_employee_role,
     get_whats_new_seen,
     mark_whats_new_seen,
+    set_customer_display_name,
     set_customer_password,
 )
 from mutations import try_log_mutation
@@ -67,16 +75,24 @@ def lookup_employee(employee_id: str) -> Optional[dict]:
     return lookup_employee_minimal(employee_id)
 
 
+def lookup_employees(employee_ids: list[str]) -> dict[str, dict]:
+    """Bulk ``lookup_employee``: ``{employee_id: record}`` for the ids HR knows."""
+    from hr_directory import lookup_employees_minimal
+    return lookup_employees_minimal(employee_ids)
+
+
 # ---------------------------------------------------------------------------
 # Date-based password (monthly staff PIN, defense-in-depth on top of HR auth)
 # ---------------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=4)
 def date_password_for(year: int, month: int) -> str:
     """Return the staff PIN for an arbitrary ``(year, month)``.
 
     Formula: ``int(YYYYMM) / int(reverse(YYYYMM))``, take the first 4
     significant digits. Pure function -- exposed so we can compute next
-    month's PIN for the broadcast and unit-test fixed values.
+    month's PIN for the broadcast and unit-test fixed values. Memoised: the
+    result only changes once a month, so logins reuse it.
     """
     yyyymm = f"{year:04d}{month:02d}"
     reversed_str = yyyymm[::-1]
@@ -188,7 +204,7 @@ def employee_login(req: EmployeeLoginRequest):
     # gate on top of HR-portal validation; rotates at 00:00 UTC on the 1st of
     # every month, see ``date_password_for``).
     expected_password = generate_date_password()
-    if req.password != expected_password:
+    if not _hmac.compare_digest(req.password.encode(), expected_password.encode()):
         # If we're in the first week of a month, the most likely cause is
         # that the PIN just rotated and the staff member is still using last
         # month's value. Surface the actionable hint -- without leaking the
@@ -211,6 +227,9 @@ def employee_login(req: EmployeeLoginRequest):
     # not a per-user secret, so an unknown employee_id must NOT get a session.
     # CC_ALLOW_LOGIN_WITHOUT_HR=true restores the old HR-outage grace
     # (any ID + PIN) as an explicit, temporary operator decision.
+    # The directory pull the role mapping needs runs alongside /lookup.
+    from hr_directory import prefetch_directory
+    prefetch_directory()
     emp = lookup_employee(req.employee_id)
     if not emp:
         import os as _os
@@ -401,6 +420,13 @@ def normalize_account_number(raw: str) -> str:
       mak0045  -> 0045MAK  (case-insensitive)
     """
     raw = raw.strip()
+    # Fast path for the 7-char ASCII forms (every real account number);
+    # the regexes below stay as the general fallback.
+    if len(raw) == 7 and raw.isascii():
+        if raw[:4].isdigit() and raw[4:].isalpha():
+            return raw[:4] + raw[4:].upper()
+        if raw[:3].isalpha() and raw[3:].isdigit():
+            return raw[3:] + raw[:3].upper()
     m = _RE_DB_FMT.match(raw)
     if m:
         return m.group(1) + m.group(2).upper()
@@ -415,6 +441,29 @@ def normalize_account_number(raw: str) -> str:
 # Customer login & registration
 # ---------------------------------------------------------------------------
 
+# bcrypt work factor for new hashes (existing hashes carry their own cost, so
+# changing this never breaks logins). Lower only for local dev.
+BCRYPT_COST = min(max(int(os.environ.get("BCRYPT_COST", "12")), 4), 31)
+
+
+def _hash_password(password: str) -> str:
+    """bcrypt-hash a password with a fresh salt at ``BCRYPT_COST``.
+
+    The customer routes are sync ``def`` so this runs in FastAPI's threadpool,
+    and bcrypt releases the GIL while hashing -- concurrent logins don't
+    serialise on it or stall the event loop."""
+    return _bcrypt.hashpw(password.encode(), _bcrypt.gensalt(rounds=BCRYPT_COST)).decode()
+
+
+def _verify_password(password: str, stored_hash: str) -> bool:
+    """Check a password against a stored bcrypt hash (False on a malformed hash)."""
+    try:
+        return _bcrypt.checkpw(password.encode(), stored_hash.encode())
+    except ValueError:
+        logger.warning("Malformed bcrypt hash in cc_customer_passwords")
+        return False
+
+
 def _validate_customer_exists(customer_id: str) -> dict:
     """Check that a customer_id exists in the customers table. Returns customer data or raises 404."""
     from customer_api import get_connection, _row_to_dict, _normalize_customer
@@ -427,74 +476,130 @@ def _validate_customer_exists(customer_id: str) -> dict:
             if not row:
                 raise HTTPException(status_code=404, detail=f"Customer ID '{customer_id}' not found")
             return _normalize_customer(_row_to_dict(cursor, row))
-    except HTTPException:
+    except (HTTPException, PoolExhausted):
         raise
     except Exception as e:
         logger.error("Customer lookup for %s failed: %s", customer_id, e)
         raise HTTPException(status_code=500, detail="Database error during customer validation")
 
 
+# Short-lived cache of successful account lookups. /auth/me and customer
+# login resolve the same account over and over; a customer's name/record
+# changes rarely, and registration drops the entry explicitly. Misses (404)
+# are never cached so a newly onboarded account is visible immediately.
+ACCOUNT_CACHE_TTL = float(os.environ.get("CC_ACCOUNT_CACHE_TTL", "300"))
+_ACCOUNT_CACHE_MAX = 10_000
+_account_cache: dict[str, tuple[float, dict]] = {}
+_account_cache_lock = threading.Lock()
+
+
+def invalidate_account_cache(account_number: Optional[str] = None) -> None:
+    """Drop one account's cached lookup (or all of them when called bare)."""
+    with _account_cache_lock:
+        if account_number is None:
+            _account_cache.clear()
+        else:
+            _account_cache.pop(normalize_account_number(account_number), None)
+
+
 def _validate_account_exists(account_number: str) -> dict:
     """
     Validate that an account number exists in the database.
-    Returns a dict with account_number, customer_id (if found), and name.
+    Returns a dict with account_number, customer_id (if found), and name
+    ("" when no customer record with a first/last name is linked).
+    Successful lookups are cached for ``ACCOUNT_CACHE_TTL`` seconds.
     """
-    from customer_api import get_connection, _row_to_dict, _normalize_customer
-
     acct = normalize_account_number(account_number)
+    now = time.time()
+    with _account_cache_lock:
+        hit = _account_cache.get(acct)
+    if hit is not None and hit[0] > now:
+        return copy.deepcopy(hit[1])
+
+    result = _lookup_account(acct)
+    if ACCOUNT_CACHE_TTL > 0:
+        with _account_cache_lock:
+            if len(_account_cache) >= _ACCOUNT_CACHE_MAX:
+                _account_cache.clear()
+            _account_cache[acct] = (now + ACCOUNT_CACHE_TTL, copy.deepcopy(result))
+    return result
+
+
+# One round-trip: existence (accounts row or any transaction) plus the linked
+# customer record, if there is one. Prepared once per pooled connection so the
+# login / me hot path skips parse + plan on every call. The customer columns
+# are the ones _normalize_customer reads, listed explicitly: with c.* a
+# migration adding a customers column would invalidate every prepared copy.
+_ACCOUNT_LOOKUP_STMT = "cc_lookup_account"
+_ACCOUNT_LOOKUP_CUSTOMER_COLS = (
+    "c.id, c.customer_id_legacy, c.first_name, c.middle_name, c.last_name, "
+    "c.gender, c.phone, c.cell_phone_1, c.cell_phone_2, c.email, "
+    "c.plot_number, c.street_address, c.city, c.district, c.community, "
+    "c.customer_type, c.customer_position, c.date_service_connected, "
+    "c.date_service_terminated, c.payment_status_override, "
+    "c.payment_status_override_by, c.payment_status_override_at"
+)
+_ACCOUNT_LOOKUP_SQL = (
+    "SELECT (a.account_number IS NOT NULL"
+    "        OR EXISTS (SELECT 1 FROM transactions t"
+    "                   WHERE t.account_number = q.acct)) AS _acct_exists,"
+    f"       {_ACCOUNT_LOOKUP_CUSTOMER_COLS} "
+    "FROM (SELECT $1::text AS acct) q "
+    "LEFT JOIN accounts a ON a.account_number = q.acct "
+    "LEFT JOIN customers c ON c.id = a.customer_id "
+    "ORDER BY (c.id IS NULL) LIMIT 1"
+)
+
+
+def _execute_account_lookup(conn, cursor, acct: str) -> None:
+    """EXECUTE the prepared account lookup on ``cursor``, preparing if needed."""
+    from pg_prepared import RETRY_PGCODES, execute_prepared
+
+    try:
+        execute_prepared(conn, cursor, _ACCOUNT_LOOKUP_STMT, _ACCOUNT_LOOKUP_SQL, ("text",), (acct,))
+    except Exception as exc:
+        # The session lost the statement (backend reset) or its plan went
+        # stale (schema change). This is a read on its own connection, so
+        # roll back and retry once; execute_prepared has already forgotten
+        # it and re-prepares (DEALLOCATing a stale copy first).
+        if getattr(exc, "pgcode", None) not in RETRY_PGCODES:
+            raise
+        conn.rollback()
+        execute_prepared(conn, cursor, _ACCOUNT_LOOKUP_STMT, _ACCOUNT_LOOKUP_SQL, ("text",), (acct,))
+
+
+def _lookup_account(acct: str) -> dict:
+    """Uncached body of ``_validate_account_exists`` (``acct`` already normalised)."""
+    from customer_api import get_connection, _row_to_dict, _normalize_customer
 
     try:
         with get_connection() as conn:
             cursor = conn.cursor()
-
-            # Check account exists in transactions or accounts table
-            cursor.execute(
-                "SELECT account_number, meter_id "
-                "FROM transactions WHERE account_number = %s LIMIT 1",
-                (acct,),
-            )
-            row = cursor.fetchone()
-            if not row:
-                # Also try the accounts table
-                cursor.execute(
-                    "SELECT account_number FROM accounts WHERE account_number = %s",
-                    (acct,),
-                )
-                row = cursor.fetchone()
-            if not row:
+            _execute_account_lookup(conn, cursor, acct)
+            row = _row_to_dict(cursor, cursor.fetchone())
+            if not row.pop("_acct_exists", False):
                 raise HTTPException(
                     status_code=404,
                     detail=f"Account '{acct}' not found. "
                            f"Enter your account number as it appears on your payment receipt (e.g. 0045MAK).",
                 )
 
-            result = {"account_number": acct, "customer_id_legacy": None, "name": acct}
+            result = {"account_number": acct, "customer_id_legacy": None, "name": ""}
 
-            # Resolve to a customer record via accounts table
-            try:
-                cursor.execute(
-                    "SELECT c.* FROM accounts a "
-                    "JOIN customers c ON a.customer_id = c.id "
-                    "WHERE a.account_number = %s LIMIT 1",
-                    (acct,),
-                )
-                cust_row = cursor.fetchone()
-                if cust_row:
-                    cust = _normalize_customer(_row_to_dict(cursor, cust_row))
-                    result["customer_id_legacy"] = cust.get("customer_id_legacy")
-                    fname = cust.get("first_name", "")
-                    lname = cust.get("last_name", "")
-                    result["name"] = f"{fname} {lname}".strip() or acct
-                    result["customer"] = cust
-            except Exception as e:
-                logger.debug("Could not resolve account %s to customer: %s", acct, e)
+            if row.get("id") is not None:
+                cust = _normalize_customer(row)
+                result["customer_id_legacy"] = cust.get("customer_id_legacy")
+                fname = cust.get("first_name", "")
+                lname = cust.get("last_name", "")
+                result["name"] = f"{fname} {lname}".strip()
+                result["customer"] = cust
 
             return result
 
-    except HTTPException:
+    except (HTTPException, PoolExhausted):
         raise
     except Exception as e:
-        logger.error("CC database lookup for account %s failed: %s", account_number, e)
+        logger.error("CC database lookup for account %s failed: %s", acct, e)
         raise HTTPException(status_code=500, detail="Database error during account validation")
 
 
@@ -507,22 +612,27 @@ def customer_register(req: CustomerRegisterRequest):
     """
     acct = normalize_account_number(req.customer_id)
 
-    # Check account exists in the CC database
+    # Check account exists in the CC database (fresh read, not the cache --
+    # registration is the moment the customer record matters most)
+    invalidate_account_cache(acct)
     info = _validate_account_exists(acct)
 
     # Check not already registered
     if customer_is_registered(acct):
         raise HTTPException(status_code=409, detail="Account already registered. Use login instead.")
 
-    # Hash and store password (keyed by normalised account number)
-    hashed = _bcrypt.hashpw(req.password.encode(), _bcrypt.gensalt()).decode()
-    set_customer_password(acct, hashed)
+    # Hash and store password (keyed by normalised account number). Only a
+    # real customer name is stored; without one, login keeps looking it up
+    # until the customer record is linked and named.
+    hashed = _hash_password(req.password)
+    set_customer_password(acct, hashed, display_name=info.get("name") or None)
+    name = info.get("name") or acct
     try_log_mutation(
         CurrentUser(
             user_type=UserType.customer,
             user_id=acct,
             role="customer",
-            name=info.get("name", acct),
+            name=name,
         ),
         "password_registered",
         "cc_customer_passwords",
@@ -534,7 +644,7 @@ def customer_register(req: CustomerRegisterRequest):
     return {
         "message": "Registration successful. You can now log in.",
         "customer_id": acct,
-        "name": info.get("name", acct),
+        "name": name,
     }
 
 
@@ -543,27 +653,32 @@ def customer_login(req: CustomerLoginRequest):
     """Customer login with account number + password."""
     acct = normalize_account_number(req.customer_id)
 
-    # Check registered
-    stored_hash = get_customer_password_hash(acct)
-    if not stored_hash:
+    # Check registered (hash and display name come back in one read)
+    creds = get_customer_credentials(acct)
+    if not creds:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Account not registered. Please register first.",
         )
+    stored_hash, name = creds
 
     # Verify password
-    if not _bcrypt.checkpw(req.password.encode(), stored_hash.encode()):
+    if not _verify_password(req.password, stored_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
         )
 
-    # Resolve name
-    try:
-        info = _validate_account_exists(acct)
-        name = info.get("name", acct)
-    except Exception:
-        name = acct
+    # Resolve name -- only accounts registered before display_name was
+    # stored need the customer lookup, and they are backfilled here once.
+    if not name:
+        try:
+            info = _validate_account_exists(acct)
+            name = info.get("name") or acct
+            if info.get("name"):
+                set_customer_display_name(acct, info["name"])
+        except Exception:
+            name = acct
 
     token, expires_in = create_token(
         user_type=UserType.customer.value,
@@ -595,10 +710,10 @@ def customer_change_password(
         raise HTTPException(status_code=403, detail="Only customers can change their password here")
 
     stored_hash = get_customer_password_hash(user.user_id)
-    if not stored_hash or not _bcrypt.checkpw(req.old_password.encode(), stored_hash.encode()):
+    if not stored_hash or not _verify_password(req.old_password, stored_hash):
         raise HTTPException(status_code=401, detail="Current password is incorrect")
 
-    new_hash = _bcrypt.hashpw(req.new_password.encode(), _bcrypt.gensalt()).decode()
+    new_hash = _hash_password(req.new_password)
     set_customer_password(user.user_id, new_hash)
     try_log_mutation(
         user,
@@ -624,8 +739,6 @@ def customer_change_password(
 # server-to-server key from OM_SERVER_API_KEYS (comma-separated env) — the
 # latter keeps CC's own om_tickets.py proxy working. JWT decode only; no DB.
 
-import hmac as _hmac
-
 _OM_SERVER_API_KEYS = [
     k.strip() for k in os.environ.get("OM_SERVER_API_KEYS", "").split(",") if k.strip()
 ]
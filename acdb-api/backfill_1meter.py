@@ -3,23 +3,32 @@
 Backfill prototype 1Meter data from S3 JSON into 1PDB via the API.
 
 Downloads the S3 JSON backup, filters to known meters, downsamples to
-~5-minute intervals, and POSTs each reading to /api/meters/reading.
+~5-minute intervals, and POSTs the readings in batches to
+/api/meters/readings (meters in parallel, each meter's readings in time
+order; falls back to /api/meters/reading per reading on older servers).
 
 Usage:
     python3 backfill_1meter.py                    # dry run
     python3 backfill_1meter.py --execute          # actually POST
     python3 backfill_1meter.py --execute --all    # include unmapped meters (skipped)
+    python3 backfill_1meter.py --execute --workers 4
 """
 
 import argparse
 import json
 import re
 import sys
-import time
+import threading
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
 
 S3_URL = "https://1meterdatacopy.s3.amazonaws.com/1meter_data_s3_copy.json"
 API_URL = "https://cc.1pwrafrica.com/api/meters/reading"
+BATCH_API_URL = "https://cc.1pwrafrica.com/api/meters/readings"
 IOT_KEY = "1pwr-iot-ingest-2026"
 
 KNOWN_METERS = {
@@ -29,6 +38,8 @@ KNOWN_METERS = {
 }
 
 MIN_INTERVAL_MINUTES = 5
+DEFAULT_WORKERS = 8
+BATCH_SIZE = 100  # server caps at 500
 
 
 def strip_units(val, default=0.0):
@@ -41,42 +52,82 @@ def strip_units(val, default=0.0):
         return float(m.group()) if m else default
 
 
-def download_s3_data():
+def download_s3_data(meter_filter=None):
+    """Fetch the S3 backup, keeping only records whose meterId is in
+    *meter_filter* (all records when None).
+
+    With ``ijson`` installed the array is stream-parsed straight off the
+    socket and filtered as it goes, so only the wanted records are ever
+    materialised; otherwise falls back to a one-shot ``json.load``.
+    """
     print(f"Downloading {S3_URL} ...")
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+
+    total = 0
+    kept = []
     with urllib.request.urlopen(S3_URL, timeout=60) as resp:
-        data = json.loads(resp.read())
-    print(f"  {len(data)} total records")
-    return data
+        items = ijson.items(resp, "item", use_float=True) if ijson else json.load(resp)
+        for r in items:
+            total += 1
+            if meter_filter is None or r.get("meterId", "") in meter_filter:
+                kept.append(r)
+    print(f"  {total} total records")
+    return kept
+
+
+def _epoch_minutes(stamps):
+    """Vectorised ``YYYYMMDDHHMM...`` -> minutes since 1970-01-01 (int64)."""
+    v = np.array([t[:12] for t in stamps], dtype="U12").astype(np.int64)
+    year, rest = np.divmod(v, 10**8)
+    month, rest = np.divmod(rest, 10**6)
+    day, rest = np.divmod(rest, 10**4)
+    hour, minute = np.divmod(rest, 100)
+    months = ((year - 1970) * 12 + month - 1).astype("datetime64[M]")
+    days = months.astype("datetime64[D]") + (day - 1).astype("timedelta64[D]")
+    return days.astype("datetime64[m]").astype(np.int64) + hour * 60 + minute
 
 
 def downsample(records, interval_minutes=MIN_INTERVAL_MINUTES):
-    """Keep one record per interval_minutes window per meter."""
+    """Keep one record per interval_minutes window per meter.
+
+    Greedy per meter, in time order: a reading is kept when it is at least
+    ``interval_minutes`` after the last kept one. Timestamps are parsed in
+    one vectorised pass and each meter's kept set is found by jumping
+    through its sorted minute array with ``searchsorted``, so the Python
+    loop runs once per *kept* reading rather than once per record.
+    """
     records.sort(key=lambda r: r.get("Time", ""))
-    last_accepted = {}
-    kept = []
+    valid = [
+        r for r in records
+        if len(r.get("Time", "")) >= 12 and r["Time"][:12].isdigit()
+    ]
+    if not valid:
+        return []
 
-    for r in records:
-        mid = r.get("meterId", "")
-        ts = r.get("Time", "")
-        if not ts:
-            continue
-        try:
-            minutes = int(ts[:4]) * 525960 + int(ts[4:6]) * 43800 + int(ts[6:8]) * 1440 + int(ts[8:10]) * 60 + int(ts[10:12])
-        except (ValueError, IndexError):
-            continue
-
-        prev = last_accepted.get(mid, 0)
-        if minutes - prev >= interval_minutes:
-            kept.append(r)
-            last_accepted[mid] = minutes
+    minutes = _epoch_minutes([r["Time"] for r in valid])
+    _, meter_idx = np.unique([r.get("meterId", "") for r in valid], return_inverse=True)
+    # Stable sort by meter keeps each meter's rows in time order.
+    order = np.argsort(meter_idx, kind="stable")
+    bounds = np.flatnonzero(np.diff(meter_idx[order])) + 1
 
-    return kept
+    keep = []
+    for group in np.split(order, bounds):
+        m = minutes[group]
+        i, n = 0, len(m)
+        while i < n:
+            keep.append(group[i])
+            i = max(i + 1, int(np.searchsorted(m, m[i] + interval_minutes, side="left")))
 
+    keep.sort()
+    return [valid[i] for i in keep]
 
-def post_reading(record, dry_run=False):
-    mid = record["meterId"]
-    payload = {
-        "meter_id": mid,
+
+def _reading_payload(record):
+    return {
+        "meter_id": record["meterId"],
         "timestamp": record["Time"],
         "energy_active": strip_units(record.get("EnergyActive", 0)),
         "power_active": strip_units(record.get("PowerActive", record.get("Power", 0))),
@@ -86,27 +137,118 @@ def post_reading(record, dry_run=False):
         "frequency": strip_units(record.get("Frequency", 0)),
     }
 
+
+def post_reading(record, dry_run=False, session=None):
+    mid = record["meterId"]
+    payload = _reading_payload(record)
+
     if dry_run:
         return {"status": "dry_run", "meter_id": mid}
 
-    body = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(
-        API_URL,
-        data=body,
-        headers={
-            "Content-Type": "application/json",
-            "X-IoT-Key": IOT_KEY,
-        },
-        method="POST",
-    )
+    sess = session or _session
     try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            return json.loads(resp.read())
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode("utf-8", errors="replace")
-        return {"error": e.code, "detail": error_body}
-    except Exception as e:
+        resp = sess.post(
+            API_URL,
+            json=payload,
+            headers={"X-IoT-Key": IOT_KEY},
+            timeout=10,
+        )
+    except requests.RequestException as e:
         return {"error": str(e)}
+    if resp.status_code >= 400:
+        return {"error": resp.status_code, "detail": resp.text}
+    try:
+        return resp.json()
+    except ValueError:
+        return {"error": resp.status_code, "detail": resp.text}
+
+
+def post_batch(records, session=None):
+    """POST up to ``BATCH_SIZE`` readings to the batch endpoint.
+
+    Returns one result dict per record (same shape as ``post_reading``), or
+    None when the server has no batch endpoint (404/405) so the caller can
+    fall back to single-reading posts."""
+    sess = session or _session
+    try:
+        resp = sess.post(
+            BATCH_API_URL,
+            json={"readings": [_reading_payload(r) for r in records]},
+            headers={"X-IoT-Key": IOT_KEY},
+            timeout=60,
+        )
+    except requests.RequestException as e:
+        return [{"error": str(e)}] * len(records)
+    if resp.status_code in (404, 405):
+        return None
+    if resp.status_code >= 400:
+        return [{"error": resp.status_code, "detail": resp.text}] * len(records)
+    try:
+        return resp.json()["results"]
+    except (ValueError, KeyError):
+        return [{"error": resp.status_code, "detail": resp.text}] * len(records)
+
+
+def _make_session(pool_size):
+    """Keep-alive session sized for ``pool_size`` concurrent posters."""
+    sess = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+    sess.mount("https://", adapter)
+    sess.mount("http://", adapter)
+    return sess
+
+
+_session = _make_session(1)
+
+
+def post_all(sampled, workers=DEFAULT_WORKERS, batch_size=BATCH_SIZE):
+    """POST readings concurrently across meters, in time order within each.
+
+    Ingest derives each reading's kWh delta from the meter's previous
+    reading, so one meter's readings must arrive in order; different meters
+    are independent and are posted by separate workers. Each worker sends
+    its meter's readings in ``batch_size`` chunks to /api/meters/readings
+    (one DB transaction per chunk), falling back to one POST per reading if
+    the server predates the batch endpoint."""
+    by_meter = {}
+    for r in sampled:
+        by_meter.setdefault(r["meterId"], []).append(r)
+
+    total = len(sampled)
+    lock = threading.Lock()
+    counts = {"sent": 0, "ok": 0, "errors": 0}
+    session = _make_session(workers)
+
+    batch = {"supported": batch_size > 1}
+
+    def _tally(record, result):
+        with lock:
+            counts["sent"] += 1
+            if result.get("status") == "ok":
+                counts["ok"] += 1
+            else:
+                counts["errors"] += 1
+                if counts["errors"] <= 5:
+                    print(f"  Error #{counts['errors']}: {record['meterId']} {record['Time']} → {result}")
+            if counts["sent"] % 50 == 0:
+                print(f"  {counts['sent']}/{total} sent ({counts['ok']} ok, {counts['errors']} errors)")
+
+    def _post_meter(records):
+        for start in range(0, len(records), max(batch_size, 1)):
+            chunk = records[start:start + max(batch_size, 1)]
+            results = post_batch(chunk, session=session) if batch["supported"] else None
+            if results is None:
+                if batch["supported"]:
+                    batch["supported"] = False
+                    print("  Batch endpoint not available — falling back to single posts")
+                results = [post_reading(r, session=session) for r in chunk]
+            for record, result in zip(chunk, results):
+                _tally(record, result)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(by_meter)))) as pool:
+        for fut in [pool.submit(_post_meter, recs) for recs in by_meter.values()]:
+            fut.result()
+    return counts["ok"], counts["errors"]
 
 
 def main():
@@ -115,12 +257,14 @@ def main():
     parser.add_argument("--all", action="store_true", help="Include unmapped meters")
     parser.add_argument("--interval", type=int, default=MIN_INTERVAL_MINUTES,
                         help=f"Min minutes between readings (default {MIN_INTERVAL_MINUTES})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Meters posted concurrently (default {DEFAULT_WORKERS})")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"Readings per batch POST; 1 disables batching (default {BATCH_SIZE})")
     args = parser.parse_args()
 
-    data = download_s3_data()
-
+    data = download_s3_data(None if args.all else KNOWN_METERS)
     if not args.all:
-        data = [r for r in data if r.get("meterId", "") in KNOWN_METERS]
         print(f"  Filtered to known meters: {len(data)} records")
 
     sampled = downsample(data, args.interval)
@@ -136,21 +280,8 @@ def main():
         print("\nDry run — pass --execute to actually POST")
         return
 
-    print(f"\nPosting {len(sampled)} readings to {API_URL} ...")
-    ok = 0
-    errors = 0
-    for i, record in enumerate(sampled):
-        result = post_reading(record, dry_run=False)
-        if result.get("status") == "ok":
-            ok += 1
-        else:
-            errors += 1
-            if errors <= 5:
-                print(f"  Error #{errors}: {record['meterId']} {record['Time']} → {result}")
-
-        if (i + 1) % 50 == 0:
-            print(f"  {i + 1}/{len(sampled)} sent ({ok} ok, {errors} errors)")
-            time.sleep(0.1)
+    print(f"\nPosting {len(sampled)} readings to {API_URL} ({args.workers} workers) ...")
+    ok, errors = post_all(sampled, args.workers, args.batch_size)
 
     print(f"\nDone: {ok} ok, {errors} errors out of {len(sampled)} readings")
 
@@ -13,6 +13,25 @@ Balance = SUM(payment kWh from transactions)
 This is a full-history computation — no running totals or seeds needed.
 For reconciliation, kWh can be converted to currency via tariff rate.
 
+Why not "last ``transactions.current_balance`` + consumption since"? That
+snapshot can't stand in for history here:
+
+  * Historical rows mix kWh, currency and ``0`` seed placeholders (see
+    ``docs/ops/2026-05-07-current-balance-unit-rca.md``); a backfill would
+    rewrite audit snapshots the RCA deliberately left alone.
+  * Consumption is not append-only in time: SM imports and 1Meter backfills
+    land hours older than the latest payment, and a billing-priority switch
+    re-prices every past hour. A snapshot would silently drop or double-count
+    both.
+
+The full-history sums are kept cheap by indexing instead: migration 063 makes
+the ``transactions`` aggregate index-only, and ``hourly_consumption`` (yearly
+partitions, migration 044) is read through ``(account_number, reading_hour)``
+-- or, with ``CC_BALANCE_DAILY_ROLLUP=1``, only from the account's rollup
+watermark on, closed days coming from ``consumption_daily_rollup`` (067).
+Display reads also go through :func:`get_balance_kwh_cached`, which reuses a
+computed balance until the account's change counter (migration 066) moves.
+
 **Billing source primacy (1Meter migration test, see**
 **``docs/ops/1meter-billing-migration-protocol.md``):**
 
@@ -30,10 +49,46 @@ by the Check Meters page) but is never written back to ``transactions``.
 """
 
 import logging
-from datetime import datetime, timezone
+import os
+import threading
+import time
+from datetime import date, datetime, timezone
 
 logger = logging.getLogger("cc-api.balance")
 
+# The balance read runs as a server-side prepared statement (see
+# pg_prepared); set CC_BALANCE_PREPARED=0 to send plain SQL instead.
+USE_PREPARED = os.environ.get("CC_BALANCE_PREPARED", "1") != "0"
+
+# Read closed days from consumption_daily_rollup instead of their hourly rows
+# (migration 067). Off until the migration has run and
+# scripts/ops/refresh_consumption_rollup.py has populated the rollup.
+USE_DAILY_ROLLUP = os.environ.get("CC_BALANCE_DAILY_ROLLUP", "0") == "1"
+
+# Display-read cache (see get_balance_kwh_cached). Process-local; writers in
+# this module and the in-process consumption writers in ingest.py drop the
+# account's entry. Where migration 066 has run, an entry is also checked
+# against account_balance_versions (bumped by triggers on every write, from
+# any process) and may live for CC_BALANCE_VERSIONED_TTL_S; otherwise the
+# short TTL bounds everything else (import_hourly / import_tc_live cron jobs,
+# other API workers).
+BALANCE_CACHE_TTL_S = float(os.environ.get("CC_BALANCE_CACHE_TTL_S", "30"))
+BALANCE_VERSIONED_TTL_S = float(os.environ.get("CC_BALANCE_VERSIONED_TTL_S", "600"))
+_BALANCE_CACHE_MAX = 20_000
+# account -> (monotonic stored, balance, as_of, version or None)
+_balance_cache: dict[str, tuple[float, float, datetime, int | None]] = {}
+_balance_cache_lock = threading.Lock()
+_balance_versions_available: bool | None = None
+# While the table is missing, look again this often: deploys restart the APIs
+# before migrations run, so 066 usually appears under a running worker.
+_BALANCE_VERSIONS_RECHECK_S = 60.0
+_balance_versions_checked_at = 0.0
+
+# Accounts written through this process in the last CC_BALANCE_READ_PIN_S
+# seconds; their reads skip the replica (see written_recently).
+BALANCE_READ_PIN_S = float(os.environ.get("CC_BALANCE_READ_PIN_S", "1"))
+_recent_writes: dict[str, float] = {}
+
 
 VALID_PRIORITIES = ("sm", "1m")
 DEFAULT_PRIORITY = "sm"
@@ -77,6 +132,246 @@ def _resolve_billing_priority(cur, account_number: str) -> str:
     return DEFAULT_PRIORITY
 
 
+# Per-hour source pick shared by the consumption and full-balance queries.
+# `hourly_consumption.source` is the custom enum type `transaction_source`
+# (see migrations seeding the type). psycopg2 sends Python list params as
+# `text[]`, and Postgres won't implicitly cast `transaction_source = text`
+# — so we must explicitly cast each ANY(...) array, otherwise this query
+# 500s with `operator does not exist: transaction_source = text` (RCA on
+# 2026-04-29 from a customer-data lookup on 0226MAK).
+_PER_HOUR_SELECT = """
+        SELECT reading_hour,
+            MAX(kwh) FILTER (WHERE source = ANY(%(sm_sources)s::transaction_source[])) AS sm_kwh,
+            MAX(kwh) FILTER (WHERE source = ANY(%(m1_sources)s::transaction_source[])) AS m1_kwh
+        FROM hourly_consumption
+        WHERE account_number = %(acct)s"""
+
+# With USE_DAILY_ROLLUP, days before the account's watermark come from
+# consumption_daily_rollup (both priorities' day totals, see migration 067)
+# and per_hour only reads hours from the watermark on. Days before the
+# watermark are complete: any write to one moves the watermark back.
+if USE_DAILY_ROLLUP:
+    _ROLLUP_CTES = """
+    rollup_through AS (
+        SELECT COALESCE(
+            (SELECT through_day FROM consumption_rollup_watermark
+              WHERE account_number = %(acct)s),
+            '-infinity'::date) AS d
+    ),
+    rollup AS (
+        SELECT COALESCE(SUM(sm_first_kwh), 0) AS sm_kwh,
+               COALESCE(SUM(m1_first_kwh), 0) AS m1_kwh
+        FROM consumption_daily_rollup
+        WHERE account_number = %(acct)s
+          AND day < (SELECT d FROM rollup_through)
+    ),"""
+    _ROLLUP_HOUR_FILTER = """
+          AND reading_hour >= (SELECT d FROM rollup_through)::timestamp AT TIME ZONE 'UTC'"""
+    _ROLLUP_CONSUMPTION = """
+    + (SELECT CASE WHEN {prio} = 'sm' THEN sm_kwh
+                   WHEN {prio} = '1m' THEN m1_kwh
+                   ELSE 0 END
+       FROM rollup)"""
+else:
+    _ROLLUP_CTES = _ROLLUP_HOUR_FILTER = _ROLLUP_CONSUMPTION = ""
+
+_PER_HOUR_CTE = f"""{_ROLLUP_CTES}
+    per_hour AS ({_PER_HOUR_SELECT}{_ROLLUP_HOUR_FILTER}
+        GROUP BY reading_hour
+    )"""
+
+# ``{prio}`` is the SQL expression for the priority in force: a plain
+# parameter for the consumption-only query, the in-query resolution below
+# for the full balance.
+_PRIORITY_CONSUMPTION_SUM = """
+    COALESCE(SUM(
+        CASE
+            WHEN {prio} = 'sm' THEN COALESCE(sm_kwh, m1_kwh)
+            WHEN {prio} = '1m' THEN COALESCE(m1_kwh, sm_kwh)
+            ELSE NULL
+        END
+    ), 0)::numeric"""
+
+# Same precedence as _resolve_billing_priority (explicit priority, account
+# override, fleet default, 'sm'), evaluated server-side so get_balance_kwh
+# doesn't spend one or two round-trips resolving it first. Relies on
+# accounts.billing_meter_priority from migration 015.
+_RESOLVED_PRIORITY = """
+    COALESCE(
+        %(priority)s::text,
+        (SELECT billing_meter_priority FROM accounts
+          WHERE account_number = %(acct)s
+            AND billing_meter_priority = ANY(%(valid_priorities)s)
+          LIMIT 1),
+        (SELECT value FROM system_config
+          WHERE key = 'billing_meter_priority'
+            AND value = ANY(%(valid_priorities)s)
+          LIMIT 1),
+        %(default_priority)s
+    )"""
+
+_CONSUMPTION_SQL = f"""
+    WITH {_PER_HOUR_CTE}
+    SELECT {_PRIORITY_CONSUMPTION_SUM.format(prio="%(priority)s")}
+           {_ROLLUP_CONSUMPTION.format(prio="%(priority)s")}
+    FROM per_hour
+"""
+
+# Priority, payment credits, legacy consumption rows and live consumption in
+# one round-trip (get_balance_kwh sits on every payment / dashboard read).
+_BALANCE_CTES = f"""
+    prio AS (SELECT {_RESOLVED_PRIORITY} AS p),
+    {_PER_HOUR_CTE.strip()},
+    txn AS (
+        SELECT
+            COALESCE(SUM(CASE WHEN is_payment THEN kwh_value ELSE 0 END), 0)::numeric AS payment_kwh,
+            COALESCE(SUM(CASE WHEN NOT is_payment THEN transaction_amount ELSE 0 END), 0)::numeric AS legacy_kwh
+        FROM transactions
+        WHERE account_number = %(acct)s
+    )"""
+
+_LIVE_CONSUMPTION = (
+    f"((SELECT {_PRIORITY_CONSUMPTION_SUM.format(prio='prio.p')} FROM per_hour, prio)"
+    f"{_ROLLUP_CONSUMPTION.format(prio='(SELECT p FROM prio)')})"
+)
+
+# The per-account sums are cast to NUMERIC before they are combined (the
+# source columns are double precision, so each SUM itself is float8), so the
+# subtraction and rounding are exact and the engine gets one value back
+# instead of three floats to combine and round in Python.
+_BALANCE_SQL = f"""
+    WITH {_BALANCE_CTES}
+    SELECT round(txn.payment_kwh - txn.legacy_kwh - {_LIVE_CONSUMPTION}, 4)
+    FROM txn
+"""
+
+# get_balance_kwh_what_if: the resolved priority and the balance under each
+# priority, from one scan of the account's hours.
+_WHAT_IF_SQL = f"""
+    WITH {_BALANCE_CTES},
+    cons AS (
+        SELECT {_PRIORITY_CONSUMPTION_SUM.format(prio="'sm'")}
+               {_ROLLUP_CONSUMPTION.format(prio="'sm'")} AS sm,
+               {_PRIORITY_CONSUMPTION_SUM.format(prio="'1m'")}
+               {_ROLLUP_CONSUMPTION.format(prio="'1m'")} AS m1
+        FROM per_hour
+    )
+    SELECT prio.p,
+           round(txn.payment_kwh - txn.legacy_kwh - cons.sm, 4),
+           round(txn.payment_kwh - txn.legacy_kwh - cons.m1, 4)
+    FROM txn, prio, cons
+"""
+
+# record_payment_kwh: balance before the payment, the payment row with its
+# current_balance snapshot, and both balances back in one statement. The CTEs
+# read the statement's snapshot, so ``prev`` never includes the new row.
+_PAYMENT_INSERT_SQL = f"""
+    WITH {_BALANCE_CTES},
+    prev AS (
+        SELECT round(txn.payment_kwh - txn.legacy_kwh - {_LIVE_CONSUMPTION}, 4) AS b
+        FROM txn
+    ),
+    ins AS (
+        INSERT INTO transactions
+            (account_number, meter_id, transaction_date,
+             transaction_amount, rate_used, kwh_value,
+             is_payment, current_balance, source, payment_reference)
+        VALUES (%(acct)s, %(meter_id)s, %(ts)s,
+                %(txn_amount)s, %(rate)s, %(kwh)s,
+                true, (SELECT round(b + %(kwh)s::numeric, 4) FROM prev),
+                %(source)s, %(payment_reference)s)
+        RETURNING id, current_balance
+    )
+    SELECT ins.id, prev.b, ins.current_balance
+    FROM ins, prev
+"""
+
+# The per-account advisory lock and the insert go out as one simple-query
+# string: one round-trip per payment, and the insert still gets a fresh READ
+# COMMITTED snapshot taken after the lock is held, so it sees a concurrent
+# payment's commit. Kept as client-side SQL rather than a stored function so
+# the balance logic has one definition (the fragments above).
+_PAYMENT_SQL = (
+    "SELECT pg_advisory_xact_lock(hashtext(%(lock_key)s));\n" + _PAYMENT_INSERT_SQL
+)
+
+
+# record_fee_transaction / record_historical_payment_transaction: a row that
+# doesn't move the balance, snapshotting the balance before it, in one
+# statement. The column list is filled in per call.
+_SNAPSHOT_INSERT_HEAD = f"""
+    WITH {_BALANCE_CTES},
+    prev AS (
+        SELECT round(txn.payment_kwh - txn.legacy_kwh - {_LIVE_CONSUMPTION}, 4) AS b
+        FROM txn
+    ),
+    ins AS (
+        INSERT INTO transactions """
+_SNAPSHOT_INSERT_TAIL = """
+        RETURNING id
+    )
+    SELECT ins.id, prev.b
+    FROM ins, prev
+"""
+
+
+def _insert_with_balance_snapshot(cur, account_number: str, row: dict) -> tuple[int, float]:
+    """INSERT *row* (column -> value) into ``transactions`` with
+    ``current_balance`` set to the account's balance before it; return
+    (txn_id, that balance)."""
+    params = _balance_params(account_number, None)
+    placeholders = []
+    for i, value in enumerate(row.values()):
+        params[f"col{i}"] = value
+        placeholders.append(f"%(col{i})s")
+    sql = (
+        _SNAPSHOT_INSERT_HEAD
+        + f"({', '.join(row)}, current_balance)\n"
+        + f"        VALUES ({', '.join(placeholders)}, (SELECT b FROM prev))"
+        + _SNAPSHOT_INSERT_TAIL
+    )
+    cur.execute(sql, params)
+    txn_id, prev_balance = cur.fetchone()
+    return int(txn_id), float(prev_balance)
+
+
+# Per-call parameters of the prepared balance read, in $n order, with their
+# types; the rest of _balance_params is inlined as literals. The payment
+# insert stays plain SQL: it runs once per payment, and a declared type for
+# ``source`` would break on DBs where that column is the transaction_source
+# enum.
+_BALANCE_ARGS = ("acct", "priority")
+_BALANCE_ARG_TYPES = ("text", "text")
+_PREPARED_BALANCE_SQL: str | None = None
+
+
+def _execute_balance(cur, params: dict) -> None:
+    global _PREPARED_BALANCE_SQL
+    if not USE_PREPARED:
+        cur.execute(_BALANCE_SQL, params)
+        return
+    from pg_prepared import execute_prepared, to_prepared_sql
+
+    if _PREPARED_BALANCE_SQL is None:
+        constants = {k: v for k, v in params.items() if k not in _BALANCE_ARGS}
+        _PREPARED_BALANCE_SQL = to_prepared_sql(_BALANCE_SQL, _BALANCE_ARGS, constants)
+    execute_prepared(cur.connection, cur, "bal_balance", _PREPARED_BALANCE_SQL,
+                     _BALANCE_ARG_TYPES, [params[k] for k in _BALANCE_ARGS])
+
+
+def _balance_params(account_number: str, priority: str | None) -> dict:
+    """Query parameters for the SQL above. A *priority* outside
+    :data:`VALID_PRIORITIES` is passed as NULL, i.e. "resolve it"."""
+    return {
+        "acct": account_number,
+        "priority": priority if priority in VALID_PRIORITIES else None,
+        "valid_priorities": list(VALID_PRIORITIES),
+        "default_priority": DEFAULT_PRIORITY,
+        "sm_sources": list(SM_SOURCES),
+        "m1_sources": list(M1_SOURCES),
+    }
+
+
 def _consumption_kwh(cur, account_number: str, priority: str) -> float:
     """Sum live consumption from ``hourly_consumption`` for *account_number*
     using the source-priority rule for *priority* (``'sm'`` or ``'1m'``).
@@ -86,36 +381,10 @@ def _consumption_kwh(cur, account_number: str, priority: str) -> float:
     replaces the old ``MAX(kwh)`` dedup which silently allowed either
     source to override the other.
     """
-    if priority not in VALID_PRIORITIES:
-        priority = DEFAULT_PRIORITY
-
-    # `hourly_consumption.source` is the custom enum type `transaction_source`
-    # (see migrations seeding the type). psycopg2 sends Python list params as
-    # `text[]`, and Postgres won't implicitly cast `transaction_source = text`
-    # — so we must explicitly cast each ANY(...) array, otherwise this query
-    # 500s with `operator does not exist: transaction_source = text` (RCA on
-    # 2026-04-29 from a customer-data lookup on 0226MAK).
-    cur.execute(
-        """
-        WITH per_hour AS (
-            SELECT reading_hour,
-                MAX(kwh) FILTER (WHERE source = ANY(%s::transaction_source[])) AS sm_kwh,
-                MAX(kwh) FILTER (WHERE source = ANY(%s::transaction_source[])) AS m1_kwh
-            FROM hourly_consumption
-            WHERE account_number = %s
-            GROUP BY reading_hour
-        )
-        SELECT COALESCE(SUM(
-            CASE
-                WHEN %s = 'sm' THEN COALESCE(sm_kwh, m1_kwh)
-                WHEN %s = '1m' THEN COALESCE(m1_kwh, sm_kwh)
-                ELSE NULL
-            END
-        ), 0)
-        FROM per_hour
-        """,
-        (list(SM_SOURCES), list(M1_SOURCES), account_number, priority, priority),
-    )
+    params = _balance_params(account_number, priority)
+    if params["priority"] is None:
+        params["priority"] = DEFAULT_PRIORITY
+    cur.execute(_CONSUMPTION_SQL, params)
     return float(cur.fetchone()[0])
 
 
@@ -124,17 +393,22 @@ def get_balance_kwh(
     account_number: str,
     *,
     priority: str | None = None,
+    as_of: datetime | None = None,
 ) -> tuple[float, datetime | None]:
     """Compute the current kWh balance for an account.
 
-    Returns ``(balance_kwh, as_of_timestamp)``.
+    Returns ``(balance_kwh, as_of_timestamp)``. Callers computing many
+    balances for one request can pass a single *as_of* to stamp them all
+    instead of reading the clock per call; it is only a label and does not
+    bound the query.
 
     *priority* (``'sm'``/``'1m'``/``None``) overrides the resolved billing
     primacy for diagnostics; production callers (payments, dashboards,
     auto-cutoff) leave it ``None`` so the per-account / fleet default is
     used.
 
-    Components:
+    Priority resolution and the components below run as a single query
+    (``_BALANCE_SQL``):
 
     1. Payment credits from ``transactions`` (``is_payment=true`` →
        ``kwh_value`` added).
@@ -144,26 +418,294 @@ def get_balance_kwh(
        — historic imports that pre-date hourly_consumption).
     """
     cur = conn.cursor()
+    _execute_balance(cur, _balance_params(account_number, priority))
+    return float(cur.fetchone()[0]), as_of or datetime.now(timezone.utc)
+
+
+# get_balances_kwh: the same computation as _BALANCE_SQL for a set of
+# accounts, grouped per account instead of filtered to one.
+# Batch counterparts of the _ROLLUP_* fragments, per account in ``accts``.
+if USE_DAILY_ROLLUP:
+    _BATCH_ROLLUP_CTES = """rollup_through AS (
+        SELECT accts.acct, COALESCE(w.through_day, '-infinity'::date) AS d
+        FROM accts
+        LEFT JOIN consumption_rollup_watermark w ON w.account_number = accts.acct
+    ),
+    rollup AS (
+        SELECT r.account_number AS acct,
+               SUM(r.sm_first_kwh) AS sm_kwh, SUM(r.m1_first_kwh) AS m1_kwh
+        FROM consumption_daily_rollup r
+        JOIN rollup_through rt ON rt.acct = r.account_number AND r.day < rt.d
+        GROUP BY r.account_number
+    ),"""
+    _BATCH_HOUR_JOIN = """JOIN rollup_through rt
+          ON h.account_number = rt.acct
+         AND h.reading_hour >= rt.d::timestamp AT TIME ZONE 'UTC'"""
+    _BATCH_ROLLUP_CONSUMPTION = """
+                  - COALESCE(CASE WHEN prio.p = 'sm' THEN rollup.sm_kwh
+                                  WHEN prio.p = '1m' THEN rollup.m1_kwh END, 0)"""
+    _BATCH_ROLLUP_JOIN = """
+    JOIN prio ON prio.acct = accts.acct
+    LEFT JOIN rollup ON rollup.acct = accts.acct"""
+else:
+    _BATCH_ROLLUP_CTES = _BATCH_ROLLUP_CONSUMPTION = _BATCH_ROLLUP_JOIN = ""
+    _BATCH_HOUR_JOIN = "JOIN accts ON h.account_number = accts.acct"
+
+_BALANCES_SQL = f"""
+    WITH accts AS (
+        SELECT DISTINCT acct FROM unnest(%(accts)s::text[]) AS u(acct)
+    ),
+    prio AS (
+        SELECT accts.acct,
+               COALESCE(
+                   %(priority)s::text,
+                   (SELECT billing_meter_priority FROM accounts
+                     WHERE account_number = accts.acct
+                       AND billing_meter_priority = ANY(%(valid_priorities)s)
+                     LIMIT 1),
+                   (SELECT value FROM system_config
+                     WHERE key = 'billing_meter_priority'
+                       AND value = ANY(%(valid_priorities)s)
+                     LIMIT 1),
+                   %(default_priority)s
+               ) AS p
+        FROM accts
+    ),
+    {_BATCH_ROLLUP_CTES}
+    per_hour AS (
+        SELECT h.account_number AS acct, h.reading_hour,
+            MAX(h.kwh) FILTER (WHERE h.source = ANY(%(sm_sources)s::transaction_source[])) AS sm_kwh,
+            MAX(h.kwh) FILTER (WHERE h.source = ANY(%(m1_sources)s::transaction_source[])) AS m1_kwh
+        FROM hourly_consumption h
+        {_BATCH_HOUR_JOIN}
+        GROUP BY h.account_number, h.reading_hour
+    ),
+    live AS (
+        SELECT per_hour.acct,
+               COALESCE(SUM(
+                   CASE
+                       WHEN prio.p = 'sm' THEN COALESCE(sm_kwh, m1_kwh)
+                       WHEN prio.p = '1m' THEN COALESCE(m1_kwh, sm_kwh)
+                       ELSE NULL
+                   END
+               ), 0)::numeric AS live_kwh
+        FROM per_hour
+        JOIN prio ON prio.acct = per_hour.acct
+        GROUP BY per_hour.acct
+    ),
+    txn AS (
+        SELECT t.account_number AS acct,
+            COALESCE(SUM(CASE WHEN t.is_payment THEN t.kwh_value ELSE 0 END), 0)::numeric AS payment_kwh,
+            COALESCE(SUM(CASE WHEN NOT t.is_payment THEN t.transaction_amount ELSE 0 END), 0)::numeric AS legacy_kwh
+        FROM transactions t
+        JOIN accts ON t.account_number = accts.acct
+        GROUP BY t.account_number
+    )
+    SELECT accts.acct,
+           round(COALESCE(txn.payment_kwh, 0) - COALESCE(txn.legacy_kwh, 0)
+                 - COALESCE(live.live_kwh, 0){_BATCH_ROLLUP_CONSUMPTION}, 4)
+    FROM accts
+    LEFT JOIN txn ON txn.acct = accts.acct
+    LEFT JOIN live ON live.acct = accts.acct{_BATCH_ROLLUP_JOIN}
+"""
+
+# Accounts per _BALANCES_SQL round-trip; bounds the per_hour working set.
+BALANCES_BATCH_SIZE = 500
+
+
+def get_balances_kwh(
+    conn,
+    account_numbers,
+    *,
+    priority: str | None = None,
+) -> dict[str, float]:
+    """Batch form of :func:`get_balance_kwh` for audits and listings.
+
+    Returns ``{account_number: balance_kwh}`` for every distinct account
+    passed (0.0 for one with no history), computed with the same
+    priority-aware rule as the single-account path but in one query per
+    :data:`BALANCES_BATCH_SIZE` accounts instead of one per account.
+    """
+    accts = list(dict.fromkeys(a for a in account_numbers if a))
+    out: dict[str, float] = {}
+    cur = conn.cursor()
+    for i in range(0, len(accts), BALANCES_BATCH_SIZE):
+        params = _balance_params("", priority)
+        del params["acct"]
+        params["accts"] = accts[i:i + BALANCES_BATCH_SIZE]
+        cur.execute(_BALANCES_SQL, params)
+        for acct, balance in cur.fetchall():
+            out[acct] = float(balance)
+    return out
+
+
+# refresh_consumption_rollup: rebuild [from_day, through_day) for one account
+# from hourly rows, with the same per-hour pick as _PER_HOUR_SELECT.
+_ROLLUP_REFRESH_SQL = f"""
+    INSERT INTO consumption_daily_rollup (account_number, day, sm_first_kwh, m1_first_kwh)
+    SELECT %(acct)s, (reading_hour AT TIME ZONE 'UTC')::date,
+           COALESCE(SUM(COALESCE(sm_kwh, m1_kwh)), 0),
+           COALESCE(SUM(COALESCE(m1_kwh, sm_kwh)), 0)
+    FROM ({_PER_HOUR_SELECT}
+          AND reading_hour >= %(from_day)s::timestamp AT TIME ZONE 'UTC'
+          AND reading_hour <  %(through_day)s::timestamp AT TIME ZONE 'UTC'
+        GROUP BY reading_hour
+    ) per_hour
+    GROUP BY 2
+"""
 
+
+def refresh_consumption_rollup(
+    conn, account_number: str, through_day: date | None = None,
+) -> int:
+    """Bring *account_number*'s consumption_daily_rollup (migration 067) up to
+    *through_day* (exclusive; default today UTC) and return the number of
+    days rebuilt. Only days from the current watermark on are recomputed.
+
+    Holds the account's watermark row lock until the caller commits, so
+    hourly writes landing meanwhile wait and then rewind the watermark.
+    """
+    through_day = through_day or datetime.now(timezone.utc).date()
+    cur = conn.cursor()
     cur.execute(
         """
-        SELECT
-            COALESCE(SUM(CASE WHEN is_payment THEN kwh_value ELSE 0 END), 0),
-            COALESCE(SUM(CASE WHEN NOT is_payment THEN transaction_amount ELSE 0 END), 0)
-        FROM transactions
-        WHERE account_number = %s
+        INSERT INTO consumption_rollup_watermark (account_number, through_day)
+        VALUES (%s, '-infinity') ON CONFLICT (account_number) DO NOTHING
         """,
         (account_number,),
     )
-    total_payment_kwh, total_legacy_consumption = (float(v) for v in cur.fetchone())
+    cur.execute(
+        "SELECT through_day FROM consumption_rollup_watermark WHERE account_number = %s FOR UPDATE",
+        (account_number,),
+    )
+    from_day = cur.fetchone()[0]  # -infinity arrives as date.min
+    if from_day >= through_day:
+        return 0
 
-    resolved = priority if priority in VALID_PRIORITIES else _resolve_billing_priority(
-        cur, account_number
+    cur.execute(
+        """
+        DELETE FROM consumption_daily_rollup
+        WHERE account_number = %s AND day >= %s AND day < %s
+        """,
+        (account_number, from_day, through_day),
     )
-    total_live_consumption = _consumption_kwh(cur, account_number, resolved)
+    params = _balance_params(account_number, None)
+    params.update(from_day=from_day, through_day=through_day)
+    cur.execute(_ROLLUP_REFRESH_SQL, params)
+    days = cur.rowcount
+    cur.execute(
+        """
+        UPDATE consumption_rollup_watermark
+        SET through_day = %s, refreshed_at = NOW()
+        WHERE account_number = %s
+        """,
+        (through_day, account_number),
+    )
+    return days
+
+
+def invalidate_balance_cache(account_number: str | None = None) -> None:
+    """Drop one account's cached display balance (or all when called bare).
+
+    Every balance writer calls this, so it also marks the account for
+    :func:`written_recently`.
+    """
+    now = time.monotonic()
+    with _balance_cache_lock:
+        if account_number is None:
+            _balance_cache.clear()
+            return
+        _balance_cache.pop(account_number, None)
+        if len(_recent_writes) >= _BALANCE_CACHE_MAX:
+            for acct, at in list(_recent_writes.items()):
+                if now - at > BALANCE_READ_PIN_S:
+                    del _recent_writes[acct]
+        _recent_writes[account_number] = now
+
+
+def written_recently(account_number: str) -> bool:
+    """True if this process wrote *account_number*'s balance inputs within
+    ``CC_BALANCE_READ_PIN_S``: read it from the primary, since a replica may
+    not have replayed the write yet (``customer_api.get_read_connection``).
+    """
+    with _balance_cache_lock:
+        at = _recent_writes.get(account_number)
+    return at is not None and time.monotonic() - at <= BALANCE_READ_PIN_S
+
+
+def _balance_version(cur, account_number: str) -> int | None:
+    """Current account_balance_versions counter for *account_number* (0 if it
+    has never changed since migration 066), or None if the table is missing
+    (re-checked every ``_BALANCE_VERSIONS_RECHECK_S`` until it appears).
+    """
+    global _balance_versions_available, _balance_versions_checked_at
+    if not _balance_versions_available:
+        now = time.monotonic()
+        if (_balance_versions_available is not None
+                and now - _balance_versions_checked_at < _BALANCE_VERSIONS_RECHECK_S):
+            return None
+        cur.execute("SELECT to_regclass('account_balance_versions') IS NOT NULL")
+        found = bool(cur.fetchone()[0])
+        if found and _balance_versions_available is False:
+            logger.info("account_balance_versions found; balance cache is versioned")
+        elif not found and _balance_versions_available is None:
+            logger.info("account_balance_versions missing (migration 066); balance cache is TTL-only until it appears")
+        _balance_versions_available = found
+        _balance_versions_checked_at = now
+        if not found:
+            return None
+    cur.execute(
+        "SELECT version FROM account_balance_versions WHERE account_number = %s",
+        (account_number,),
+    )
+    row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+def get_balance_kwh_cached(
+    conn,
+    account_number: str,
+    *,
+    max_age_s: float | None = None,
+) -> tuple[float, datetime | None]:
+    """:func:`get_balance_kwh` behind a process-local cache.
+
+    **Display reads only** (dashboards, balance checks). Payments recorded
+    through this module and consumption ingested by ``ingest.py`` invalidate
+    the account immediately. Other writers (the hourly import jobs, other
+    workers) are caught by the account's ``account_balance_versions`` counter
+    (migration 066): a hit costs one primary-key lookup and is served for up
+    to ``CC_BALANCE_VERSIONED_TTL_S`` (default 600s) while the counter is
+    unchanged. Without that table a hit can lag by up to
+    ``CC_BALANCE_CACHE_TTL_S`` (default 30s). A billing-priority switch isn't
+    versioned and is only picked up on expiry. Anything that *decides* on the
+    balance -- payment snapshots, relay cutoff, advances -- must keep calling
+    :func:`get_balance_kwh`. The returned timestamp is when the value was
+    computed, not when it was served.
+    """
+    if max_age_s is not None and max_age_s <= 0:
+        return get_balance_kwh(conn, account_number)
 
-    balance = round(total_payment_kwh - total_live_consumption - total_legacy_consumption, 4)
-    return balance, datetime.now(timezone.utc)
+    cur = conn.cursor()
+    version = _balance_version(cur, account_number)
+    if max_age_s is not None:
+        ttl = max_age_s
+    else:
+        ttl = BALANCE_CACHE_TTL_S if version is None else BALANCE_VERSIONED_TTL_S
+    now = time.monotonic()
+    with _balance_cache_lock:
+        hit = _balance_cache.get(account_number)
+    if hit is not None and now - hit[0] <= ttl and hit[3] == version:
+        return hit[1], hit[2]
+
+    # The version is read before the balance, so a write landing in between
+    # leaves a newer balance under an older version: the next read recomputes.
+    balance, as_of = get_balance_kwh(conn, account_number)
+    with _balance_cache_lock:
+        if len(_balance_cache) >= _BALANCE_CACHE_MAX:
+            _balance_cache.clear()
+        _balance_cache[account_number] = (now, balance, as_of, version)
+    return balance, as_of
 
 
 def get_balance_kwh_what_if(
@@ -185,13 +727,17 @@ def get_balance_kwh_what_if(
             "what_if_balance_kwh": 12.20,
             "implied_balance_delta_kwh": -0.14,  # what_if - actual
         }
+
+    One round-trip (``_WHAT_IF_SQL``): both priorities are summed from the
+    same per-hour scan.
     """
     cur = conn.cursor()
-    actual_priority = _resolve_billing_priority(cur, account_number)
+    cur.execute(_WHAT_IF_SQL, _balance_params(account_number, None))
+    actual_priority, sm_balance, m1_balance = cur.fetchone()
+    by_priority = {"sm": float(sm_balance), "1m": float(m1_balance)}
     what_if_priority = "1m" if actual_priority == "sm" else "sm"
-
-    actual_balance, _ = get_balance_kwh(conn, account_number, priority=actual_priority)
-    what_if_balance, _ = get_balance_kwh(conn, account_number, priority=what_if_priority)
+    actual_balance = by_priority[actual_priority]
+    what_if_balance = by_priority[what_if_priority]
 
     return {
         "actual_priority": actual_priority,
@@ -217,7 +763,9 @@ def record_payment_kwh(
     """Record a payment and return (txn_id, kwh_vended, new_balance_kwh).
 
     Computes the current balance from full history, adds the new
-    payment's kWh, and stores the snapshot in current_balance.
+    payment's kWh, and stores the snapshot in current_balance -- all in one
+    statement (``_PAYMENT_INSERT_SQL``), under a per-account advisory lock
+    taken in the same round-trip.
 
     ``amount_currency`` drives kWh credit (electricity slice after splits).
     When ``ledger_amount_currency`` is set, ``transaction_amount`` stores that
@@ -235,12 +783,12 @@ def record_payment_kwh(
     cur = conn.cursor()
     ts = timestamp or datetime.now(timezone.utc)
 
-    kwh_vended = kwh_override if kwh_override is not None else (
-        round(amount_currency / rate, 4) if rate > 0 else 0.0
-    )
-
-    prev_balance, _ = get_balance_kwh(conn, account_number)
-    new_balance = round(prev_balance + kwh_vended, 4)
+    # Stored kWh sits on the same 0.0001 grid the balance is rounded to, so a
+    # hand-entered override like 0.1 + 0.2 can't leave float noise in history.
+    if kwh_override is not None:
+        kwh_vended = round(float(kwh_override), 4)
+    else:
+        kwh_vended = round(amount_currency / rate, 4) if rate > 0 else 0.0
 
     txn_amount = (
         float(ledger_amount_currency)
@@ -248,19 +796,19 @@ def record_payment_kwh(
         else float(amount_currency)
     )
 
-    cur.execute("""
-        INSERT INTO transactions
-            (account_number, meter_id, transaction_date,
-             transaction_amount, rate_used, kwh_value,
-             is_payment, current_balance, source, payment_reference)
-        VALUES (%s, %s, %s, %s, %s, %s, true, %s, %s, %s)
-        RETURNING id
-    """, (
-        account_number, meter_id, ts,
-        txn_amount, rate, kwh_vended,
-        new_balance, source, payment_reference,
-    ))
-    txn_id = cur.fetchone()[0]
+    # The advisory lock serialises payments to the same account for the rest
+    # of the transaction so two concurrent payments can't snapshot the same
+    # prev_balance (see _PAYMENT_SQL).
+    params = _balance_params(account_number, None)
+    params.update(
+        lock_key=f"balance:{account_number}",
+        meter_id=meter_id, ts=ts, txn_amount=txn_amount, rate=rate,
+        kwh=kwh_vended, source=source, payment_reference=payment_reference,
+    )
+    cur.execute(_PAYMENT_SQL, params)
+    txn_id, prev_balance, new_balance = cur.fetchone()
+    prev_balance, new_balance = float(prev_balance), float(new_balance)
+    invalidate_balance_cache(account_number)
 
     logger.info(
         "Payment: txn=%d acct=%s %s%.2f -> %.4f kWh @ %.2f  bal=%.4f kWh",
@@ -303,6 +851,18 @@ def balance_to_currency(balance_kwh: float, rate: float) -> float:
     return round(balance_kwh * rate, 4)
 
 
+def balances_to_currency(balances_kwh, rates):
+    """Array form of :func:`balance_to_currency` for statement exports and
+    reconciliation runs: one vectorised multiply + round over many accounts
+    instead of a Python-level call per account. *rates* may be a scalar or
+    an array matching *balances_kwh*. Returns a float64 ``numpy.ndarray``.
+    """
+    import numpy as np  # function-local: only batch callers pay the import
+
+    return np.round(
+        np.asarray(balances_kwh, dtype=np.float64) * np.asarray(rates, dtype=np.float64), 4)
+
+
 def record_fee_transaction(
     conn,
     account_number: str,
@@ -328,34 +888,16 @@ def record_fee_transaction(
 
     cur = conn.cursor()
     ts = timestamp or datetime.now(timezone.utc)
-    prev_balance, _ = get_balance_kwh(conn, account_number)
-
-    base_cols = [
-        "account_number", "meter_id", "transaction_date",
-        "transaction_amount", "rate_used", "kwh_value",
-        "is_payment", "current_balance", "source",
-        "payment_reference", "payment_category",
-        "advance_portion", "electricity_portion", "financing_portion",
-    ]
-    base_vals = [
-        account_number, meter_id, ts,
-        amount_currency, 0, 0,
-        True, prev_balance, source,
-        payment_reference, payment_category,
-        0, 0, 0,
-    ]
-
-    extra = extra_columns or {}
-    cols = base_cols + list(extra.keys())
-    vals = base_vals + list(extra.values())
-
-    placeholders = ", ".join(["%s"] * len(vals))
-    sql = (
-        f"INSERT INTO transactions ({', '.join(cols)}) "
-        f"VALUES ({placeholders}) RETURNING id"
-    )
-    cur.execute(sql, vals)
-    txn_id = int(cur.fetchone()[0])
+    row = {
+        "account_number": account_number, "meter_id": meter_id, "transaction_date": ts,
+        "transaction_amount": amount_currency, "rate_used": 0, "kwh_value": 0,
+        "is_payment": True, "source": source,
+        "payment_reference": payment_reference, "payment_category": payment_category,
+        "advance_portion": 0, "electricity_portion": 0, "financing_portion": 0,
+    }
+    row.update(extra_columns or {})
+    txn_id, prev_balance = _insert_with_balance_snapshot(cur, account_number, row)
+    invalidate_balance_cache(account_number)
     logger.info(
         "Fee txn=%d acct=%s category=%s amount=%.2f (no kWh credit)",
         txn_id, account_number, payment_category, amount_currency,
@@ -377,79 +919,14 @@ def record_historical_payment_transaction(
     """Insert a payment row for audit/history without crediting kWh balance."""
     cur = conn.cursor()
     ts = timestamp or datetime.now(timezone.utc)
-    prev_balance, _ = get_balance_kwh(conn, account_number)
-
-    base_cols = [
-        "account_number", "meter_id", "transaction_date",
-        "transaction_amount", "rate_used", "kwh_value",
-        "is_payment", "current_balance", "source",
-        "payment_reference",
-    ]
-    base_vals = [
-        account_number, meter_id, ts,
-        amount_currency, rate, None,
-        True, prev_balance, source,
-        payment_reference,
-    ]
-
-    extra = extra_columns or {}
-    cols = base_cols + list(extra.keys())
-    vals = base_vals + list(extra.values())
-
-    placeholders = ", ".join(["%s"] * len(vals))
-    sql = (
-        f"INSERT INTO transactions ({', '.join(cols)}) "
-        f"VALUES ({placeholders}) RETURNING id"
-    )
-    cur.execute(sql, vals)
-    txn_id = int(cur.fetchone()[0])
-    logger.info(
-        "Historical payment txn=%d acct=%s M%.2f (no kWh credit, bal=%.4f kWh)",
-        txn_id, account_number, amount_currency, prev_balance,
-    )
-    return txn_id, prev_balance
-
-
-def record_historical_payment_transaction(
-    conn,
-    account_number: str,
-    meter_id: str,
-    amount_currency: float,
-    rate: float,
-    source: str = "portal",
-    timestamp: datetime | None = None,
-    payment_reference: str | None = None,
-    extra_columns: dict | None = None,
-) -> tuple[int, float]:
-    """Insert a payment row for audit/history without crediting kWh balance."""
-    cur = conn.cursor()
-    ts = timestamp or datetime.now(timezone.utc)
-    prev_balance, _ = get_balance_kwh(conn, account_number)
-
-    base_cols = [
-        "account_number", "meter_id", "transaction_date",
-        "transaction_amount", "rate_used", "kwh_value",
-        "is_payment", "current_balance", "source",
-        "payment_reference",
-    ]
-    base_vals = [
-        account_number, meter_id, ts,
-        amount_currency, rate, None,
-        True, prev_balance, source,
-        payment_reference,
-    ]
-
-    extra = extra_columns or {}
-    cols = base_cols + list(extra.keys())
-    vals = base_vals + list(extra.values())
-
-    placeholders = ", ".join(["%s"] * len(vals))
-    sql = (
-        f"INSERT INTO transactions ({', '.join(cols)}) "
-        f"VALUES ({placeholders}) RETURNING id"
-    )
-    cur.execute(sql, vals)
-    txn_id = int(cur.fetchone()[0])
+    row = {
+        "account_number": account_number, "meter_id": meter_id, "transaction_date": ts,
+        "transaction_amount": amount_currency, "rate_used": rate, "kwh_value": None,
+        "is_payment": True, "source": source, "payment_reference": payment_reference,
+    }
+    row.update(extra_columns or {})
+    txn_id, prev_balance = _insert_with_balance_snapshot(cur, account_number, row)
+    invalidate_balance_cache(account_number)
     logger.info(
         "Historical payment txn=%d acct=%s M%.2f (no kWh credit, bal=%.4f kWh)",
         txn_id, account_number, amount_currency, prev_balance,
@@ -196,7 +196,7 @@ def refresh_balance_live(
     returns a record dict; never raises for lookup/cache failures (falls back to the
     last cached value or the engine balance).
     """
-    from balance_engine import get_balance_kwh
+    from balance_engine import get_balance_kwh_cached
     from sparkmeter_credit import lookup_sm_balance
 
     account_number = (account_number or "").strip().upper()
@@ -216,7 +216,7 @@ def refresh_balance_live(
 
     rate = _tariff_rate(conn, account_number)
     try:
-        cc_balance, _ = get_balance_kwh(conn, account_number)
+        cc_balance, _ = get_balance_kwh_cached(conn, account_number)
         cc_balance = round(float(cc_balance), 4)
     except Exception as e:
         logger.warning("balance_live: engine balance failed for %s: %s", account_number, e)
@@ -281,7 +281,7 @@ def get_display_balance_detail(
     Returns ``{balance_kwh, as_of, source, live_source, stale, cc_balance_kwh}`` where
     ``source`` is ``'live'`` / ``'live_stale'`` / ``'engine'``.
     """
-    from balance_engine import get_balance_kwh
+    from balance_engine import get_balance_kwh_cached
 
     account_number = (account_number or "").strip().upper()
 
@@ -305,7 +305,7 @@ def get_display_balance_detail(
             "cc_balance_kwh": rec.get("cc_balance_kwh"),
         }
 
-    balance, as_of = get_balance_kwh(conn, account_number)
+    balance, as_of = get_balance_kwh_cached(conn, account_number)
     return {
         "balance_kwh": round(float(balance), 4),
         "as_of": as_of,
@@ -327,6 +327,9 @@ def mark_account_due(account_number: str, *, write_conn=None) -> None:
     account_number = (account_number or "").strip().upper()
     if not account_number:
         return
+    from balance_engine import invalidate_balance_cache
+
+    invalidate_balance_cache(account_number)
     sql = """
         INSERT INTO balance_refresh_state (account_number, next_due_at, updated_at)
         VALUES (%s, NOW(), NOW())
@@ -46,6 +46,7 @@ from balance_engine import (
     _resolve_billing_priority,
 )
 from customer_api import get_connection
+from db_errors import PoolExhausted
 from middleware import require_employee, require_role
 from models import CCRole, CurrentUser
 from mutations import try_log_mutation
@@ -208,7 +209,7 @@ def set_account_priority(
                 "override": new_value,
                 "effective_priority": effective,
             }
-    except HTTPException:
+    except (HTTPException, PoolExhausted):
         raise
     except psycopg2.Error as exc:
         logger.error("billing-priority update failed: %s", exc)
@@ -264,7 +265,7 @@ def set_fleet_priority(
                 "previous_default": old_value,
                 "fleet_default": new_value,
             }
-    except HTTPException:
+    except (HTTPException, PoolExhausted):
         raise
     except psycopg2.Error as exc:
         logger.error("fleet billing-priority update failed: %s", exc)
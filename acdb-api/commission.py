@@ -12,15 +12,23 @@ Endpoints:
 
 import logging
 import os
+import re
+import stat
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
+from email.utils import formatdate, parsedate_to_datetime
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse
-import re
+import psycopg2.extras
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, Response
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 
+from fast_json import FastJSONResponse
 from contract_gen import (
     CONTRACTS_DIR,
     build_download_url,
@@ -34,6 +42,26 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["commission"])
 
+# Account numbers are 3-4 digits + 2-4 letter site code (e.g. 0045MAK).
+_ACCT_RE = re.compile(r"^(\d{3,4})([A-Za-z]{2,4})$")
+_SITE_SUFFIX_RE = re.compile(r"([A-Za-z]{2,4})$")
+
+# Public download path segments (used with fullmatch): contracts/{SITE}/{name}.pdf.
+# Neither may contain a path separator or start with a dot, so the path
+# can't leave CONTRACTS_DIR/{SITE}; no quotes either, as the name goes in a
+# header. Filenames stay permissive otherwise: Dropbox-ingested contracts
+# (ingest_contracts.py) keep their original names.
+_CONTRACT_SITE_RE = re.compile(r"[A-Z0-9]{2,8}")
+_CONTRACT_FILE_RE = re.compile(r'[^./\\"\x00][^/\\"\x00]*\.pdf', re.IGNORECASE)
+
+# Signature: bare base64 (the templates embed it as a data: URI as-is), or
+# a full data: URL as canvas.toDataURL() produces, whose prefix is dropped.
+_SIGNATURE_DATA_URL_RE = re.compile(r"data:image/[\w.+-]+;base64,")
+_BASE64_RE = re.compile(r"[A-Za-z0-9+/]*={0,2}")
+
+# Runs execute_commission's uGridPLAN sync alongside its SparkMeter sync.
+_sync_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="commission-sync")
+
 
 def _commissioning_done_date(connection_date_str: str) -> str:
     """Return YYYY-MM-DD for commissioning / contract-signed dates."""
@@ -45,6 +73,11 @@ def _commissioning_done_date(connection_date_str: str) -> str:
 
 # ---------------------------------------------------------------------------
 # DB helper – import from customer_api to share the connection pool
+#
+# Handlers that touch the DB or the contracts directory (or render PDFs /
+# call SMS and uGridPLAN) are plain ``def`` so FastAPI runs them in its
+# threadpool; as ``async def`` the blocking psycopg2 and filesystem calls
+# stalled the event loop for every other request.
 # ---------------------------------------------------------------------------
 
 def _get_connection():
@@ -86,13 +119,25 @@ class CommissionRequest(BaseModel):
     )
     commissioned_by: Optional[str] = None
 
+    @field_validator("customer_signature")
+    @classmethod
+    def _bare_base64_signature(cls, v: str) -> str:
+        """Checked once here, without decoding: xhtml2pdf silently drops an
+        image it can't decode, which would yield an unsigned contract."""
+        m = _SIGNATURE_DATA_URL_RE.match(v)
+        if m:
+            v = v[m.end():]
+        if len(v) % 4 or not _BASE64_RE.fullmatch(v):
+            raise ValueError("customer_signature must be base64 image data")
+        return v
+
     @model_validator(mode="after")
     def _derive_site_code(self) -> "CommissionRequest":
         """If community was blank in DB, derive site from account number (e.g. 0297MAK → MAK)."""
         sc = (self.site_code or "").strip().upper()
         acct = (self.account_number or "").strip().upper()
         if not sc and acct:
-            m = re.search(r"([A-Za-z]{2,4})$", acct)
+            m = _SITE_SUFFIX_RE.search(acct)
             if m:
                 sc = m.group(1).upper()
         if not sc:
@@ -109,80 +154,132 @@ class CommissionRequest(BaseModel):
 # Accepts account_number (e.g. 0045MAK) or legacy numeric customer_id.
 # ---------------------------------------------------------------------------
 
-def _resolve_customer_for_commission(cursor, identifier: str):
-    """Resolve a customer by account_number or legacy ID. Returns (customer_dict, meter_dict, account_number)."""
-    customer = None
-    meter = None
-    account_number = ""
+# One round-trip: the customer, the account to commission (the one asked for,
+# else the customer's newest) and that account's newest meter. Only the
+# columns the commission form / execute use are fetched; the meter comes
+# back as a JSON object so its columns can't collide with the customer's.
+_COMMISSION_CUSTOMER_COLS = (
+    "c.id, c.customer_id_legacy, c.first_name, c.last_name, c.phone, "
+    "c.cell_phone_1, c.national_id, c.community, c.customer_position, "
+    "c.gps_lat, c.gps_lon, c.date_service_connected"
+)
 
-    is_account = bool(re.match(r"^\d{3,4}[A-Za-z]{2,4}$", identifier.strip()))
+_RESOLVE_CUSTOMER_SQL = """
+    WITH c AS ({source})
+    SELECT c.*, acct.account_number AS _commission_account,
+           (SELECT json_build_object('meter_id', m.meter_id, 'community', m.community)
+              FROM meters m
+             WHERE m.account_number = acct.account_number
+             ORDER BY m.customer_connect_date DESC NULLS LAST
+             LIMIT 1) AS _commission_meter
+    FROM c
+    CROSS JOIN LATERAL (SELECT {account} AS account_number) acct
+    LIMIT 1
+"""
 
-    if is_account:
-        account_number = identifier.strip().upper()
-        cursor.execute(
-            "SELECT c.* FROM accounts a "
-            "JOIN customers c ON a.customer_id = c.id "
-            "WHERE a.account_number = %s LIMIT 1",
-            (account_number,),
-        )
-        row = cursor.fetchone()
-        if row:
-            cols = [d[0] for d in cursor.description]
-            customer = dict(zip(cols, row))
-    else:
-        cursor.execute(
-            "SELECT * FROM customers WHERE customer_id_legacy = %s", (int(identifier),)
-        )
-        row = cursor.fetchone()
-        if row:
-            cols = [d[0] for d in cursor.description]
-            customer = dict(zip(cols, row))
+_RESOLVE_BY_ACCOUNT_SQL = _RESOLVE_CUSTOMER_SQL.format(
+    source=(
+        f"SELECT {_COMMISSION_CUSTOMER_COLS} FROM accounts a "
+        "JOIN customers c ON a.customer_id = c.id "
+        "WHERE a.account_number = %(account_number)s LIMIT 1"
+    ),
+    account="%(account_number)s::text",
+)
+
+_RESOLVE_BY_LEGACY_ID_SQL = _RESOLVE_CUSTOMER_SQL.format(
+    source=(
+        f"SELECT {_COMMISSION_CUSTOMER_COLS} FROM customers c "
+        "WHERE c.customer_id_legacy = %(legacy_id)s"
+    ),
+    account=(
+        "(SELECT a.account_number FROM accounts a WHERE a.customer_id = c.id "
+        "ORDER BY a.opened_date DESC NULLS LAST LIMIT 1)"
+    ),
+)
+
+
+# Both lookups run as server-side prepared statements (see pg_prepared), so
+# the form load and execute skip parse + plan on every call. Set
+# CC_COMMISSION_PREPARED=0 to send plain SQL, e.g. behind a transaction-mode
+# pooler that doesn't keep session state.
+USE_PREPARED = os.environ.get("CC_COMMISSION_PREPARED", "1") != "0"
+
+# parameter -> (statement name, SQL, parameter type)
+_RESOLVE_STMTS = {
+    "account_number": ("cc_commission_by_account", _RESOLVE_BY_ACCOUNT_SQL, "text"),
+    "legacy_id": ("cc_commission_by_legacy_id", _RESOLVE_BY_LEGACY_ID_SQL, "integer"),
+}
+
+
+def _execute_resolve(cursor, param: str, value) -> None:
+    name, sql, arg_type = _RESOLVE_STMTS[param]
+    if not USE_PREPARED:
+        cursor.execute(sql, {param: value})
+        return
+    from pg_prepared import execute_prepared, to_prepared_sql
+
+    execute_prepared(cursor.connection, cursor, name, to_prepared_sql(sql, (param,), {}),
+                     (arg_type,), (value,))
+
+
+def _resolve_customer_for_commission(cursor, identifier: str):
+    """Resolve a customer by account_number or legacy ID. Returns (customer_dict, meter_dict, account_number).
 
+    *cursor* must be a ``RealDictCursor``: the customer row is used as the dict.
+    """
+    if _ACCT_RE.match(identifier.strip()):
+        _execute_resolve(cursor, "account_number", identifier.strip().upper())
+    else:
+        _execute_resolve(cursor, "legacy_id", int(identifier))
+    customer = cursor.fetchone()
     if not customer:
         return None, None, ""
 
-    legacy_id = customer.get("customer_id_legacy")
+    account_number = str(customer.pop("_commission_account") or "")
+    meter = customer.pop("_commission_meter") or None
+    return customer, meter, account_number
 
-    # Resolve account_number if not already known
-    if not account_number:
-        try:
-            cursor.execute(
-                "SELECT a.account_number FROM accounts a "
-                "JOIN customers c ON a.customer_id = c.id "
-                "WHERE c.customer_id_legacy = %s ORDER BY a.opened_date DESC NULLS LAST LIMIT 1",
-                (legacy_id,),
-            )
-            arow = cursor.fetchone()
-            if arow:
-                account_number = str(arow[0])
-        except Exception:
-            pass
 
-    # Meter info via account_number
-    if account_number:
-        try:
-            cursor.execute(
-                "SELECT * FROM meters WHERE account_number = %s "
-                "ORDER BY customer_connect_date DESC NULLS LAST LIMIT 1",
-                (account_number,),
-            )
-            mrow = cursor.fetchone()
-            if mrow:
-                mcols = [d[0] for d in cursor.description]
-                meter = dict(zip(mcols, mrow))
-        except Exception:
-            pass
+class CommissionCustomer(BaseModel):
+    customer_id_legacy: Optional[int] = None
+    first_name: Optional[str] = ""
+    last_name: Optional[str] = ""
+    phone: Optional[str] = ""
+    national_id: Optional[str] = ""
+    concession: Optional[str] = ""
+    customer_type: Optional[str] = ""
+    gps_x: Any = ""
+    gps_y: Any = ""
+    date_connected: str = ""
+
+
+class CommissionMeter(BaseModel):
+    meter_id: Optional[str] = ""
+    community: Optional[str] = ""
+
+
+class CommissionContract(BaseModel):
+    """A stored contract PDF; the server-side ``path`` stays server-side."""
+    filename: str
+    lang: str
+    site_code: str
+    url: str
 
-    return customer, meter, account_number
 
+class CommissionPrefill(BaseModel):
+    customer: CommissionCustomer
+    meter: Optional[CommissionMeter] = None
+    account_number: str = ""
+    existing_contracts: List[CommissionContract] = []
 
-@router.get("/api/commission/customer/{identifier}")
-async def get_commission_data(identifier: str, user: CurrentUser = Depends(require_employee)):
+
+@router.get("/api/commission/customer/{identifier}", response_model=CommissionPrefill)
+def get_commission_data(identifier: str, user: CurrentUser = Depends(require_employee)):
     """Fetch customer + meter + account data for pre-populating the commission form.
     Accepts account_number (e.g. 0045MAK) or legacy numeric customer_id.
     """
     with _get_connection() as conn:
-        cursor = conn.cursor()
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
         customer, meter, account_number = _resolve_customer_for_commission(cursor, identifier)
         if not customer:
             raise HTTPException(status_code=404, detail="Customer not found")
@@ -191,39 +288,76 @@ async def get_commission_data(identifier: str, user: CurrentUser = Depends(requi
     if account_number:
         existing_contracts = list_customer_contracts(account_number)
 
-    return {
-        "customer": {
-            "customer_id_legacy": customer.get("customer_id_legacy"),
-            "first_name": customer.get("first_name", ""),
-            "last_name": customer.get("last_name", ""),
-            "phone": customer.get("phone", "") or customer.get("cell_phone_1", ""),
-            "national_id": customer.get("national_id", ""),
-            "concession": customer.get("community", ""),
-            "customer_type": customer.get("customer_position", ""),
-            "gps_x": customer.get("gps_lat", ""),
-            "gps_y": customer.get("gps_lon", ""),
-            "date_connected": str(customer.get("date_service_connected", "") or ""),
-        },
-        "meter": {
-            "meter_id": meter.get("meter_id", "") if meter else "",
-            "community": meter.get("community", "") if meter else "",
-        } if meter else None,
-        "account_number": account_number,
-        "existing_contracts": existing_contracts,
-    }
+    return CommissionPrefill(
+        customer=CommissionCustomer(
+            customer_id_legacy=customer.get("customer_id_legacy"),
+            first_name=customer.get("first_name", ""),
+            last_name=customer.get("last_name", ""),
+            phone=customer.get("phone", "") or customer.get("cell_phone_1", ""),
+            national_id=customer.get("national_id", ""),
+            concession=customer.get("community", ""),
+            customer_type=customer.get("customer_position", ""),
+            gps_x=customer.get("gps_lat", ""),
+            gps_y=customer.get("gps_lon", ""),
+            date_connected=str(customer.get("date_service_connected", "") or ""),
+        ),
+        meter=CommissionMeter(
+            meter_id=meter.get("meter_id", ""),
+            community=meter.get("community", ""),
+        ) if meter else None,
+        account_number=account_number,
+        existing_contracts=[CommissionContract(**c) for c in existing_contracts],
+    )
 
 
 # ---------------------------------------------------------------------------
 # POST /api/commission/execute
 # ---------------------------------------------------------------------------
 
+def _send_contract_sms_and_log(**kwargs: Any) -> None:
+    """Background task: SMS the contract links and log the outcome.
+
+    The gateway call itself retries throttling and connection errors, and
+    every attempt lands in ``sms_outbound_log`` under the account number
+    (trigger ``contract``), so a send that still failed can be found and
+    resent from there.
+    """
+    try:
+        if not send_contract_sms(**kwargs):
+            logger.warning("Contract SMS not sent for %s", kwargs.get("account_number"))
+    except Exception as exc:
+        logger.warning("Contract SMS for %s failed: %s", kwargs.get("account_number"), exc)
+
+
+# One fixed statement whatever the request carries: GPS the request leaves
+# out keeps the stored value.
+_COMMISSION_PROFILE_UPDATE_SQL = (
+    "UPDATE customers SET "
+    "date_service_connected = %(connected)s, "
+    "customer_position = %(customer_type)s, "
+    "national_id = %(national_id)s, "
+    "customer_commissioned = TRUE, "
+    "customer_commissioned_date = %(done_date)s, "
+    "contract_signed = TRUE, "
+    "contract_signed_date = %(done_date)s, "
+    "gps_lat = COALESCE(%(gps_lat)s, gps_lat), "
+    "gps_lon = COALESCE(%(gps_lon)s, gps_lon), "
+    "updated_at = NOW(), updated_by = %(updated_by)s "
+    "WHERE customer_id_legacy = %(legacy_id)s"
+)
+
+
 @router.post("/api/commission/execute")
-async def execute_commission(req: CommissionRequest, user: CurrentUser = Depends(require_employee)):
+def execute_commission(
+    req: CommissionRequest,
+    background_tasks: BackgroundTasks,
+    user: CurrentUser = Depends(require_employee),
+):
     """Execute customer commissioning:
     1. Resolve customer (read-only)
     2. Generate bilingual contract PDFs (if this fails, no DB changes — avoids orphan state)
     3. Single PostgreSQL transaction: profile fields + customer_commissioned + contract_signed
-    4. SMS download links to customer
+    4. SMS download links to customer (background task, after the response)
     5. uGridPlan sync (non-blocking)
 
     RCA note: Previously we committed profile updates before PDFs, then ran a second
@@ -234,7 +368,7 @@ async def execute_commission(req: CommissionRequest, user: CurrentUser = Depends
 
     # ----- Phase 1: Resolve customer (no writes — keeps DB unchanged if PDF fails) ----- #
     with _get_connection() as conn:
-        cursor = conn.cursor()
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
 
         customer, _, resolved_acct = _resolve_customer_for_commission(
             cursor, req.account_number or str(req.customer_id or "")
@@ -268,90 +402,144 @@ async def execute_commission(req: CommissionRequest, user: CurrentUser = Depends
         )
 
     # ----- Phase 3: Persist commissioning in one transaction (migration 010 columns) ----- #
+    # The profile update, gateway association and survey_id binding commit
+    # together (one pooled connection, one transaction); SMS / uGridPLAN /
+    # SparkMeter calls run after it is returned so they don't hold a pool slot.
+    acct = resolved_acct or req.account_number
+    done_day = _commissioning_done_date(req.connection_date)
     try:
-        done_day = _commissioning_done_date(req.connection_date)
-        try:
-            done_date = date.fromisoformat(done_day)
-        except ValueError:
-            done_date = datetime.utcnow().date()
-
-        row_updates: Dict[str, Any] = {
-            "date_service_connected": req.connection_date,
-            "customer_position": req.customer_type,
-            "national_id": req.national_id,
-            "customer_commissioned": True,
-            "customer_commissioned_date": done_date,
-            "contract_signed": True,
-            "contract_signed_date": done_date,
-        }
-        if req.gps_lat:
-            row_updates["gps_lat"] = req.gps_lat
-        if req.gps_lng:
-            row_updates["gps_lon"] = req.gps_lng
+        done_date = date.fromisoformat(done_day)
+    except ValueError:
+        done_date = datetime.utcnow().date()
+
+    profile_params = {
+        "connected": req.connection_date,
+        "customer_type": req.customer_type,
+        "national_id": req.national_id,
+        "done_date": done_date,
+        "gps_lat": req.gps_lat or None,
+        "gps_lon": req.gps_lng or None,
+        "updated_by": user.user_id,
+        "legacy_id": legacy_id,
+    }
 
-        set_clause = ", ".join(f"{k} = %s" for k in row_updates.keys())
-        values = list(row_updates.values()) + [user.user_id, legacy_id]
-        with _get_connection() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                f"UPDATE customers SET {set_clause}, updated_at = NOW(), updated_by = %s "
-                f"WHERE customer_id_legacy = %s",
-                values,
+    # Prefer explicit picker selection, fall back to resolution chain
+    survey_id: Optional[str] = (req.survey_id or "").strip() or None
+    if not survey_id:
+        try:
+            survey_id = _resolve_ugp_survey_id(
+                legacy_id, req.account_number, req.site_code
             )
+        except Exception as exc:
+            logger.warning("UGP Survey_ID resolution failed for %s: %s", req.account_number, exc)
+
+    gateway_associated = False
+    survey_bound = False
+    ugp_meter_serial = ""
+    sm_meter_serial: Optional[str] = None
+    with _get_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(_COMMISSION_PROFILE_UPDATE_SQL, profile_params)
             if not cur.rowcount:
-                conn.rollback()
                 raise RuntimeError("customer row not found after contract generation")
+
+            # ----- Phase 3b: Associate gateway Thing with customer (no renaming) ----- #
+            # Optional steps run under a savepoint: their failure is logged
+            # and rolled back without losing the commissioning itself.
+            if req.gateway_thing_name:
+                gw_thing = req.gateway_thing_name.strip()
+                cur.execute("SAVEPOINT commission_step")
+                try:
+                    cur.execute(
+                        "UPDATE meter_provisioning SET account_number = %s, updated_at = NOW() "
+                        "WHERE thing_name = %s AND (account_number IS NULL OR account_number = '')",
+                        (acct, gw_thing),
+                    )
+                    gateway_associated = cur.rowcount > 0
+                    cur.execute("RELEASE SAVEPOINT commission_step")
+                except Exception as exc:
+                    cur.execute("ROLLBACK TO SAVEPOINT commission_step")
+                    logger.warning("Gateway association failed for %s: %s", gw_thing, exc)
+
+            # Persist the UGP binding on the account row
+            if survey_id:
+                cur.execute("SAVEPOINT commission_step")
+                try:
+                    cur.execute(
+                        "UPDATE accounts SET survey_id = %s "
+                        "WHERE account_number = %s AND (survey_id IS NULL OR survey_id = '')",
+                        (survey_id, req.account_number),
+                    )
+                    survey_bound = cur.rowcount > 0
+                    cur.execute("RELEASE SAVEPOINT commission_step")
+                except Exception as pe:
+                    cur.execute("ROLLBACK TO SAVEPOINT commission_step")
+                    logger.warning("Could not persist survey_id binding for %s: %s", req.account_number, pe)
+
             conn.commit()
-            logger.info(
-                "Commissioning complete for %s (legacy %s): profile + flags",
-                resolved_acct or req.account_number,
+        except Exception as exc:
+            conn.rollback()
+            logger.error(
+                "Persist commissioning after PDF failed (legacy_id=%s): %s",
                 legacy_id,
+                exc,
+                exc_info=True,
             )
-    except Exception as exc:
-        logger.error(
-            "Persist commissioning after PDF failed (legacy_id=%s): %s",
+            raise HTTPException(
+                status_code=500,
+                detail=(
+                    "Contracts were generated but the customer record could not be updated. "
+                    f"Apply migration 010_customers_commissioning_contract_flags.sql if needed. "
+                    f"Detail: {exc}"
+                ),
+            )
+        # One line per commission: profile + flags, plus whatever optional
+        # steps stuck.
+        logger.info(
+            "Commissioning complete for %s (legacy %s): profile + flags, gateway=%s, survey_id=%s",
+            acct,
             legacy_id,
-            exc,
-            exc_info=True,
-        )
-        raise HTTPException(
-            status_code=500,
-            detail=(
-                "Contracts were generated but the customer record could not be updated. "
-                f"Apply migration 010_customers_commissioning_contract_flags.sql if needed. "
-                f"Detail: {exc}"
-            ),
+            req.gateway_thing_name if gateway_associated else None,
+            survey_id if survey_bound else None,
         )
+        if survey_bound:
+            _invalidate_ugp_survey_id(req.account_number)
+        _forget_customer_account(legacy_id)
 
-    en_url = build_download_url(result["site_code"], result["en_filename"])
-    so_url = build_download_url(result["site_code"], result["so_filename"])
-
-    # ----- Phase 3b: Associate gateway Thing with customer (no renaming) ----- #
-    gateway_associated = False
-    if req.gateway_thing_name:
-        gw_thing = req.gateway_thing_name.strip()
+        # Meter serials for the uGridPLAN connection update and SparkMeter sync
         try:
-            with _get_connection() as gw_conn:
-                gw_cur = gw_conn.cursor()
-                gw_cur.execute(
-                    "UPDATE meter_provisioning SET account_number = %s, updated_at = NOW() "
-                    "WHERE thing_name = %s AND (account_number IS NULL OR account_number = '')",
-                    (resolved_acct or req.account_number, gw_thing),
-                )
-                gateway_associated = gw_cur.rowcount > 0
-                if gateway_associated:
-                    logger.info(
-                        "Gateway %s associated with account %s during commissioning",
-                        gw_thing, resolved_acct or req.account_number,
-                    )
-                gw_conn.commit()
+            cur.execute(
+                "SELECT meter_id FROM meters WHERE account_number = %s "
+                "ORDER BY updated_at DESC NULLS LAST LIMIT 1",
+                (req.account_number,),
+            )
+            mrow = cur.fetchone()
+            if mrow:
+                ugp_meter_serial = str(mrow[0] or "")
+            cur.execute(
+                """
+                SELECT meter_id FROM meters
+                 WHERE account_number = %s AND status = 'active'
+                 ORDER BY updated_at DESC NULLS LAST
+                 LIMIT 1
+                """,
+                (acct,),
+            )
+            mr = cur.fetchone()
+            if mr and mr[0]:
+                sm_meter_serial = str(mr[0]).strip() or None
         except Exception as exc:
-            logger.warning("Gateway association failed for %s: %s", gw_thing, exc)
+            logger.warning("Meter lookup after commissioning failed for %s: %s", acct, exc)
 
-    # ----- Phase 4: SMS to customer ----- #
-    sms_sent = False
-    try:
-        sms_sent = send_contract_sms(
+    en_url = build_download_url(result["site_code"], result["en_filename"])
+    so_url = build_download_url(result["site_code"], result["so_filename"])
+
+    # ----- Phase 4: SMS to customer (after the response is sent) ----- #
+    sms_queued = bool((req.phone_number or "").strip())
+    if sms_queued:
+        background_tasks.add_task(
+            _send_contract_sms_and_log,
             first_name=first_name,
             last_name=last_name,
             phone_number=req.phone_number,
@@ -359,115 +547,70 @@ async def execute_commission(req: CommissionRequest, user: CurrentUser = Depends
             so_url=so_url,
             account_number=req.account_number,
         )
-    except Exception as exc:
-        logger.warning("SMS delivery failed: %s", exc)
-
-    # ----- Phase 5: Sync to uGridPLAN ----- #
-    ugp_sync_result: Optional[Dict[str, Any]] = None
-    survey_id: Optional[str] = None
-    try:
-        from sync_ugridplan import sync_commission_to_ugp
 
-        # Prefer explicit picker selection, fall back to resolution chain
-        survey_id = (req.survey_id or "").strip() or None
-        if not survey_id:
-            survey_id = _resolve_ugp_survey_id(
-                legacy_id, req.account_number, req.site_code
-            )
-        if survey_id:
-            # Look up meter serial for the connection update
-            meter_serial = ""
-            with _get_connection() as conn2:
-                cursor2 = conn2.cursor()
-                try:
-                    cursor2.execute(
-                        "SELECT meter_id FROM meters WHERE account_number = %s "
-                        "ORDER BY updated_at DESC NULLS LAST LIMIT 1",
-                        (req.account_number,),
-                    )
-                    mrow = cursor2.fetchone()
-                    if mrow:
-                        meter_serial = str(mrow[0] or "")
-                except Exception:
-                    pass
+    # ----- Phase 5: Sync to uGridPLAN and SparkMeter ----- #
+    # Independent HTTP calls: uGridPLAN runs on the pool while SparkMeter
+    # runs here, so the request waits for the slower one, not the sum.
+    def _ugp_sync() -> Optional[Dict[str, Any]]:
+        try:
+            from sync_ugridplan import sync_commission_to_ugp
 
-            ugp_sync_result = sync_commission_to_ugp(
+            if not survey_id:
+                logger.info(
+                    "No UGP Survey_ID found for %s (legacy %s) — skipping UGP sync",
+                    req.account_number, legacy_id,
+                )
+                return None
+            out = sync_commission_to_ugp(
                 site_code=req.site_code,
                 survey_id=survey_id,
                 connection_date=req.connection_date,
                 account_number=req.account_number,
-                meter_serial=meter_serial,
-            )
-            logger.info(
-                "UGP sync for %s (survey=%s): updated=%s, upstream_warnings=%d",
-                req.account_number, survey_id,
-                ugp_sync_result.get("ugp_updated"),
-                len(ugp_sync_result.get("upstream_warnings", [])),
+                meter_serial=ugp_meter_serial,
             )
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "UGP sync for %s (survey=%s): updated=%s, upstream_warnings=%d",
+                    req.account_number, survey_id,
+                    out.get("ugp_updated"),
+                    len(out.get("upstream_warnings", [])),
+                )
+            return out
+        except Exception as exc:
+            logger.warning("UGP sync failed (non-blocking): %s", exc)
+            return None
 
-            # Persist the binding on the account row
-            try:
-                with _get_connection() as conn3:
-                    cursor3 = conn3.cursor()
-                    cursor3.execute(
-                        "UPDATE accounts SET survey_id = %s "
-                        "WHERE account_number = %s AND (survey_id IS NULL OR survey_id = '')",
-                        (survey_id, req.account_number),
-                    )
-                    conn3.commit()
-            except Exception as pe:
-                logger.warning("Could not persist survey_id binding for %s: %s", req.account_number, pe)
-        else:
-            logger.info(
-                "No UGP Survey_ID found for %s (legacy %s) — skipping UGP sync",
-                req.account_number, legacy_id,
-            )
-    except Exception as exc:
-        logger.warning("UGP sync failed (non-blocking): %s", exc)
+    ugp_future = _sync_pool.submit(_ugp_sync)
 
     response: Dict[str, Any] = {
         "status": "ok",
         "customer_id": legacy_id,
-        "account_number": resolved_acct or req.account_number,
+        "account_number": acct,
         "contract_en_url": en_url,
         "contract_so_url": so_url,
         "en_filename": result["en_filename"],
         "so_filename": result["so_filename"],
-        "sms_sent": sms_sent,
+        "sms_queued": sms_queued,
         "gateway_associated": gateway_associated,
     }
-    acct_for_sm = resolved_acct or req.account_number
     try:
         from sparkmeter_customer import sync_sparkmeter_customer_and_meter
 
-        meter_serial: Optional[str] = None
-        with _get_connection() as smc:
-            curm = smc.cursor()
-            curm.execute(
-                """
-                SELECT meter_id FROM meters
-                 WHERE account_number = %s AND status = 'active'
-                 ORDER BY updated_at DESC NULLS LAST
-                 LIMIT 1
-                """,
-                (acct_for_sm,),
-            )
-            mr = curm.fetchone()
-            if mr and mr[0]:
-                meter_serial = str(mr[0]).strip() or None
         response["sm_sync"] = sync_sparkmeter_customer_and_meter(
-            acct_for_sm,
+            acct,
             f"{first_name} {last_name}".strip(),
-            meter_serial,
+            sm_meter_serial,
             phone=None,
         )
     except Exception as exc:
         logger.warning(
             "SparkMeter post-commission sync failed for %s: %s",
-            acct_for_sm,
+            acct,
             exc,
         )
         response["sm_sync"] = {"error": str(exc)}
+
+    ugp_sync_result = ugp_future.result()
     if ugp_sync_result:
         response["ugp_sync"] = {
             "updated": ugp_sync_result.get("ugp_updated", False),
@@ -483,7 +626,7 @@ async def execute_commission(req: CommissionRequest, user: CurrentUser = Depends
 # ---------------------------------------------------------------------------
 
 @router.post("/api/commission/decommission/{customer_id}")
-async def decommission_customer(customer_id: int, user: CurrentUser = Depends(require_employee)):
+def decommission_customer(customer_id: int, user: CurrentUser = Depends(require_employee)):
     """Decommission a customer (non-destructive).
 
     Sets date_service_terminated on customers table.  All meter, account,
@@ -493,84 +636,85 @@ async def decommission_customer(customer_id: int, user: CurrentUser = Depends(re
 
     Returns the customer's associated meters and accounts for reference.
     """
-    from datetime import datetime
-
     with _get_connection() as conn:
         cursor = conn.cursor()
 
-        # Verify the customer exists and is currently commissioned
-        cursor.execute(
-            "SELECT date_service_connected, date_service_terminated "
-            "FROM customers WHERE customer_id_legacy = %s",
-            (customer_id,),
-        )
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Customer not found")
-
-        connected = row[0]
-        terminated = row[1]
-        if not connected or (isinstance(connected, str) and not connected.strip()):
-            raise HTTPException(
-                status_code=400,
-                detail="Customer has not been commissioned (no date_service_connected).",
-            )
-        if terminated and str(terminated).strip():
-            raise HTTPException(
-                status_code=400,
-                detail="Customer is already terminated.",
-            )
-
-        # Collect associated records for the response (read-only)
+        # Collect associated records for the response (read-only), meters
+        # and accounts in one query
         meters: List[Dict[str, str]] = []
         accounts: List[Dict[str, str]] = []
 
         try:
             cursor.execute(
-                "SELECT m.meter_id, m.account_number, m.community "
+                "SELECT 'meter', m.meter_id, m.account_number, m.community "
                 "FROM meters m "
                 "JOIN accounts a ON m.account_number = a.account_number "
                 "JOIN customers c ON a.customer_id = c.id "
-                "WHERE c.customer_id_legacy = %s",
-                (customer_id,),
-            )
-            for mrow in cursor.fetchall():
-                meters.append({
-                    "meterid": str(mrow[0] or ""),
-                    "accountnumber": str(mrow[1] or ""),
-                    "community": str(mrow[2] or ""),
-                })
-        except Exception as e:
-            logger.warning("Could not query meters for decommission info: %s", e)
-
-        try:
-            cursor.execute(
-                "SELECT account_number, meter_id "
-                "FROM accounts WHERE customer_id = %s",
-                (customer_id,),
+                "WHERE c.customer_id_legacy = %(legacy_id)s "
+                "UNION ALL "
+                "SELECT 'account', a.account_number, a.meter_id, NULL "
+                "FROM accounts a "
+                "JOIN customers c ON a.customer_id = c.id "
+                "WHERE c.customer_id_legacy = %(legacy_id)s",
+                {"legacy_id": customer_id},
             )
-            for arow in cursor.fetchall():
-                accounts.append({
-                    "accountnumber": str(arow[0] or ""),
-                    "meterid": str(arow[1] or ""),
-                })
+            for kind, first, second, community in cursor.fetchall():
+                if kind == "meter":
+                    meters.append({
+                        "meterid": str(first or ""),
+                        "accountnumber": str(second or ""),
+                        "community": str(community or ""),
+                    })
+                else:
+                    accounts.append({
+                        "accountnumber": str(first or ""),
+                        "meterid": str(second or ""),
+                    })
         except Exception as e:
-            logger.warning("Could not query accounts for decommission info: %s", e)
+            conn.rollback()
+            logger.warning("Could not query meters/accounts for decommission info: %s", e)
 
-        # Set date_service_terminated — the only write operation
-        today = datetime.now().strftime("%Y-%m-%d")
+        # Set date_service_terminated — the only write operation. The
+        # commissioned / not-yet-terminated check rides on the UPDATE; only a
+        # refused one pays for a read to say why.
+        today = date.today()
         cursor.execute(
             "UPDATE customers SET date_service_terminated = %s "
-            "WHERE customer_id_legacy = %s",
+            "WHERE customer_id_legacy = %s "
+            "AND date_service_connected IS NOT NULL "
+            "AND date_service_terminated IS NULL "
+            "RETURNING date_service_connected",
             (today, customer_id),
         )
+        row = cursor.fetchone()
+        if not row:
+            conn.rollback()
+            cursor.execute(
+                "SELECT date_service_terminated FROM customers "
+                "WHERE customer_id_legacy = %s",
+                (customer_id,),
+            )
+            state = cursor.fetchone()
+            if not state:
+                raise HTTPException(status_code=404, detail="Customer not found")
+            if state[0] is not None:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Customer is already terminated.",
+                )
+            raise HTTPException(
+                status_code=400,
+                detail="Customer has not been commissioned (no date_service_connected).",
+            )
+        connected = row[0]
         conn.commit()
+        _forget_customer_account(customer_id)
         logger.info("Decommissioned customer %d: date_service_terminated = %s", customer_id, today)
 
     return {
         "status": "ok",
         "customer_id": customer_id,
-        "terminated_date": today,
+        "terminated_date": today.isoformat(),
         "connected_date": str(connected or ""),
         "meters": meters,
         "accounts": accounts,
@@ -581,25 +725,115 @@ async def decommission_customer(customer_id: int, user: CurrentUser = Depends(re
 # GET /api/contracts/download/{site_code}/{filename}  (PUBLIC – no auth)
 # ---------------------------------------------------------------------------
 
+def _contract_etag(st: os.stat_result) -> str:
+    """Strong validator from the stat alone (inode, mtime, size); changes when
+    a re-commission regenerates the file under the same name."""
+    return f'"{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+# Bodies of recently served contracts. SMS links get opened more than once,
+# often from a browser holding no copy to revalidate; contracts are ~30 KB,
+# so a few dozen MB covers every recent one. Each hit is checked against
+# the fresh stat (a re-commission rewrites the same filename). Least
+# recently served go first past CC_CONTRACT_PDF_CACHE_MB; 0 disables.
+CONTRACT_PDF_CACHE_BYTES = int(float(os.environ.get("CC_CONTRACT_PDF_CACHE_MB", "32")) * 1024 * 1024)
+# path -> (etag, body)
+_pdf_body_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_pdf_body_cache_size = 0
+_pdf_body_cache_lock = threading.Lock()
+
+
+def _contract_pdf_body(path: str, st: os.stat_result, etag: str) -> Optional[bytes]:
+    """The PDF's bytes from the cache or disk, or None to stream it from disk
+    (cache disabled, or the file is too big to be worth holding)."""
+    global _pdf_body_cache_size
+    if st.st_size > CONTRACT_PDF_CACHE_BYTES // 8:
+        return None
+    with _pdf_body_cache_lock:
+        hit = _pdf_body_cache.get(path)
+        if hit and hit[0] == etag:
+            _pdf_body_cache.move_to_end(path)
+            return hit[1]
+
+    with open(path, "rb") as f:
+        body = f.read()
+    if len(body) != st.st_size:
+        return body  # rewritten since the stat: serve it, don't cache it
+
+    with _pdf_body_cache_lock:
+        old = _pdf_body_cache.pop(path, None)
+        if old:
+            _pdf_body_cache_size -= len(old[1])
+        _pdf_body_cache[path] = (etag, body)
+        _pdf_body_cache_size += len(body)
+        while _pdf_body_cache_size > CONTRACT_PDF_CACHE_BYTES:
+            _, (_, evicted) = _pdf_body_cache.popitem(last=False)
+            _pdf_body_cache_size -= len(evicted)
+    return body
+
+
+def _not_modified(request: Request, etag: str, st: os.stat_result) -> bool:
+    """If-None-Match when sent (it takes precedence), else If-Modified-Since."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in (t.strip() for t in if_none_match.split(","))
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have whole-second resolution
+        return int(st.st_mtime) <= since
+    return False
+
+
 @router.get("/api/contracts/download/{site_code}/{filename}")
-async def download_contract(site_code: str, filename: str):
+def download_contract(site_code: str, filename: str, request: Request):
     """Public endpoint for customers to download their contract PDF via SMS link.
     No authentication required.
+
+    Stats the file once; a repeat download whose If-None-Match (or
+    If-Modified-Since) still matches gets a 304 without the PDF. Otherwise
+    the body comes from the in-memory cache when it still matches the stat.
     """
-    # Sanitize to prevent path traversal
-    safe_site = os.path.basename(site_code)
-    safe_name = os.path.basename(filename)
+    # Whitelist the segments (also rules out path traversal)
+    if not _CONTRACT_SITE_RE.fullmatch(site_code) or not _CONTRACT_FILE_RE.fullmatch(filename):
+        raise HTTPException(status_code=404, detail="Contract not found")
 
-    file_path = os.path.join(CONTRACTS_DIR, safe_site, safe_name)
+    file_path = os.path.join(CONTRACTS_DIR, site_code, filename)
 
-    if not os.path.isfile(file_path):
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
         raise HTTPException(status_code=404, detail="Contract not found")
 
+    etag = _contract_etag(st)
+    # private: contracts carry personal data, so no shared/CDN caching; and
+    # not immutable, since a re-commission rewrites the same filename.
+    cache_headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+        "Cache-Control": "private, max-age=3600",
+    }
+    if _not_modified(request, etag, st):
+        return Response(status_code=304, headers=cache_headers)
+
+    headers = {"Content-Disposition": f'inline; filename="{filename}"', **cache_headers}
+    try:
+        body = _contract_pdf_body(file_path, st, etag)
+    except OSError:
+        raise HTTPException(status_code=404, detail="Contract not found")
+    if body is not None:
+        return Response(body, media_type="application/pdf", headers=headers)
     return FileResponse(
         file_path,
         media_type="application/pdf",
-        filename=safe_name,
-        headers={"Content-Disposition": f'inline; filename="{safe_name}"'},
+        filename=filename,
+        stat_result=st,
+        headers=headers,
     )
 
 
@@ -607,45 +841,66 @@ async def download_contract(site_code: str, filename: str):
 # GET /api/commission/contracts/{customer_id}  (authenticated)
 # ---------------------------------------------------------------------------
 
-@router.get("/api/commission/contracts/{identifier}")
-async def list_contracts_for_customer(identifier: str, user: CurrentUser = Depends(require_employee)):
+# Legacy customer id -> newest account number, for contract listings by
+# customer id (the customer detail page re-lists on every load). Commission
+# and decommission here drop the entry; an account opened or moved elsewhere
+# shows up within CC_CONTRACT_ACCOUNT_TTL_S. Customers without an account
+# aren't cached.
+CONTRACT_ACCOUNT_TTL_S = float(os.environ.get("CC_CONTRACT_ACCOUNT_TTL_S", "300"))
+_ACCOUNT_BY_CUSTOMER_MAX = 50_000
+# customer_id_legacy -> (monotonic stored, account_number)
+_account_by_customer: Dict[int, tuple] = {}
+_account_by_customer_lock = threading.Lock()
+
+
+def _forget_customer_account(customer_id: int) -> None:
+    with _account_by_customer_lock:
+        _account_by_customer.pop(customer_id, None)
+
+
+def _resolve_account_number(customer_id: int) -> str:
+    """Newest account number for a legacy customer id ("" if none)."""
+    now = time.monotonic()
+    with _account_by_customer_lock:
+        hit = _account_by_customer.get(customer_id)
+    if hit and now - hit[0] < CONTRACT_ACCOUNT_TTL_S:
+        return hit[1]
+
+    # No meters fallback: meters.customer_id_legacy was dropped in
+    # migration 001, so that query could only ever fail.
+    account_number = ""
+    with _get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT a.account_number FROM accounts a "
+                "JOIN customers c ON a.customer_id = c.id "
+                "WHERE c.customer_id_legacy = %s ORDER BY a.opened_date DESC NULLS LAST LIMIT 1",
+                (customer_id,),
+            )
+            row = cursor.fetchone()
+            if row:
+                account_number = str(row[0])
+        except Exception:
+            pass
+
+    if account_number and CONTRACT_ACCOUNT_TTL_S > 0:
+        with _account_by_customer_lock:
+            if len(_account_by_customer) >= _ACCOUNT_BY_CUSTOMER_MAX:
+                _account_by_customer.clear()
+            _account_by_customer[customer_id] = (now, account_number)
+    return account_number
+
+
+@router.get("/api/commission/contracts/{identifier}", response_class=FastJSONResponse)
+def list_contracts_for_customer(identifier: str, user: CurrentUser = Depends(require_employee)):
     """List all contract files on disk for a given customer.
     Accepts account_number (e.g. 0045MAK) or legacy numeric customer_id.
     """
-    import re
-    is_account = bool(re.match(r"^\d{3,4}[A-Za-z]{2,4}$", identifier.strip()))
-
-    if is_account:
+    if _ACCT_RE.match(identifier.strip()):
         account_number = identifier.strip().upper()
     else:
-        account_number = ""
-        customer_id = int(identifier)
-        with _get_connection() as conn:
-            cursor = conn.cursor()
-            try:
-                cursor.execute(
-                    "SELECT a.account_number FROM accounts a "
-                    "JOIN customers c ON a.customer_id = c.id "
-                    "WHERE c.customer_id_legacy = %s ORDER BY a.opened_date DESC NULLS LAST LIMIT 1",
-                    (customer_id,),
-                )
-                row = cursor.fetchone()
-                if row:
-                    account_number = str(row[0])
-            except Exception:
-                pass
-            if not account_number:
-                try:
-                    cursor.execute(
-                        "SELECT account_number FROM meters "
-                        "WHERE customer_id_legacy = %s ORDER BY customer_connect_date DESC NULLS LAST LIMIT 1",
-                        (customer_id,),
-                    )
-                    row = cursor.fetchone()
-                    if row:
-                        account_number = str(row[0])
-                except Exception:
-                    pass
+        account_number = _resolve_account_number(int(identifier))
 
     if not account_number:
         return {"contracts": [], "account_number": ""}
@@ -669,7 +924,7 @@ class BulkStatusRequest(BaseModel):
     updates: List[BulkStatusItem]
 
 
-COMMISSIONING_STEPS = {
+COMMISSIONING_STEPS = frozenset({
     "connection_fee_paid",
     "readyboard_fee_paid",
     "readyboard_tested",
@@ -677,54 +932,81 @@ COMMISSIONING_STEPS = {
     "airdac_connected",
     "meter_installed",
     "customer_commissioned",
+})
+
+# Per-step batched UPDATE (the step names the flag column and its _date
+# column), built once rather than per request.
+_BULK_STEP_SQL = {
+    step: (
+        f"UPDATE customers AS c SET {step} = d.v, {step}_date = d.dt, "
+        f"updated_at = NOW(), updated_by = d.u "
+        f"FROM (VALUES %s) AS d(v, dt, u, id) "
+        f"WHERE c.customer_id_legacy = d.id "
+        f"RETURNING c.customer_id_legacy"
+    )
+    for step in COMMISSIONING_STEPS
 }
 
 
-@router.post("/api/commission/bulk-status")
+@router.post("/api/commission/bulk-status", response_class=FastJSONResponse)
 def bulk_update_commissioning_status(
     req: BulkStatusRequest,
     user: CurrentUser = Depends(require_employee),
 ):
     """Bulk update commissioning step flags for multiple customers.
 
+    One ``UPDATE ... FROM (VALUES ...)`` per step (the step names the
+    column), each under its own savepoint so a failing step doesn't discard
+    the others. Repeated (step, customer) pairs keep the last item.
+
     Replaces VBA: retrievecustomerstatus.bas, updatecommissioning.bas
     """
+    errors = []
+    by_step: Dict[str, Dict[int, BulkStatusItem]] = {}
+    for item in req.updates:
+        if item.step not in COMMISSIONING_STEPS:
+            errors.append({
+                "customer_id": item.customer_id,
+                "error": f"Invalid step: {item.step}",
+            })
+            continue
+        by_step.setdefault(item.step, {})[item.customer_id] = item
+
+    now_iso = datetime.now().isoformat()
+    updated = 0
     with _get_connection() as conn:
         cursor = conn.cursor()
-        updated = 0
-        errors = []
-
-        for item in req.updates:
-            if item.step not in COMMISSIONING_STEPS:
-                errors.append({
-                    "customer_id": item.customer_id,
-                    "error": f"Invalid step: {item.step}",
-                })
-                continue
-
-            date_col = f"{item.step}_date"
-
+        for step, items in by_step.items():
+            rows = [
+                (item.value, item.date or now_iso, user.user_id, cid)
+                for cid, item in items.items()
+            ]
+            cursor.execute("SAVEPOINT bulk_step")
             try:
-                cursor.execute(
-                    f"UPDATE customers SET {item.step} = %s, {date_col} = %s, "
-                    f"updated_at = NOW(), updated_by = %s "
-                    f"WHERE customer_id_legacy = %s",
-                    (item.value, item.date or datetime.now().isoformat(),
-                     user.user_id, item.customer_id),
+                found = psycopg2.extras.execute_values(
+                    cursor,
+                    _BULK_STEP_SQL[step],
+                    rows,
+                    template="(%s::boolean, %s::timestamp, %s, %s::integer)",
+                    page_size=1000,
+                    fetch=True,
                 )
-                if cursor.rowcount > 0:
+                cursor.execute("RELEASE SAVEPOINT bulk_step")
+            except Exception as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT bulk_step")
+                errors.extend(
+                    {"customer_id": cid, "error": str(e)} for cid in items
+                )
+                continue
+            found_ids = {r[0] for r in found}
+            for cid in items:
+                if cid in found_ids:
                     updated += 1
                 else:
                     errors.append({
-                        "customer_id": item.customer_id,
+                        "customer_id": cid,
                         "error": "Customer not found",
                     })
-            except Exception as e:
-                errors.append({
-                    "customer_id": item.customer_id,
-                    "error": str(e),
-                })
-                conn.rollback()
 
         conn.commit()
 
@@ -739,8 +1021,46 @@ def bulk_update_commissioning_status(
 # UGP Survey_ID resolution
 # ---------------------------------------------------------------------------
 
+# Resolved Survey_IDs, reused for CC_UGP_SURVEY_ID_TTL_S (retries and
+# re-commissioning resolve the same customer again). Misses aren't cached,
+# so a binding made elsewhere is picked up on the next call; a cached
+# derived ID can lag a new explicit binding by at most the TTL.
+UGP_SURVEY_ID_TTL_S = float(os.environ.get("CC_UGP_SURVEY_ID_TTL_S", "300"))
+_UGP_SURVEY_ID_CACHE_MAX = 4096
+# (customer_id, account_number, site_code) -> (monotonic stored, survey_id)
+_survey_id_cache: Dict[tuple, tuple] = {}
+_survey_id_cache_lock = threading.Lock()
+
+
+def _invalidate_ugp_survey_id(account_number: str) -> None:
+    """Drop cached Survey_IDs for *account_number* (its binding changed)."""
+    with _survey_id_cache_lock:
+        for key in [k for k in _survey_id_cache if k[1] == account_number]:
+            del _survey_id_cache[key]
+
+
 def _resolve_ugp_survey_id(
     customer_id: int, account_number: str, site_code: str
+) -> Optional[str]:
+    """Cached front for :func:`_lookup_ugp_survey_id`."""
+    key = (customer_id, account_number, site_code)
+    now = time.monotonic()
+    with _survey_id_cache_lock:
+        hit = _survey_id_cache.get(key)
+    if hit and now - hit[0] < UGP_SURVEY_ID_TTL_S:
+        return hit[1]
+
+    survey_id = _lookup_ugp_survey_id(customer_id, account_number, site_code)
+    if survey_id and UGP_SURVEY_ID_TTL_S > 0:
+        with _survey_id_cache_lock:
+            if len(_survey_id_cache) >= _UGP_SURVEY_ID_CACHE_MAX:
+                _survey_id_cache.clear()
+            _survey_id_cache[key] = (now, survey_id)
+    return survey_id
+
+
+def _lookup_ugp_survey_id(
+    customer_id: int, account_number: str, site_code: str
 ) -> Optional[str]:
     """Resolve the uGridPLAN Survey_ID for a customer.
 
@@ -751,23 +1071,27 @@ def _resolve_ugp_survey_id(
     3. Derive from account_number (e.g. "0045MAK" → "MAK 0045")
     """
     from db_auth import get_auth_db
-    import re
+
+    # Strategies 0 and 2 both read PostgreSQL: one checkout, one query, then
+    # applied in priority order around the SQLite lookup.
+    bound = plot = None
+    try:
+        with _get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT (SELECT survey_id FROM accounts "
+                "        WHERE account_number = %s AND survey_id IS NOT NULL LIMIT 1), "
+                "       (SELECT plot_number FROM customers "
+                "        WHERE customer_id_legacy = %s LIMIT 1)",
+                (account_number or None, customer_id),
+            )
+            bound, plot = cursor.fetchone()
+    except Exception:
+        pass
 
     # Strategy 0: Explicit binding stored on the account row
-    if account_number:
-        try:
-            with _get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT survey_id FROM accounts "
-                    "WHERE account_number = %s AND survey_id IS NOT NULL",
-                    (account_number,),
-                )
-                row = cursor.fetchone()
-                if row and row[0]:
-                    return str(row[0]).strip()
-        except Exception:
-            pass
+    if bound:
+        return str(bound).strip()
 
     # Strategy 1: SQLite metadata from previous UGP sync
     try:
@@ -783,24 +1107,14 @@ def _resolve_ugp_survey_id(
         pass
 
     # Strategy 2: Derive from plot_number in PostgreSQL
-    try:
-        with _get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT plot_number FROM customers WHERE customer_id_legacy = %s",
-                (customer_id,),
-            )
-            row = cursor.fetchone()
-            if row and row[0]:
-                plot = str(row[0]).strip()
-                if plot and plot.lower() != "none":
-                    return plot
-    except Exception:
-        pass
+    if plot:
+        plot = str(plot).strip()
+        if plot and plot.lower() != "none":
+            return plot
 
     # Strategy 3: Derive from account_number (e.g. "0045MAK" → "MAK 0045 HH")
     if account_number and site_code:
-        m = re.match(r"^(\d{3,4})([A-Za-z]{2,4})$", account_number.strip())
+        m = _ACCT_RE.match(account_number.strip())
         if m:
             number = m.group(1)
             code = m.group(2).upper()
@@ -819,7 +1133,7 @@ class EnergizeUpstreamRequest(BaseModel):
 
 
 @router.post("/api/commission/energize-upstream")
-async def energize_upstream(
+def energize_upstream(
     req: EnergizeUpstreamRequest,
     user: CurrentUser = Depends(require_employee),
 ):
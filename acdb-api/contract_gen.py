@@ -12,12 +12,18 @@ the 1PWR SMS gateway.
 import base64
 import json
 import logging
+import multiprocessing
 import os
 import re
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import date
 from os.path import join
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from urllib.parse import quote
 import jinja2
 import requests
@@ -155,8 +161,8 @@ def generate_contract(
     en_path = os.path.join(site_dir, en_filename)
     so_path = os.path.join(site_dir, so_filename)
 
-    _html_to_pdf(html_en, en_path)
-    _html_to_pdf(html_so, so_path)
+    _render_pdfs([(html_en, en_path), (html_so, so_path)])
+    invalidate_customer_contracts(account_number)
 
     logger.info("Generated contracts: %s, %s", en_path, so_path)
 
@@ -188,6 +194,106 @@ def _html_to_pdf(html_source: str, output_path: str) -> bool:
     return not status.err
 
 
+# xhtml2pdf is pure Python, so EN and SO can only render side by side in
+# separate processes (threads would take turns on the GIL). Opt-in with
+# CC_CONTRACT_PDF_PROCS=2 on multi-core hosts: workers are spawned, and a
+# spawned worker re-imports the launching script -- harmless under the
+# uvicorn launcher, but ``python customer_api.py`` would re-run the app's
+# startup in each one, so the pool stays off under that launcher. 0
+# (default) renders inline; the API units set 2 (unit / deploy drop-in).
+PDF_PROCS = int(os.environ.get("CC_CONTRACT_PDF_PROCS", "0"))
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _pdf_worker_init() -> None:
+    """Pay the xhtml2pdf import in each worker before its first contract."""
+    try:
+        import io
+        from xhtml2pdf import pisa
+
+        pisa.CreatePDF(src="<p></p>", dest=io.BytesIO())
+    except Exception:
+        pass
+
+
+def _launched_as_script() -> bool:
+    """True under ``python customer_api.py``, whose module-level startup each
+    spawned worker would repeat."""
+    main_file = getattr(sys.modules.get("__main__"), "__file__", None) or ""
+    return os.path.basename(main_file) == "customer_api.py"
+
+
+def _get_pdf_pool() -> Optional[ProcessPoolExecutor]:
+    global _pdf_pool
+    if PDF_PROCS <= 0 or _launched_as_script():
+        return None
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=PDF_PROCS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_pdf_worker_init,
+            )
+        return _pdf_pool
+
+
+def _render_pdfs(jobs: List[Tuple[str, str]]) -> None:
+    """Render each ``(html_source, output_path)``, in parallel on the worker
+    pool when it's enabled. A broken pool (worker killed) is dropped and the
+    batch rendered inline; the next call starts a fresh pool."""
+    global _pdf_pool
+    pool = _get_pdf_pool()
+    if pool is not None:
+        try:
+            futures = [pool.submit(_html_to_pdf, html, path) for html, path in jobs]
+            for fut in futures:
+                fut.result()
+            return
+        except BrokenProcessPool as exc:
+            logger.warning("Contract PDF worker pool broke (%s); rendering inline", exc)
+            with _pdf_pool_lock:
+                if _pdf_pool is pool:
+                    _pdf_pool = None
+            pool.shutdown(wait=False)
+    for html, path in jobs:
+        _html_to_pdf(html, path)
+
+
+_pdf_warm_scheduled = False
+
+
+def warm_pdf_renderer() -> None:
+    """Import xhtml2pdf and compile the contract templates in the background.
+
+    The first contract after a restart otherwise pays ~0.5 s of xhtml2pdf /
+    ReportLab import and font setup inside the commission request; a steady
+    render is ~0.15 s per PDF.
+    """
+    global _pdf_warm_scheduled
+    if _pdf_warm_scheduled:
+        return
+    _pdf_warm_scheduled = True
+
+    def _warm():
+        try:
+            import io
+            from xhtml2pdf import pisa
+
+            _commission_contract_templates()
+            pisa.CreatePDF(src="<p></p>", dest=io.BytesIO())
+            pool = _get_pdf_pool()
+            if pool is not None:
+                # Start (and so warm) every worker now rather than on the
+                # first contract.
+                for fut in [pool.submit(int) for _ in range(PDF_PROCS)]:
+                    fut.result()
+        except Exception as exc:
+            logger.warning("Contract PDF renderer warm-up failed: %s", exc)
+
+    threading.Thread(target=_warm, name="pdf-warm", daemon=True).start()
+
+
 def _safe_name(name: str) -> str:
     """Sanitize a name for use in filenames."""
     return re.sub(r"[^\w\-]", "", name.strip().replace(" ", "_"))
@@ -255,7 +361,7 @@ def send_contract_sms(
     )
 
     ok = send_gateway_sms(phone_number, message, sms_type="welcome",
-                          trigger="contract")
+                          account_number=account_number, trigger="contract")
     if ok and account_number:
         try:
             from app_notifications import mirror_to_app
@@ -275,22 +381,85 @@ def send_contract_sms(
 # Contract file listing (for customer detail page)
 # ---------------------------------------------------------------------------
 
+# Directory listings keyed on the directory's mtime: adding, removing or
+# renaming an entry bumps it, so a listing is reused until the directory
+# actually changes -- whichever process (commissioning, ingest_contracts,
+# financing) wrote to it.
+_dir_scan_cache: Dict[str, Tuple[int, List[str]]] = {}
+_dir_scan_lock = threading.Lock()
+
+
+def _scan_dir_cached(path: str, scan: Callable[[str], List[str]]) -> List[str]:
+    mtime_ns = os.stat(path).st_mtime_ns
+    with _dir_scan_lock:
+        hit = _dir_scan_cache.get(path)
+    if hit and hit[0] == mtime_ns:
+        return hit[1]
+    names = scan(path)
+    with _dir_scan_lock:
+        _dir_scan_cache[path] = (mtime_ns, names)
+    return names
+
+
+def _site_dirs(path: str) -> List[str]:
+    return sorted(n for n in os.listdir(path) if os.path.isdir(os.path.join(path, n)))
+
+
+def _pdf_files(path: str) -> List[str]:
+    return sorted(n for n in os.listdir(path) if n.lower().endswith(".pdf"))
+
+
+# Per-account results on top of that, reused for CC_CONTRACT_LIST_TTL_S so a
+# hit skips even the per-site stats (0 disables). generate_contract drops the
+# account's entry; files other processes write show up once it expires.
+CONTRACT_LIST_TTL_S = float(os.environ.get("CC_CONTRACT_LIST_TTL_S", "30"))
+_CONTRACT_LIST_CACHE_MAX = 4096
+# account_number -> (monotonic stored, contracts)
+_contract_list_cache: Dict[str, Tuple[float, List[dict]]] = {}
+_contract_list_lock = threading.Lock()
+
+
+def invalidate_customer_contracts(account_number: str) -> None:
+    """Drop the cached listing for *account_number* (its files changed)."""
+    with _contract_list_lock:
+        _contract_list_cache.pop(account_number.upper(), None)
+
+
 def list_customer_contracts(account_number: str) -> list[dict]:
     """List all contract files on disk for a given account number.
 
     Returns list of dicts with: filename, lang, site_code, path, url
     """
+    acct = account_number.upper()
+    now = time.monotonic()
+    with _contract_list_lock:
+        hit = _contract_list_cache.get(acct)
+    if hit and now - hit[0] < CONTRACT_LIST_TTL_S:
+        return [dict(c) for c in hit[1]]
+
+    results = _scan_customer_contracts(acct)
+    if CONTRACT_LIST_TTL_S > 0:
+        with _contract_list_lock:
+            if len(_contract_list_cache) >= _CONTRACT_LIST_CACHE_MAX:
+                _contract_list_cache.clear()
+            _contract_list_cache[acct] = (now, [dict(c) for c in results])
+    return results
+
+
+def _scan_customer_contracts(account_number: str) -> list[dict]:
     results = []
     if not os.path.isdir(CONTRACTS_DIR):
         return results
 
     prefix = account_number.upper() + "_"
-    for site_dir_name in os.listdir(CONTRACTS_DIR):
+    for site_dir_name in _scan_dir_cached(CONTRACTS_DIR, _site_dirs):
         site_path = os.path.join(CONTRACTS_DIR, site_dir_name)
-        if not os.path.isdir(site_path):
+        try:
+            fnames = _scan_dir_cached(site_path, _pdf_files)
+        except FileNotFoundError:
             continue
-        for fname in os.listdir(site_path):
-            if fname.upper().startswith(prefix) and fname.lower().endswith(".pdf"):
+        for fname in fnames:
+            if fname.upper().startswith(prefix):
                 lang = "so" if "_Contract_so.pdf" in fname else "en"
                 results.append({
                     "filename": fname,
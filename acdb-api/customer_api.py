@@ -21,12 +21,17 @@ Environment variables:
   HR_API_KEY_CC_PORTAL  - CC portal's named HR API key (preferred; legacy
                           HR_PORTAL_URL / HR_PORTAL_API_KEY still accepted)
   FIREBASE_SA_PATH      - Firebase service account JSON (portfolio list only)
+  CC_DB_POOL_MIN / CC_DB_POOL_MAX - PostgreSQL pool size (default 2 / 10)
+  CC_DB_POOL_RECYCLE_S  - Max pooled-connection age in seconds (default 3600)
 """
 
 import os
 import re
 import sys
 import logging
+import threading
+import time
+import weakref
 from contextlib import contextmanager
 from datetime import datetime
 from typing import Any, Dict, List, Optional
@@ -37,6 +42,10 @@ import psycopg2.extras
 import uvicorn
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+from db_errors import PoolExhausted
+from fast_json import FastJSONResponse
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -55,35 +64,138 @@ DATABASE_URL = os.environ.get(
     "DATABASE_URL",
     "postgresql://cc_api@localhost:5432/onepower_cc",
 )
+# Optional streaming replica for read-only endpoints (see get_read_connection).
+# Unset: those endpoints read from DATABASE_URL like everything else.
+DATABASE_URL_RO = os.environ.get("DATABASE_URL_RO", "").strip()
 
 # ---------------------------------------------------------------------------
 # Database helpers
 # ---------------------------------------------------------------------------
 
+DB_POOL_MIN = int(os.environ.get("CC_DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.environ.get("CC_DB_POOL_MAX", "10"))
+# Pooled connections older than this are closed on return instead of being
+# reused (picks up server-side config changes / failovers; 0 = never).
+DB_POOL_RECYCLE_S = float(os.environ.get("CC_DB_POOL_RECYCLE_S", "3600"))
+
+# How long a checkout waits for a free connection once all DB_POOL_MAX are
+# out. psycopg2's pool raises PoolError straight away instead, which turned
+# a burst wider than the pool (the threadpool runs 40 handlers) into 500s.
+DB_POOL_TIMEOUT_S = float(os.environ.get("CC_DB_POOL_TIMEOUT_S", "5"))
+
+
+class _WaitingPool(psycopg2.pool.ThreadedConnectionPool):
+    """ThreadedConnectionPool whose getconn waits up to DB_POOL_TIMEOUT_S
+    for a connection to be returned before giving up with PoolExhausted."""
+
+    def __init__(self, minconn: int, maxconn: int, *args, **kwargs):
+        self._slots = threading.BoundedSemaphore(maxconn)
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        if not self._slots.acquire(timeout=DB_POOL_TIMEOUT_S):
+            raise PoolExhausted(
+                f"no database connection free within {DB_POOL_TIMEOUT_S:g}s"
+            )
+        try:
+            return super().getconn(key)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        except Exception:
+            # e.g. the rollback on a dead connection failed: psycopg2 still
+            # counts it as checked out, so drop it from the books and close it.
+            with self._lock:
+                key = self._rused.pop(id(conn), key)
+                if key is not None and self._used.pop(key, None) is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            raise
+        finally:
+            self._slots.release()
+
+
 _pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
+_ro_pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
+_pool_lock = threading.Lock()
+# connection -> monotonic time first checked out. Weakly keyed: the pool
+# closes and drops surplus idle connections itself, and their entries must go
+# with them rather than be inherited by a new connection at the same address.
+_conn_born: "weakref.WeakKeyDictionary[Any, float]" = weakref.WeakKeyDictionary()
 
 
 def _get_pool() -> psycopg2.pool.ThreadedConnectionPool:
     """Lazy-initialize the connection pool."""
     global _pool
     if _pool is None or _pool.closed:
-        _pool = psycopg2.pool.ThreadedConnectionPool(
-            minconn=2,
-            maxconn=10,
-            dsn=DATABASE_URL,
-        )
+        with _pool_lock:
+            if _pool is None or _pool.closed:
+                _conn_born.clear()
+                _pool = _WaitingPool(
+                    minconn=DB_POOL_MIN,
+                    maxconn=max(DB_POOL_MAX, DB_POOL_MIN),
+                    dsn=DATABASE_URL,
+                )
     return _pool
 
 
+def _get_ro_pool() -> psycopg2.pool.ThreadedConnectionPool:
+    """Lazy-initialize the replica pool (same sizing as the primary's)."""
+    global _ro_pool
+    if _ro_pool is None or _ro_pool.closed:
+        with _pool_lock:
+            if _ro_pool is None or _ro_pool.closed:
+                _ro_pool = _WaitingPool(
+                    minconn=DB_POOL_MIN,
+                    maxconn=max(DB_POOL_MAX, DB_POOL_MIN),
+                    dsn=DATABASE_URL_RO,
+                )
+    return _ro_pool
+
+
 @contextmanager
-def get_connection():
-    """Context manager for PostgreSQL connections from the pool."""
-    pool = _get_pool()
+def _checkout(pool: psycopg2.pool.ThreadedConnectionPool):
     conn = pool.getconn()
+    born = _conn_born.setdefault(conn, time.monotonic())
     try:
         yield conn
     finally:
-        pool.putconn(conn)
+        expired = DB_POOL_RECYCLE_S > 0 and (time.monotonic() - born) > DB_POOL_RECYCLE_S
+        discard = bool(conn.closed) or expired
+        if discard:
+            _conn_born.pop(conn, None)
+        pool.putconn(conn, close=discard)
+
+
+@contextmanager
+def get_connection():
+    """Context manager for PostgreSQL connections from the pool.
+
+    Broken connections, and ones past ``DB_POOL_RECYCLE_S``, are closed on
+    return rather than handed to the next caller."""
+    with _checkout(_get_pool()) as conn:
+        yield conn
+
+
+@contextmanager
+def get_read_connection(*, primary: bool = False):
+    """Like :func:`get_connection`, but from the ``DATABASE_URL_RO`` replica
+    when one is configured. For read-only endpoints only: writes fail there.
+
+    Pass ``primary=True`` to read from the primary anyway, e.g. right after a
+    write the replica may not have replayed yet."""
+    if primary or not DATABASE_URL_RO:
+        with get_connection() as conn:
+            yield conn
+        return
+    with _checkout(_get_ro_pool()) as conn:
+        yield conn
 
 
 # Keep get_derived_connection as an alias for backward compatibility.
@@ -99,6 +211,13 @@ def _row_to_dict(cursor, row) -> Dict[str, Any]:
     return dict(zip(columns, row))
 
 
+def _rows_to_dicts(cursor, rows) -> List[Dict[str, Any]]:
+    """:func:`_row_to_dict` for a whole result set, reading the column names
+    from ``cursor.description`` once rather than once per row."""
+    columns = [desc[0] for desc in cursor.description]
+    return [dict(zip(columns, row)) for row in rows]
+
+
 def _normalize_phone(phone: str) -> str:
     """Strip common prefixes and non-digit chars for matching."""
     digits = "".join(c for c in phone if c.isdigit())
@@ -286,6 +405,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(PoolExhausted)
+def _db_pool_exhausted(request, exc: PoolExhausted):
+    """Every pooled connection stayed busy for DB_POOL_TIMEOUT_S: ask the
+    client to retry rather than reporting a server error."""
+    logger.warning("DB pool exhausted on %s %s: %s", request.method, request.url.path, exc)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database busy, please retry."},
+        headers={"Retry-After": "1"},
+    )
+
 # ---------------------------------------------------------------------------
 # Mount sub-routers (auth, schema, CRUD, export, admin)
 # ---------------------------------------------------------------------------
@@ -295,6 +426,7 @@ from crud import router as crud_router, customer_router, customer_data_router, _
 from exports import router as export_router
 from admin import router as admin_router
 from stats import router as stats_router, warm_stats_cache
+from contract_gen import warm_pdf_renderer
 from mutations import router as mutations_router
 from om_report import router as om_report_router
 from sync_ugridplan import router as sync_router
@@ -402,6 +534,7 @@ app.include_router(mak_connectivity_router)
 ensure_meter_assignments_table()
 ensure_meter_provisioning_table()
 warm_stats_cache()
+warm_pdf_renderer()
 
 
 # ---- Country config ----
@@ -483,8 +616,8 @@ def health():
 
 # ---- Lookup by phone ----
 
-@app.get("/api/customers/by-phone/{phone}")
-@app.get("/customers/by-phone/{phone}")
+@app.get("/api/customers/by-phone/{phone}", response_class=FastJSONResponse)
+@app.get("/customers/by-phone/{phone}", response_class=FastJSONResponse)
 def customer_by_phone(phone: str):
     """Look up a customer by phone number."""
     normalized = _normalize_phone(phone)
@@ -509,7 +642,7 @@ def customer_by_phone(phone: str):
             if not rows:
                 raise HTTPException(status_code=404, detail="No customer found for this phone number")
 
-            row_dicts = [_row_to_dict(cursor, row) for row in rows]
+            row_dicts = _rows_to_dicts(cursor, rows)
             customers = []
             for rd in row_dicts:
                 cust = _normalize_customer(rd)
@@ -521,7 +654,7 @@ def customer_by_phone(phone: str):
 
             return {"customers": customers, "count": len(customers)}
 
-    except HTTPException:
+    except (HTTPException, PoolExhausted):
         raise
     except Exception as e:
         logger.error("Phone lookup failed: %s", e)
@@ -573,7 +706,7 @@ def customer_by_id(customer_id: str):
 
             return {"customer": cust}
 
-    except HTTPException:
+    except (HTTPException, PoolExhausted):
         raise
     except Exception as e:
         logger.error("ID lookup failed: %s", e)
@@ -648,7 +781,7 @@ def customer_by_account(account_number: str):
 
             return {"customer": cust}
 
-    except HTTPException:
+    except (HTTPException, PoolExhausted):
         raise
     except Exception as e:
         logger.error("Account lookup failed: %s", e)
@@ -657,8 +790,8 @@ def customer_by_account(account_number: str):
 
 # ---- General search ----
 
-@app.get("/api/customers/search")
-@app.get("/customers/search")
+@app.get("/api/customers/search", response_class=FastJSONResponse)
+@app.get("/customers/search", response_class=FastJSONResponse)
 def customer_search(
     q: str = Query(..., min_length=2, description="Search query (name, village, plot number)"),
     limit: int = Query(20, ge=1, le=100),
@@ -688,9 +821,11 @@ def customer_search(
                 pattern, pattern, pattern, pattern, limit,
             ))
             rows = cursor.fetchall()
-            customers = [_normalize_customer(_row_to_dict(cursor, row)) for row in rows]
+            customers = [_normalize_customer(rd) for rd in _rows_to_dicts(cursor, rows)]
             return {"customers": customers, "count": len(customers), "query": q}
 
+    except PoolExhausted:
+        raise
     except Exception as e:
         logger.error("Search failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
@@ -750,6 +885,8 @@ def list_sites():
 
             return {"sites": sites, "total_sites": len(sites)}
 
+    except PoolExhausted:
+        raise
     except Exception as e:
         logger.error("Sites list failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
@@ -769,4 +906,14 @@ if __name__ == "__main__":
     logger.info("Port: %d", PORT)
     logger.info("=" * 60)
 
-    uvicorn.run(app, host="0.0.0.0", port=PORT, log_level="info")
+    # uvloop/httptools when installed (Linux deploys); uvicorn's pure-Python
+    # loop and h11 parser otherwise, e.g. on a Windows dev box.
+    try:
+        import uvloop  # noqa: F401
+        import httptools  # noqa: F401
+        loop, http = "uvloop", "httptools"
+    except ImportError:
+        loop, http = "asyncio", "h11"
+    logger.info("Event loop: %s, HTTP parser: %s", loop, http)
+
+    uvicorn.run(app, host="0.0.0.0", port=PORT, log_level="info", loop=loop, http=http)
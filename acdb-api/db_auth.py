@@ -47,6 +47,7 @@ def init_auth_db():
             CREATE TABLE IF NOT EXISTS cc_customer_passwords (
                 customer_id   TEXT PRIMARY KEY,
                 password_hash TEXT NOT NULL,
+                display_name  TEXT,
                 created_at    TEXT NOT NULL DEFAULT (datetime('now')),
                 updated_at    TEXT NOT NULL DEFAULT (datetime('now'))
             );
@@ -170,6 +171,7 @@ def init_auth_db():
             "AND cc_role = 'engineering' AND assigned_by = 'system'"
         )
 
+        _ensure_customer_display_name(conn)
         _seed_department_mappings(conn)
         _ensure_role_dept_mappings(conn)
 
@@ -232,6 +234,19 @@ def _ensure_role_dept_mappings(conn: sqlite3.Connection):
         )
 
 
+def _ensure_customer_display_name(conn: sqlite3.Connection):
+    """Add cc_customer_passwords.display_name to DBs created before it existed.
+
+    SQLite has no ADD COLUMN IF NOT EXISTS, so check table_info first. Rows
+    registered before the column existed stay NULL and are backfilled on
+    their next successful login.
+    """
+    cols = {r["name"] for r in conn.execute("PRAGMA table_info(cc_customer_passwords)")}
+    if "display_name" not in cols:
+        conn.execute("ALTER TABLE cc_customer_passwords ADD COLUMN display_name TEXT")
+        logger.info("Added display_name column to cc_customer_passwords")
+
+
 def _seed_department_mappings(conn: sqlite3.Connection):
     """Insert default department→role mappings if the table is empty."""
     count = conn.execute("SELECT COUNT(*) FROM cc_department_role_mappings").fetchone()[0]
@@ -261,15 +276,45 @@ def get_customer_password_hash(customer_id: str) -> str | None:
         return row["password_hash"] if row else None
 
 
-def set_customer_password(customer_id: str, password_hash: str):
-    """Insert or update a customer's password hash."""
+def get_customer_credentials(customer_id: str) -> tuple[str, str | None] | None:
+    """Return (bcrypt hash, display name) for a customer in one query.
+
+    None if not registered. The name is None for customers registered before
+    display_name was stored.
+    """
+    with get_auth_db() as conn:
+        row = conn.execute(
+            "SELECT password_hash, display_name FROM cc_customer_passwords WHERE customer_id = ?",
+            (customer_id,),
+        ).fetchone()
+        return (row["password_hash"], row["display_name"]) if row else None
+
+
+def set_customer_password(customer_id: str, password_hash: str, display_name: str | None = None):
+    """Insert or update a customer's password hash.
+
+    A None display_name keeps whatever name is already stored.
+    """
     now = datetime.utcnow().isoformat()
     with get_auth_db() as conn:
         conn.execute(
-            """INSERT INTO cc_customer_passwords (customer_id, password_hash, created_at, updated_at)
-               VALUES (?, ?, ?, ?)
-               ON CONFLICT(customer_id) DO UPDATE SET password_hash = ?, updated_at = ?""",
-            (customer_id, password_hash, now, now, password_hash, now),
+            """INSERT INTO cc_customer_passwords
+                   (customer_id, password_hash, display_name, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(customer_id) DO UPDATE SET
+                   password_hash = excluded.password_hash,
+                   display_name = COALESCE(excluded.display_name, display_name),
+                   updated_at = excluded.updated_at""",
+            (customer_id, password_hash, display_name, now, now),
+        )
+
+
+def set_customer_display_name(customer_id: str, display_name: str):
+    """Store the display name for an already-registered customer."""
+    with get_auth_db() as conn:
+        conn.execute(
+            "UPDATE cc_customer_passwords SET display_name = ? WHERE customer_id = ?",
+            (display_name, customer_id),
         )
 
 
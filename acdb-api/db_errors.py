@@ -0,0 +1,15 @@
+"""
+Database errors shared by the API routers.
+
+Kept out of customer_api so routers can name them at import time (their
+customer_api imports are function-local; tests stub that module).
+"""
+
+import psycopg2.pool
+
+
+class PoolExhausted(psycopg2.pool.PoolError):
+    """Every pooled connection stayed checked out for CC_DB_POOL_TIMEOUT_S.
+
+    The app answers it with 503 + Retry-After; handlers that turn their
+    failures into 500s re-raise it first."""
@@ -0,0 +1,29 @@
+"""
+JSONResponse rendered with orjson, for routes that return plain dicts/lists.
+
+Set per route (``response_class=FastJSONResponse``), not as the app default:
+a non-default response class turns off FastAPI's pydantic ``dump_json`` path
+for ``response_model`` routes, which are faster left on it.
+"""
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # plain json.dumps via Starlette
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when installed.
+
+    Handlers' return values have already been through jsonable_encoder, so
+    only the final dump changes (several times faster for the large list
+    payloads). Non-str keys are stringified as json.dumps does."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
@@ -19,6 +19,7 @@ from customer_api import get_connection
 from contract_gen import (
     CONTRACTS_DIR, TEMPLATES_DIR, _html_to_pdf, _safe_name,
     build_download_url, _STAFF_SIGNATURE_B64, STAFF_NAME,
+    invalidate_customer_contracts,
 )
 
 import jinja2
@@ -555,5 +556,6 @@ def _generate_financing_contract(
     except jinja2.TemplateNotFound:
         pass
 
+    invalidate_customer_contracts(body.account_number)
     logger.info("Generated financing contract(s): %s", en_path)
     return result
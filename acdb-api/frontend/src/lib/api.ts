@@ -1649,7 +1649,7 @@ export interface CommissionResult {
   contract_so_url: string;
   en_filename: string;
   so_filename: string;
-  sms_sent: boolean;
+  sms_queued: boolean;
   gateway_associated?: boolean;
   ugp_sync?: UgpSyncResult;
 }
@@ -650,9 +650,9 @@ export default function CommissionCustomerPage() {
             </svg>
             <h3 className="text-lg font-bold text-green-800">{t('commission:success.title')}</h3>
             <p className="text-sm text-green-700">
-              {result.sms_sent
-                ? 'Contract links sent to customer via SMS.'
-                : 'Contracts generated. SMS delivery was not configured.'}
+              {result.sms_queued
+                ? 'Contract links are being sent to the customer via SMS.'
+                : 'Contracts generated. No phone number for SMS delivery.'}
             </p>
           </div>
 
@@ -19,6 +19,8 @@ What this module provides
 * ``get_all_pr_departments`` — HR departments shaped for the admin
   department→role mapping picker (kept under the historical name so the admin
   UI and API path are unchanged).
+* ``lookup_employee_minimal`` / ``lookup_employees_minimal`` — sign-in
+  lookup via HR /lookup (TTL-cached per id; see ``clear_lookup_cache``).
 * ``reload`` — invalidate caches (called after admin mapping edits).
 
 Caching
@@ -30,6 +32,16 @@ gap for someone not yet in a cached cycle. Firestore is no longer used for
 employees — it remains in ``pr_lookup`` only for the portfolio/organization
 list.
 
+Outages
+-------
+A circuit breaker wraps every HR request: ``HR_BREAKER_FAILURES`` transport
+failures within ``HR_BREAKER_WINDOW`` seconds open it for
+``HR_BREAKER_OPEN_S`` seconds, during which requests fail fast instead of each
+waiting out ``HR_TIMEOUT``. The first request after that is a probe; if it
+fails too the breaker re-opens straight away. While HR is unreachable,
+sign-in lookups fall back to the last record cached for the id, even if it
+has expired.
+
 Env vars (preferred names per the HR integration guide, with legacy fallbacks
 so the currently-deployed host keeps working without an env change):
     HR_API_BASE_URL       - HR portal base URL (default https://hr.1pwrafrica.com)
@@ -42,10 +54,14 @@ from __future__ import annotations
 
 import logging
 import os
+import threading
 import time
-from typing import Any, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Iterable, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger("cc-api.hr-directory")
 
@@ -63,10 +79,71 @@ HR_API_KEY = os.environ.get("HR_API_KEY_CC_PORTAL") or os.environ.get("HR_PORTAL
 
 HR_TIMEOUT = float(os.environ.get("HR_TIMEOUT", "6"))
 HR_DIRECTORY_TTL = float(os.environ.get("HR_DIRECTORY_TTL", "1800"))  # 30 min
+HR_LOOKUP_WORKERS = int(os.environ.get("HR_LOOKUP_WORKERS", "16"))
+HR_LOOKUP_TTL = float(os.environ.get("HR_LOOKUP_TTL", "600"))  # 10 min
+HR_LOOKUP_NEGATIVE_TTL = float(os.environ.get("HR_LOOKUP_NEGATIVE_TTL", "60"))
+HR_LOOKUP_CACHE_MAX = 4096
+HR_BREAKER_FAILURES = int(os.environ.get("HR_BREAKER_FAILURES", "3"))
+HR_BREAKER_WINDOW = float(os.environ.get("HR_BREAKER_WINDOW", "30"))
+HR_BREAKER_OPEN_S = float(os.environ.get("HR_BREAKER_OPEN_S", "60"))
 
 _AUTH_WARNED = False
 
 
+def _build_session() -> requests.Session:
+    """Shared keep-alive session so repeat lookups reuse the TLS connection
+    instead of a fresh handshake per call. Stale pooled sockets / refused
+    connects are retried twice with a short backoff; read timeouts are not
+    (a slow HR shouldn't turn one 6s wait into three on the login path)."""
+    sess = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=50,
+        max_retries=Retry(total=2, read=0, backoff_factor=0.1),
+    )
+    sess.mount("https://", adapter)
+    sess.mount("http://", adapter)
+    return sess
+
+
+_session = _build_session()
+
+
+# Circuit breaker state (monotonic clock). ``tripped`` stays set from the
+# moment the breaker opens until a request succeeds, so a failed probe after
+# ``open_until`` re-opens it without waiting for a fresh run of failures.
+_hr_breaker = {"open_until": 0.0, "fail_count": 0, "first_fail_at": 0.0, "tripped": False}
+_breaker_lock = threading.Lock()
+
+
+def _breaker_open() -> bool:
+    return time.monotonic() < _hr_breaker["open_until"]
+
+
+def _record_failure() -> None:
+    now = time.monotonic()
+    with _breaker_lock:
+        b = _hr_breaker
+        if now - b["first_fail_at"] > HR_BREAKER_WINDOW:
+            b["fail_count"] = 0
+            b["first_fail_at"] = now
+        b["fail_count"] += 1
+        if b["tripped"] or b["fail_count"] >= HR_BREAKER_FAILURES:
+            if not b["tripped"]:
+                logger.warning(
+                    "HR portal unreachable (%d failures in %.0fs); skipping HR calls for %.0fs",
+                    b["fail_count"], HR_BREAKER_WINDOW, HR_BREAKER_OPEN_S)
+            b["open_until"] = now + HR_BREAKER_OPEN_S
+            b["tripped"] = True
+
+
+def _record_success() -> None:
+    with _breaker_lock:
+        if _hr_breaker["tripped"]:
+            logger.info("HR portal reachable again; circuit breaker closed")
+        _hr_breaker.update(open_until=0.0, fail_count=0, first_fail_at=0.0, tripped=False)
+
+
 def _headers() -> dict[str, str]:
     h = {"Accept": "application/json"}
     if HR_API_KEY:
@@ -74,39 +151,52 @@ def _headers() -> dict[str, str]:
     return h
 
 
-def _get(path: str, params: Optional[dict] = None, timeout: Optional[float] = None) -> Optional[dict]:
-    """GET a JSON payload from HR. Returns None on any failure/404 (best-effort;
-    callers fall back to last-known-good / limited info). Logs once if the key
-    is missing so we don't spam."""
+def _request(
+    path: str, params: Optional[dict] = None, timeout: Optional[float] = None,
+) -> tuple[Optional[int], Optional[dict]]:
+    """GET a JSON payload from HR. Returns ``(status, payload)``; status is
+    None when the request never completed, payload is None on anything but a
+    200 with a JSON body. Logs once if the key is missing so we don't spam."""
     global _AUTH_WARNED
     if not HR_API_KEY and not _AUTH_WARNED:
         logger.warning(
             "HR API key not configured (set HR_API_KEY_CC_PORTAL); HR directory disabled")
         _AUTH_WARNED = True
     url = f"{HR_BASE_URL}{path}"
+    if _breaker_open():
+        logger.debug("HR circuit open; skipping %s", url)
+        return None, None
     try:
-        resp = requests.get(
+        resp = _session.get(
             url, headers=_headers(), params=params,
             timeout=timeout or HR_TIMEOUT, verify=False,
         )
     except requests.RequestException as exc:
         logger.warning("HR request failed: %s %s — %s", url, params or "", exc)
-        return None
+        _record_failure()
+        return None, None
+    _record_success()
     if resp.status_code == 404:
-        return None
+        return 404, None
     if resp.status_code == 401:
         if not _AUTH_WARNED:
             logger.error("HR API rejected key (401) — check HR_API_KEY_CC_PORTAL")
             _AUTH_WARNED = True
-        return None
+        return 401, None
     if resp.status_code != 200:
         logger.warning("HR %s returned HTTP %d", url, resp.status_code)
-        return None
+        return resp.status_code, None
     try:
-        return resp.json()
+        return 200, resp.json()
     except ValueError:
         logger.warning("HR %s returned non-JSON body", url)
-        return None
+        return 200, None
+
+
+def _get(path: str, params: Optional[dict] = None, timeout: Optional[float] = None) -> Optional[dict]:
+    """GET a JSON payload from HR. Returns None on any failure/404 (best-effort;
+    callers fall back to last-known-good / limited info)."""
+    return _request(path, params, timeout)[1]
 
 
 # ---------------------------------------------------------------------------
@@ -119,10 +209,25 @@ _dir_by_id: dict[str, dict] = {}
 _dir_loaded_at: float = 0.0
 _dir_meta: Optional[list[str]] = None
 _dir_meta_loaded_at: float = 0.0
+_dir_load_lock = threading.Lock()
+_prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hr-dir")
+
+# employee_id (as passed to /lookup) -> (expires_at, record-or-None for a 404)
+_lookup_cache: dict[str, tuple[float, Optional[dict]]] = {}
+_lookup_lock = threading.Lock()
+
+
+def clear_lookup_cache() -> int:
+    """Drop all cached sign-in lookups. Returns the number of entries dropped."""
+    with _lookup_lock:
+        n = len(_lookup_cache)
+        _lookup_cache.clear()
+    return n
 
 
 def _invalidate() -> None:
     global _dir_loaded_at, _dir_meta, _dir_meta_loaded_at
+    clear_lookup_cache()
     _dir_by_email.clear()
     _dir_by_id.clear()
     _dir_loaded_at = 0.0
@@ -139,30 +244,54 @@ def _index_record(rec: dict) -> None:
         _dir_by_id[emp_id] = rec
 
 
+def _directory_fresh() -> bool:
+    return bool(
+        _dir_loaded_at
+        and (time.time() - _dir_loaded_at) < HR_DIRECTORY_TTL
+        and (_dir_by_email or _dir_by_id)
+    )
+
+
 def _load_directory(force: bool = False) -> None:
-    """Bulk-load /api/employees/directory into the cache (TTL-gated)."""
+    """Bulk-load /api/employees/directory into the cache (TTL-gated).
+
+    Concurrent callers on an expired cache share a single fetch: the first
+    one loads under ``_dir_load_lock`` and the rest find it fresh."""
     global _dir_loaded_at
-    if not force and _dir_loaded_at and (time.time() - _dir_loaded_at) < HR_DIRECTORY_TTL:
-        if _dir_by_email or _dir_by_id:
-            return
-    data = _get("/api/employees/directory")
-    if data is None:
-        # Keep any existing cache as last-known-good; just don't reset the TTL
-        # so we retry on the next call.
-        if not (_dir_by_email or _dir_by_id):
-            _dir_loaded_at = 0.0
+    if not force and _directory_fresh():
         return
-    employees = data.get("employees") or []
-    # Rebuild from a fresh fetch (don't mix stale + new).
-    _dir_by_email.clear()
-    _dir_by_id.clear()
-    for rec in employees:
-        _index_record(rec)
-    _dir_loaded_at = time.time()
+    with _dir_load_lock:
+        if not force and _directory_fresh():
+            return
+        data = _get("/api/employees/directory")
+        if data is None:
+            # Keep any existing cache as last-known-good; just don't reset the TTL
+            # so we retry on the next call.
+            if not (_dir_by_email or _dir_by_id):
+                _dir_loaded_at = 0.0
+            return
+        employees = data.get("employees") or []
+        # Rebuild from a fresh fetch (don't mix stale + new).
+        _dir_by_email.clear()
+        _dir_by_id.clear()
+        for rec in employees:
+            _index_record(rec)
+        _dir_loaded_at = time.time()
     logger.info(
         "HR directory: cached %d employees (ttl=%.0fs)", len(employees), HR_DIRECTORY_TTL)
 
 
+def prefetch_directory() -> Optional[Future]:
+    """Start refreshing an expired directory cache in the background.
+
+    Used by employee login so the directory pull (needed afterwards for the
+    department→role mapping) overlaps the /lookup round-trip instead of
+    following it. No-op when the cache is fresh."""
+    if _directory_fresh():
+        return None
+    return _prefetch_pool.submit(_load_directory)
+
+
 # ---------------------------------------------------------------------------
 # Department → CC role mapping (CC-side table; only the dept *string* comes from HR)
 # ---------------------------------------------------------------------------
@@ -256,8 +385,59 @@ def get_all_pr_departments() -> list[dict]:
 def lookup_employee_minimal(employee_id: str) -> Optional[dict]:
     """Minimal sign-in lookup (employee_id, name, email, role) via HR /lookup.
     This is the documented sign-in endpoint; department is resolved separately
-    via the directory cache. Returns None on 404."""
-    return _get(f"/api/employees/lookup/{employee_id.strip()}")
+    via the directory cache. Returns None on 404.
+
+    Results are cached per id for ``HR_LOOKUP_TTL`` seconds (404s for
+    ``HR_LOOKUP_NEGATIVE_TTL``) so login bursts and admin listings don't
+    re-hit HR. Transport errors / 5xx are never cached; when HR can't be
+    reached, the last record cached for the id is returned even if expired.
+    """
+    key = employee_id.strip()
+    now = time.time()
+    with _lookup_lock:
+        hit = _lookup_cache.get(key)
+    if hit is not None and hit[0] > now:
+        return dict(hit[1]) if hit[1] is not None else None
+
+    status, data = _request(f"/api/employees/lookup/{key}")
+    if status == 200 and isinstance(data, dict):
+        entry: Optional[tuple[float, Optional[dict]]] = (now + HR_LOOKUP_TTL, data)
+    elif status == 404:
+        entry = (now + HR_LOOKUP_NEGATIVE_TTL, None)
+    else:
+        entry = None
+        if status is None and hit is not None and hit[1] is not None:
+            return dict(hit[1])
+    if entry is not None:
+        with _lookup_lock:
+            if len(_lookup_cache) >= HR_LOOKUP_CACHE_MAX:
+                for k in [k for k, (exp, _) in _lookup_cache.items() if exp <= now]:
+                    del _lookup_cache[k]
+                if len(_lookup_cache) >= HR_LOOKUP_CACHE_MAX:
+                    _lookup_cache.clear()
+            _lookup_cache[key] = entry
+    return dict(data) if status == 200 and isinstance(data, dict) else None
+
+
+def lookup_employees_minimal(employee_ids: Iterable[str]) -> dict[str, dict]:
+    """Batch form of ``lookup_employee_minimal`` for listing pages.
+
+    HR has no bulk /lookup endpoint, so distinct ids are fanned out over a
+    small bounded thread pool instead of N sequential round-trips. Returns
+    ``{employee_id: record}`` keyed by the *stripped* id (callers look up
+    with ``.strip()``); ids HR doesn't know (or that failed) are simply
+    absent.
+    """
+    ids = list(dict.fromkeys(e.strip() for e in employee_ids if e and e.strip()))
+    if not ids:
+        return {}
+    if len(ids) == 1:
+        rec = lookup_employee_minimal(ids[0])
+        return {ids[0]: rec} if rec else {}
+    workers = max(1, min(HR_LOOKUP_WORKERS, len(ids)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hr-lookup") as pool:
+        results = pool.map(lookup_employee_minimal, ids)
+        return {eid: rec for eid, rec in zip(ids, results) if rec}
 
 
 def reload() -> None:
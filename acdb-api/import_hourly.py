@@ -467,12 +467,14 @@ def process_site(site_code, org_cfg, site_id, site_start_str,
             batch, pp = import_site_day(session, org_cfg, site_code, site_id, ds, meter_map, pp)
             if batch:
                 if cur:
-                    psycopg2.extras.execute_batch(cur, """
+                    # Multi-row INSERTs: one statement (and one firing of the
+                    # statement-level balance triggers, 066/067) per page.
+                    psycopg2.extras.execute_values(cur, """
                         INSERT INTO hourly_consumption
                             (account_number, meter_id, reading_hour, kwh, community, source)
-                        VALUES (%s, %s, %s, %s, %s, %s)
+                        VALUES %s
                         ON CONFLICT (meter_id, reading_hour) DO NOTHING
-                    """, batch, page_size=500)
+                    """, batch, page_size=1000)
                     conn.commit()
                 total_rows += len(batch)
                 consecutive_empty = 0
@@ -288,16 +288,24 @@ def main():
     fallback_rows = fallback_interval_rows(readings)
     log.info("  %d fallback interval rows", len(fallback_rows))
 
-    all_rows = hourly_rows + fallback_rows
+    # One row per (meter, hour), keeping the larger kWh as the upsert would:
+    # a multi-row ON CONFLICT DO UPDATE can't touch the same row twice.
+    best = {}
+    for row in hourly_rows + fallback_rows:
+        key = (row[1], row[2])
+        if key not in best or row[3] > best[key][3]:
+            best[key] = row
+    all_rows = list(best.values())
     if all_rows:
-        psycopg2.extras.execute_batch(cur, """
+        upserted = psycopg2.extras.execute_values(cur, """
             INSERT INTO hourly_consumption
                 (account_number, meter_id, reading_hour, kwh, community, source)
-            VALUES (%s, %s, %s, %s, %s, %s)
+            VALUES %s
             ON CONFLICT (meter_id, reading_hour)
             DO UPDATE SET kwh = GREATEST(hourly_consumption.kwh, EXCLUDED.kwh)
-        """, all_rows, page_size=200)
-        inserted = cur.rowcount
+            RETURNING 1
+        """, all_rows, page_size=1000, fetch=True)
+        inserted = len(upserted)
         conn.commit()
         log.info("Upserted %d / %d hourly consumption rows", inserted, len(all_rows))
     else:
@@ -38,6 +38,7 @@ from pydantic import BaseModel
 from country_config import COUNTRY, KOIOS_SITES, UTC_OFFSET_HOURS
 from cc_bridge_notify import notify_cc_bridge
 from customer_api import get_connection
+from db_errors import PoolExhausted
 from momo_bj import parse_momo_bn_sms, resolve_bn_momo_account
 from mpesa_sms import mpesa_receipt_in_use, parse_ls_sms_payment, resolve_sms_account
 from sms_payment_receipt import send_electricity_payment_receipt_sms, send_fee_payment_receipt_sms
@@ -46,7 +47,7 @@ from advances import (
     apply_advance_payment,
     get_active_advance,
 )
-from balance_engine import get_balance_kwh, record_fee_transaction
+from balance_engine import get_balance_kwh, invalidate_balance_cache, record_fee_transaction
 from fee_classifier import classify_payment
 from fee_debt import (
     apply_fee_debt_reduction,
@@ -272,13 +273,15 @@ def sync_consumption_for_site(community: str):
                 batch.append((acct, serial, hour_str, kwh, comm, "koios"))
 
             if batch:
-                psycopg2.extras.execute_batch(cur, """
+                psycopg2.extras.execute_values(cur, """
                     INSERT INTO hourly_consumption
                         (account_number, meter_id, reading_hour, kwh, community, source)
-                    VALUES (%s, %s, %s, %s, %s, %s)
+                    VALUES %s
                     ON CONFLICT (meter_id, reading_hour) DO NOTHING
-                """, batch, page_size=500)
+                """, batch, page_size=1000)
                 conn.commit()
+                for acct in {row[0] for row in batch}:
+                    invalidate_balance_cache(acct)
 
             logger.info("sync_consumption: %s — %d hourly records synced", community, len(batch))
     except Exception as e:
@@ -330,149 +333,244 @@ class MeterReading(BaseModel):
     firmware_version: Optional[str] = None
 
 
+def _parse_reading_ts(raw: str) -> datetime:
+    try:
+        return datetime.strptime(raw, "%Y%m%d%H%M").replace(
+            tzinfo=_METER_TZ).astimezone(timezone.utc)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Bad timestamp format: {raw}")
+
+
+def _ingest_reading(conn, reading: MeterReading, *, relay_hook: bool = True) -> dict:
+    """Apply one prototype-meter reading on *conn* (no commit).
+
+    Shared by the single and batch endpoints. Raises HTTPException for
+    per-reading rejections (bad timestamp, unknown meter, binding mismatch).
+    The caller drops the account's cached balance after committing when
+    ``delta_kwh`` is positive.
+    """
+    ts = _parse_reading_ts(reading.timestamp)
+    cur = conn.cursor()
+
+    meter_id, account, community = _resolve_meter(conn, reading.meter_id)
+    if not account:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown prototype meter: {reading.meter_id}",
+        )
+    if reading.thing_name:
+        cur.execute(
+            """
+            SELECT account_number, status
+              FROM meter_provisioning
+             WHERE thing_name = %s
+               AND regexp_replace(meter_serial, '^0+', '') =
+                   regexp_replace(%s, '^0+', '')
+             LIMIT 1
+            """,
+            (reading.thing_name, reading.meter_id),
+        )
+        binding = cur.fetchone()
+        if not binding or str(binding[0] or "") != str(account):
+            raise HTTPException(
+                status_code=409,
+                detail="Gateway, meter serial, and customer assignment do not match.",
+            )
+        if str(binding[1] or "") != "commissioned":
+            raise HTTPException(
+                status_code=409,
+                detail="Gateway telemetry cannot enter billing until commissioning is complete.",
+            )
+
+    cur.execute(
+        "SELECT last_energy_kwh FROM prototype_meter_state WHERE meter_id = %s",
+        (meter_id,),
+    )
+    row = cur.fetchone()
+    prev_energy = float(row[0]) if row else None
+
+    # Use energy_active (DDS8888 Modbus register, non-volatile) for
+    # delta calculations.  energy_integrated has better resolution
+    # (~0.8 Wh vs 10 Wh) but resets to 0 on ESP32 reboot, silently
+    # losing all accumulated energy.  The Modbus register survives
+    # power cycles and is the reliable source of truth.
+    energy_for_delta = reading.energy_active
+    delta_kwh = 0.0
+    if prev_energy is not None and energy_for_delta >= prev_energy:
+        delta_kwh = energy_for_delta - prev_energy
+
+    cur.execute("""
+        INSERT INTO meter_readings
+            (meter_id, account_number, reading_time,
+             wh_reading, power_kw, community, source)
+        VALUES (%s, %s, %s, %s, %s, %s, 'iot')
+        ON CONFLICT DO NOTHING
+    """, (
+        meter_id, account, ts,
+        reading.energy_active * 1000, _watts_to_kw(reading.power_active), community,
+    ))
+
+    hour_key = ts.strftime("%Y-%m-%d %H:00:00+00")
+    if delta_kwh > 0:
+        cur.execute("""
+            INSERT INTO hourly_consumption
+                (account_number, meter_id, reading_hour, kwh, community, source)
+            VALUES (%s, %s, %s, %s, %s, 'iot')
+            ON CONFLICT (meter_id, reading_hour) DO UPDATE
+                SET kwh = hourly_consumption.kwh + EXCLUDED.kwh
+        """, (account, meter_id, hour_key, round(delta_kwh, 4), community))
+
+    fw = (reading.firmware_version or "").strip()[:64] or None
+
+    cur.execute("""
+        INSERT INTO prototype_meter_state
+            (meter_id, account_number, last_energy_kwh,
+             last_relay_status, last_seen_at, last_synced_at, firmware_version)
+        VALUES (%s, %s, %s, %s, %s, NOW(), %s)
+        ON CONFLICT (meter_id) DO UPDATE SET
+            account_number = EXCLUDED.account_number,
+            last_energy_kwh = EXCLUDED.last_energy_kwh,
+            last_relay_status = EXCLUDED.last_relay_status,
+            last_seen_at = EXCLUDED.last_seen_at,
+            last_synced_at = NOW(),
+            firmware_version = COALESCE(EXCLUDED.firmware_version, prototype_meter_state.firmware_version)
+    """, (
+        meter_id, account, energy_for_delta,
+        reading.relay, ts, fw,
+    ))
+
+    # Consumption, not payment entry, is what normally crosses a
+    # prepaid balance through zero. The relay hook remains fail-closed
+    # behind RELAY_AUTO_TRIGGER_ENABLED and its own billing-priority,
+    # online, debounce, and gateway-binding checks.
+    if relay_hook and delta_kwh > 0:
+        try:
+            from relay_control import maybe_auto_open_relay
+            maybe_auto_open_relay(
+                conn,
+                account,
+                reason="zero_balance_after_consumption",
+            )
+        except Exception as exc:  # noqa: BLE001 - never drop telemetry
+            logger.warning(
+                "auto-cutoff hook failed for %s after meter reading: %s",
+                account,
+                exc,
+            )
+
+    logger.info(
+        "Meter reading: %s energy=%.2f kWh delta=%.4f relay=%s fw=%s",
+        meter_id, reading.energy_active, delta_kwh, reading.relay, fw or "-",
+    )
+
+    return {
+        "status": "ok",
+        "meter_id": meter_id,
+        "account": account,
+        "delta_kwh": round(delta_kwh, 4),
+        "relay": reading.relay,
+        "firmware_version_stored": fw,
+    }
+
+
 @router.post("/api/meters/reading")
 def ingest_meter_reading(reading: MeterReading, x_iot_key: str = Header(None)):
     if x_iot_key != IOT_KEY:
         raise HTTPException(status_code=403, detail="Invalid IoT key")
 
-    try:
-        ts = datetime.strptime(reading.timestamp, "%Y%m%d%H%M").replace(
-            tzinfo=_METER_TZ).astimezone(timezone.utc)
-    except ValueError:
-        raise HTTPException(status_code=400, detail=f"Bad timestamp format: {reading.timestamp}")
-
     try:
         with get_connection() as conn:
-            cur = conn.cursor()
+            result = _ingest_reading(conn, reading)
+            conn.commit()
+        # After the commit: a read in between would re-cache the old balance.
+        if result["delta_kwh"] > 0:
+            invalidate_balance_cache(result["account"])
+        return result
 
-            meter_id, account, community = _resolve_meter(conn, reading.meter_id)
-            if not account:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Unknown prototype meter: {reading.meter_id}",
-                )
-            if reading.thing_name:
-                cur.execute(
-                    """
-                    SELECT account_number, status
-                      FROM meter_provisioning
-                     WHERE thing_name = %s
-                       AND regexp_replace(meter_serial, '^0+', '') =
-                           regexp_replace(%s, '^0+', '')
-                     LIMIT 1
-                    """,
-                    (reading.thing_name, reading.meter_id),
-                )
-                binding = cur.fetchone()
-                if not binding or str(binding[0] or "") != str(account):
-                    raise HTTPException(
-                        status_code=409,
-                        detail="Gateway, meter serial, and customer assignment do not match.",
-                    )
-                if str(binding[1] or "") != "commissioned":
-                    raise HTTPException(
-                        status_code=409,
-                        detail="Gateway telemetry cannot enter billing until commissioning is complete.",
-                    )
+    except (HTTPException, PoolExhausted):
+        raise
+    except Exception as e:
+        logger.error("Meter reading ingest failed: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
 
-            cur.execute(
-                "SELECT last_energy_kwh FROM prototype_meter_state WHERE meter_id = %s",
-                (meter_id,),
-            )
-            row = cur.fetchone()
-            prev_energy = float(row[0]) if row else None
-
-            # Use energy_active (DDS8888 Modbus register, non-volatile) for
-            # delta calculations.  energy_integrated has better resolution
-            # (~0.8 Wh vs 10 Wh) but resets to 0 on ESP32 reboot, silently
-            # losing all accumulated energy.  The Modbus register survives
-            # power cycles and is the reliable source of truth.
-            energy_for_delta = reading.energy_active
-            delta_kwh = 0.0
-            if prev_energy is not None and energy_for_delta >= prev_energy:
-                delta_kwh = energy_for_delta - prev_energy
-
-            cur.execute("""
-                INSERT INTO meter_readings
-                    (meter_id, account_number, reading_time,
-                     wh_reading, power_kw, community, source)
-                VALUES (%s, %s, %s, %s, %s, %s, 'iot')
-                ON CONFLICT DO NOTHING
-            """, (
-                meter_id, account, ts,
-                reading.energy_active * 1000, _watts_to_kw(reading.power_active), community,
-            ))
-
-            hour_key = ts.strftime("%Y-%m-%d %H:00:00+00")
-            if delta_kwh > 0:
-                cur.execute("""
-                    INSERT INTO hourly_consumption
-                        (account_number, meter_id, reading_hour, kwh, community, source)
-                    VALUES (%s, %s, %s, %s, %s, 'iot')
-                    ON CONFLICT (meter_id, reading_hour) DO UPDATE
-                        SET kwh = hourly_consumption.kwh + EXCLUDED.kwh
-                """, (account, meter_id, hour_key, round(delta_kwh, 4), community))
-
-            fw = (reading.firmware_version or "").strip()[:64] or None
-
-            cur.execute("""
-                INSERT INTO prototype_meter_state
-                    (meter_id, account_number, last_energy_kwh,
-                     last_relay_status, last_seen_at, last_synced_at, firmware_version)
-                VALUES (%s, %s, %s, %s, %s, NOW(), %s)
-                ON CONFLICT (meter_id) DO UPDATE SET
-                    account_number = EXCLUDED.account_number,
-                    last_energy_kwh = EXCLUDED.last_energy_kwh,
-                    last_relay_status = EXCLUDED.last_relay_status,
-                    last_seen_at = EXCLUDED.last_seen_at,
-                    last_synced_at = NOW(),
-                    firmware_version = COALESCE(EXCLUDED.firmware_version, prototype_meter_state.firmware_version)
-            """, (
-                meter_id, account, energy_for_delta,
-                reading.relay, ts, fw,
-            ))
-
-            # Consumption, not payment entry, is what normally crosses a
-            # prepaid balance through zero. The relay hook remains fail-closed
-            # behind RELAY_AUTO_TRIGGER_ENABLED and its own billing-priority,
-            # online, debounce, and gateway-binding checks.
-            if delta_kwh > 0:
-                try:
-                    from relay_control import maybe_auto_open_relay
-                    maybe_auto_open_relay(
-                        conn,
-                        account,
-                        reason="zero_balance_after_consumption",
-                    )
-                except Exception as exc:  # noqa: BLE001 - never drop telemetry
-                    logger.warning(
-                        "auto-cutoff hook failed for %s after meter reading: %s",
-                        account,
-                        exc,
-                    )
 
-            conn.commit()
+MAX_READINGS_PER_BATCH = 500
 
-            logger.info(
-                "Meter reading: %s energy=%.2f kWh delta=%.4f relay=%s fw=%s",
-                meter_id, reading.energy_active, delta_kwh, reading.relay, fw or "-",
-            )
 
-            return {
-                "status": "ok",
-                "meter_id": meter_id,
-                "account": account,
-                "delta_kwh": round(delta_kwh, 4),
-                "relay": reading.relay,
-                "firmware_version_stored": fw,
-            }
+class MeterReadingBatch(BaseModel):
+    readings: list[MeterReading]
+
 
-    except HTTPException:
+@router.post("/api/meters/readings")
+def ingest_meter_readings(batch: MeterReadingBatch, x_iot_key: str = Header(None)):
+    """Batch form of ``/api/meters/reading`` for backfills.
+
+    Readings are applied in the order given (per-meter order matters: each
+    delta is taken against the previous reading) on one connection and
+    committed once. A rejected reading is rolled back to its savepoint and
+    reported in ``results`` without failing the rest of the batch. The
+    zero-balance relay hook runs once per account at the end rather than
+    once per reading.
+    """
+    if x_iot_key != IOT_KEY:
+        raise HTTPException(status_code=403, detail="Invalid IoT key")
+    if len(batch.readings) > MAX_READINGS_PER_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_READINGS_PER_BATCH} readings per batch",
+        )
+
+    results: list[dict] = []
+    consumed_accounts: set[str] = set()
+    try:
+        with get_connection() as conn:
+            cur = conn.cursor()
+            for reading in batch.readings:
+                cur.execute("SAVEPOINT meter_reading")
+                try:
+                    res = _ingest_reading(conn, reading, relay_hook=False)
+                except HTTPException as exc:
+                    cur.execute("ROLLBACK TO SAVEPOINT meter_reading")
+                    results.append({
+                        "status": "error",
+                        "meter_id": reading.meter_id,
+                        "timestamp": reading.timestamp,
+                        "error": exc.status_code,
+                        "detail": exc.detail,
+                    })
+                    continue
+                cur.execute("RELEASE SAVEPOINT meter_reading")
+                if res["delta_kwh"] > 0:
+                    consumed_accounts.add(res["account"])
+                results.append(res)
+
+            if consumed_accounts:
+                from relay_control import maybe_auto_open_relay
+                for account in sorted(consumed_accounts):
+                    try:
+                        maybe_auto_open_relay(
+                            conn, account, reason="zero_balance_after_consumption",
+                        )
+                    except Exception as exc:  # noqa: BLE001 - never drop telemetry
+                        logger.warning(
+                            "auto-cutoff hook failed for %s after meter readings: %s",
+                            account, exc,
+                        )
+
+            conn.commit()
+    except PoolExhausted:
         raise
     except Exception as e:
-        logger.error("Meter reading ingest failed: %s", e)
+        logger.error("Meter reading batch ingest failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+    for account in consumed_accounts:
+        invalidate_balance_cache(account)
+
+    ok = sum(1 for r in results if r.get("status") == "ok")
+    logger.info("Meter reading batch: %d/%d ok", ok, len(results))
+    return {"status": "ok", "accepted": ok, "rejected": len(results) - ok, "results": results}
+
 
 # ---------------------------------------------------------------------------
 # Meter role management (check ↔ primary transitions)
@@ -496,6 +594,8 @@ def get_meters_for_account(account_number: str):
                 {"meter_id": r[0], "platform": r[1], "role": r[2], "status": r[3]}
                 for r in cur.fetchall()
             ]
+    except PoolExhausted:
+        raise
     except Exception as e:
         logger.error("Meter lookup failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -555,7 +655,7 @@ def update_meter_role(meter_id: str, body: MeterRoleUpdate):
                 "demoted_count": demoted,
             }
 
-    except HTTPException:
+    except (HTTPException, PoolExhausted):
         raise
     except Exception as e:
         logger.error("Meter role update failed: %s", e)
@@ -11,6 +11,7 @@ from typing import Any, Dict, List, Optional
 import boto3
 from fastapi import APIRouter, Depends, HTTPException
 
+from db_errors import PoolExhausted
 from middleware import require_employee
 from models import CurrentUser
 
@@ -121,6 +122,8 @@ def get_mak_connectivity(
 ):
     try:
         meters = _query_1pdb_meters()
+    except PoolExhausted:
+        raise
     except Exception as exc:
         logger.exception("1PDB query failed")
         raise HTTPException(status_code=500, detail=f"1PDB query failed: {exc}")
@@ -0,0 +1,25 @@
+-- Migration 063: Covering index for balance_engine's transactions aggregate
+--
+-- get_balance_kwh() sums, per account, kwh_value over payment rows and
+-- transaction_amount over legacy consumption rows. It runs before every
+-- payment insert and on every dashboard / SMS balance read.
+--
+-- The ad-hoc idx_txn_account_payment (account_number, is_payment) index
+-- (created by hand during the v2 balance rewrite, never captured in a
+-- migration) finds the rows but still visits the heap for both summed
+-- columns. Carrying them as INCLUDE columns lets Postgres answer the
+-- aggregate with an index-only scan. The old index becomes a redundant
+-- prefix; it is deliberately NOT dropped here (a failed CONCURRENTLY build
+-- leaves an INVALID index that IF NOT EXISTS would then skip) -- drop it by
+-- hand once idx_txn_account_balance shows as valid in pg_index.
+--
+-- hourly_consumption is already served by idx_hourly_account_time_p
+-- (account_number, reading_hour) from 044_partition_hourly_consumption.
+--
+-- CONCURRENTLY: transactions is hot (payments, SMS ingest); a plain CREATE
+-- INDEX would block writes for the build. psql -f runs each statement in
+-- autocommit, so no BEGIN/COMMIT here.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_txn_account_balance
+    ON transactions (account_number, is_payment)
+    INCLUDE (kwh_value, transaction_amount);
@@ -0,0 +1,62 @@
+-- Migration 064: Covering index for balance_engine's hourly_consumption read
+--
+-- get_balance_kwh() builds its per-hour SM/1M pick from
+--   SELECT reading_hour, source, kwh FROM hourly_consumption
+--   WHERE account_number = $1
+-- idx_hourly_account_time_p (account_number, reading_hour) from 044 finds the
+-- rows but visits the heap for source and kwh on every one -- the bulk of the
+-- cost for accounts with years of hourly history. Carrying both as INCLUDE
+-- columns lets Postgres answer it with an index-only scan. Together with 063
+-- (transactions side) the whole balance query stays in indexes.
+--
+-- As in 063, the old (account_number, reading_hour) index becomes a redundant
+-- prefix and is NOT dropped here; drop it by hand once every
+-- *_acct_hour_cov index shows as valid in pg_index.
+--
+-- CREATE INDEX CONCURRENTLY doesn't work on a partitioned table, so on the
+-- partitioned layout from 044 this follows the documented pattern:
+--   1. CREATE INDEX ... ON ONLY the parent (catalog-only, starts invalid)
+--   2. CREATE INDEX CONCURRENTLY on each partition (no write lock)
+--   3. ALTER INDEX ... ATTACH PARTITION each one; the parent index turns
+--      valid once every partition is attached.
+-- A DB that never ran 044 (plain table) gets one concurrent build instead.
+-- Statements are generated from the catalog with \gexec so new yearly
+-- partitions are picked up on re-run; psql -f runs each one in autocommit,
+-- so no BEGIN/COMMIT here. If a concurrent build fails it leaves an INVALID
+-- index that ATTACH rejects: drop that partition's index and re-run.
+
+-- Unpartitioned table
+SELECT 'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_hc_account_hour_cov
+            ON hourly_consumption (account_number, reading_hour)
+            INCLUDE (source, kwh)'
+FROM pg_class
+WHERE oid = 'hourly_consumption'::regclass AND relkind = 'r'
+\gexec
+
+-- Partitioned table: 1. parent
+SELECT 'CREATE INDEX IF NOT EXISTS idx_hc_account_hour_cov
+            ON ONLY hourly_consumption (account_number, reading_hour)
+            INCLUDE (source, kwh)'
+FROM pg_class
+WHERE oid = 'hourly_consumption'::regclass AND relkind = 'p'
+\gexec
+
+-- 2. one concurrent build per partition
+SELECT format(
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS %I ON %s (account_number, reading_hour) INCLUDE (source, kwh)',
+    c.relname || '_acct_hour_cov', c.oid::regclass)
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'hourly_consumption'::regclass
+ORDER BY c.relname
+\gexec
+
+-- 3. attach (a no-op for partitions already attached)
+SELECT format(
+    'ALTER INDEX idx_hc_account_hour_cov ATTACH PARTITION %I',
+    c.relname || '_acct_hour_cov')
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'hourly_consumption'::regclass
+ORDER BY c.relname
+\gexec
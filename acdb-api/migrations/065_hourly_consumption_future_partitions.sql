@@ -0,0 +1,58 @@
+-- Migration 065: Keep hourly_consumption yearly partitions ahead of the clock
+--
+-- 044 created yearly partitions through 2027 plus a DEFAULT partition. Once
+-- rows for 2028 start landing in DEFAULT, CREATE TABLE ... PARTITION OF for
+-- 2028 fails ("updated partition constraint for default partition would be
+-- violated") until those rows are moved by hand, and meanwhile they sit in
+-- one ever-growing unpruned partition.
+--
+-- This creates the partition for every year from the current one through
+-- two years ahead, if missing. A year whose range already has rows in
+-- DEFAULT is skipped with a NOTICE rather than failing the deploy. Like any
+-- migration it is applied once (apply_incremental records it); the yearly
+-- top-up after that is ensure_hourly_consumption_partitions() (070), run
+-- nightly by scripts/ops/refresh_consumption_rollup.py.
+--
+-- No-op on a DB where hourly_consumption isn't partitioned (044 not run).
+
+DO $$
+DECLARE
+    yr      int;
+    lo      timestamptz;
+    hi      timestamptz;
+    part    text;
+    has_default boolean;
+    stray   boolean;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'hourly_consumption'::regclass) <> 'p' THEN
+        RAISE NOTICE 'hourly_consumption is not partitioned; skipping';
+        RETURN;
+    END IF;
+
+    has_default := to_regclass('hourly_consumption_default') IS NOT NULL;
+
+    FOR yr IN EXTRACT(YEAR FROM now())::int .. EXTRACT(YEAR FROM now())::int + 2 LOOP
+        part := format('hourly_consumption_%s', yr);
+        CONTINUE WHEN to_regclass(part) IS NOT NULL;
+
+        lo := make_timestamptz(yr, 1, 1, 0, 0, 0, 'UTC');
+        hi := make_timestamptz(yr + 1, 1, 1, 0, 0, 0, 'UTC');
+
+        IF has_default THEN
+            EXECUTE 'SELECT EXISTS (SELECT 1 FROM hourly_consumption_default
+                                    WHERE reading_hour >= $1 AND reading_hour < $2)'
+                INTO stray USING lo, hi;
+            IF stray THEN
+                RAISE NOTICE '% has rows in hourly_consumption_default; move them before creating %',
+                    yr, part;
+                CONTINUE;
+            END IF;
+        END IF;
+
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF hourly_consumption FOR VALUES FROM (%L) TO (%L)',
+            part, lo, hi);
+        RAISE NOTICE 'created %', part;
+    END LOOP;
+END
+$$;
@@ -0,0 +1,82 @@
+-- Migration 066: Per-account change counter for the balance display cache
+--
+-- balance_engine.get_balance_kwh_cached() keeps computed balances in a
+-- process-local cache. Writers in the API process drop entries directly, but
+-- the hourly import jobs run elsewhere, so entries had to expire after a
+-- short TTL to bound staleness -- and most display reads paid the full-history
+-- recompute anyway.
+--
+-- account_balance_versions carries a counter per account that is bumped by
+-- statement-level triggers whenever transactions or hourly_consumption rows
+-- for that account are inserted, updated or deleted, by any writer. A cached
+-- balance is reused while its account's counter is unchanged: one primary-key
+-- lookup instead of the recompute.
+--
+-- The balance itself is deliberately NOT maintained incrementally here: the
+-- per-hour SM/1M pick (MAX per source, priority-dependent) and re-imported
+-- hours can't be expressed as "balance -= NEW.kwh" (see the balance_engine
+-- module docstring).
+--
+-- Statement-level triggers with transition tables fire once per statement
+-- (one upsert per distinct account, not per row) and, on the partitioned
+-- hourly_consumption from 044, see rows routed to every partition. The
+-- upsert touches its accounts in account_number order so that concurrent
+-- multi-account writers (sync_consumption, import_hourly, import_tc_live,
+-- ingest batches) take the row locks in the same order and can't deadlock.
+
+CREATE TABLE IF NOT EXISTS account_balance_versions (
+    account_number TEXT PRIMARY KEY,
+    version        BIGINT NOT NULL DEFAULT 1,
+    changed_at     TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION bump_account_balance_version()
+RETURNS trigger AS $$
+BEGIN
+    INSERT INTO account_balance_versions (account_number)
+    SELECT account_number FROM changed_rows
+    WHERE account_number IS NOT NULL
+    GROUP BY account_number
+    ORDER BY account_number
+    ON CONFLICT (account_number) DO UPDATE
+        SET version = account_balance_versions.version + 1,
+            changed_at = NOW();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_txn_balance_version_ins ON transactions;
+CREATE TRIGGER trg_txn_balance_version_ins
+    AFTER INSERT ON transactions
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_account_balance_version();
+
+DROP TRIGGER IF EXISTS trg_txn_balance_version_upd ON transactions;
+CREATE TRIGGER trg_txn_balance_version_upd
+    AFTER UPDATE ON transactions
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_account_balance_version();
+
+DROP TRIGGER IF EXISTS trg_txn_balance_version_del ON transactions;
+CREATE TRIGGER trg_txn_balance_version_del
+    AFTER DELETE ON transactions
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_account_balance_version();
+
+DROP TRIGGER IF EXISTS trg_hc_balance_version_ins ON hourly_consumption;
+CREATE TRIGGER trg_hc_balance_version_ins
+    AFTER INSERT ON hourly_consumption
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_account_balance_version();
+
+DROP TRIGGER IF EXISTS trg_hc_balance_version_upd ON hourly_consumption;
+CREATE TRIGGER trg_hc_balance_version_upd
+    AFTER UPDATE ON hourly_consumption
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_account_balance_version();
+
+DROP TRIGGER IF EXISTS trg_hc_balance_version_del ON hourly_consumption;
+CREATE TRIGGER trg_hc_balance_version_del
+    AFTER DELETE ON hourly_consumption
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_account_balance_version();
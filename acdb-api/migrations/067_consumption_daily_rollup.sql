@@ -0,0 +1,88 @@
+-- Migration 067: Daily consumption rollup for the balance engine
+--
+-- get_balance_kwh() sums every hourly_consumption hour an account has ever
+-- had. consumption_daily_rollup keeps, per account and UTC day, that day's
+-- total under each billing priority:
+--   sm_first_kwh = SUM over the day's hours of COALESCE(sm, 1m)
+--   m1_first_kwh = SUM over the day's hours of COALESCE(1m, sm)
+-- (the same per-hour MAX-per-source pick as balance_engine._PER_HOUR_CTE),
+-- so a priority switch needs no rebuild.
+--
+-- consumption_rollup_watermark.through_day says which rollup rows are
+-- trustworthy: every day < through_day. The balance query reads those from
+-- the rollup and only the hours from through_day on from hourly_consumption.
+--
+-- The rollup is filled by scripts/ops/refresh_consumption_rollup.py, not by
+-- triggers: SM imports and 1Meter backfills re-upsert hours, and a
+-- per-source MAX can't be maintained as a running sum. Instead, any insert,
+-- update or delete of an hour before an account's watermark moves the
+-- watermark back to that hour's day, so the balance falls back to hourly rows
+-- for it until the next refresh. The trigger waits on the refresh's row lock,
+-- so a late write can't slip between the refresh's read and its watermark
+-- update.
+--
+-- Unused until CC_BALANCE_DAILY_ROLLUP=1 is set for the API.
+
+CREATE TABLE IF NOT EXISTS consumption_daily_rollup (
+    account_number TEXT    NOT NULL,
+    day            DATE    NOT NULL,
+    sm_first_kwh   NUMERIC NOT NULL,
+    m1_first_kwh   NUMERIC NOT NULL,
+    PRIMARY KEY (account_number, day)
+);
+
+CREATE TABLE IF NOT EXISTS consumption_rollup_watermark (
+    account_number TEXT PRIMARY KEY,
+    through_day    DATE NOT NULL,
+    refreshed_at   TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- An UPDATE can move an hour (reading_hour / account_number), so it rewinds
+-- to the earlier of the old and new day.
+CREATE OR REPLACE FUNCTION rewind_consumption_rollup()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        UPDATE consumption_rollup_watermark w
+        SET through_day = t.min_day
+        FROM (
+            SELECT account_number, MIN((reading_hour AT TIME ZONE 'UTC')::date) AS min_day
+            FROM (SELECT account_number, reading_hour FROM changed_rows
+                  UNION ALL
+                  SELECT account_number, reading_hour FROM old_rows) u
+            GROUP BY account_number
+        ) t
+        WHERE w.account_number = t.account_number
+          AND t.min_day < w.through_day;
+    ELSE
+        UPDATE consumption_rollup_watermark w
+        SET through_day = t.min_day
+        FROM (
+            SELECT account_number, MIN((reading_hour AT TIME ZONE 'UTC')::date) AS min_day
+            FROM changed_rows
+            GROUP BY account_number
+        ) t
+        WHERE w.account_number = t.account_number
+          AND t.min_day < w.through_day;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_hc_rollup_rewind_ins ON hourly_consumption;
+CREATE TRIGGER trg_hc_rollup_rewind_ins
+    AFTER INSERT ON hourly_consumption
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rewind_consumption_rollup();
+
+DROP TRIGGER IF EXISTS trg_hc_rollup_rewind_upd ON hourly_consumption;
+CREATE TRIGGER trg_hc_rollup_rewind_upd
+    AFTER UPDATE ON hourly_consumption
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rewind_consumption_rollup();
+
+DROP TRIGGER IF EXISTS trg_hc_rollup_rewind_del ON hourly_consumption;
+CREATE TRIGGER trg_hc_rollup_rewind_del
+    AFTER DELETE ON hourly_consumption
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rewind_consumption_rollup();
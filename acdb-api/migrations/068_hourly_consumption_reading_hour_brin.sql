@@ -0,0 +1,52 @@
+-- Migration 068: BRIN index on hourly_consumption.reading_hour
+--
+-- Fleet-wide time-window reads -- analytics consumption series and exports
+-- (analytics.py, "reading_hour >= ... AND reading_hour < ..."), O&M report
+-- pulls -- filter on reading_hour alone. 044's b-trees all lead with
+-- account_number / community / meter_id, so within a yearly partition those
+-- queries scan every row. hourly_consumption is written close to time order,
+-- so a BRIN summary of reading_hour (a few pages per partition) lets them
+-- skip block ranges outside the window.
+--
+-- The per-account balance read doesn't use this; it stays on 064's
+-- (account_number, reading_hour) covering index.
+--
+-- Same catalog-driven layout as 064: a plain table gets one concurrent
+-- build; a partitioned one gets the index ON ONLY the parent, a concurrent
+-- build per partition, then ATTACH. Re-run to cover partitions added later.
+
+-- Unpartitioned table
+SELECT 'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_hc_reading_hour_brin
+            ON hourly_consumption USING brin (reading_hour)
+            WITH (pages_per_range = 32)'
+FROM pg_class
+WHERE oid = 'hourly_consumption'::regclass AND relkind = 'r'
+\gexec
+
+-- Partitioned table: 1. parent
+SELECT 'CREATE INDEX IF NOT EXISTS idx_hc_reading_hour_brin
+            ON ONLY hourly_consumption USING brin (reading_hour)
+            WITH (pages_per_range = 32)'
+FROM pg_class
+WHERE oid = 'hourly_consumption'::regclass AND relkind = 'p'
+\gexec
+
+-- 2. one concurrent build per partition
+SELECT format(
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS %I ON %s USING brin (reading_hour) WITH (pages_per_range = 32)',
+    c.relname || '_hour_brin', c.oid::regclass)
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'hourly_consumption'::regclass
+ORDER BY c.relname
+\gexec
+
+-- 3. attach (a no-op for partitions already attached)
+SELECT format(
+    'ALTER INDEX idx_hc_reading_hour_brin ATTACH PARTITION %I',
+    c.relname || '_hour_brin')
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'hourly_consumption'::regclass
+ORDER BY c.relname
+\gexec
@@ -0,0 +1,41 @@
+-- Migration 069: Indexes for the commission customer / contract lookups
+--
+-- Every commission form load, execute and contract listing resolves
+-- (commission.py _RESOLVE_*_SQL, list_contracts_for_customer):
+--   * the customer by customers.customer_id_legacy,
+--   * the customer's newest account:
+--       accounts WHERE customer_id = ? ORDER BY opened_date DESC NULLS LAST LIMIT 1
+--   * the account's newest meter:
+--       meters WHERE account_number = ? ORDER BY customer_connect_date DESC NULLS LAST LIMIT 1
+-- Matching the ORDER BY (including NULLS LAST) turns the per-customer sort
+-- into a single index probe; the INCLUDE columns are everything those
+-- subqueries read, so they are answered by index-only scans.
+--
+-- (meters are keyed by account_number, not customer: meters.customer_id_legacy
+-- was dropped in 001.)
+--
+-- CONCURRENTLY: all three tables take writes from commissioning, ingest and
+-- the SparkMeter sync. psql -f runs each statement in autocommit, so no
+-- BEGIN/COMMIT here. As in 063, a failed build leaves an INVALID index that
+-- IF NOT EXISTS skips on re-run -- drop it by hand and re-apply.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_accounts_customer_opened
+    ON accounts (customer_id, opened_date DESC NULLS LAST)
+    INCLUDE (account_number);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_meters_account_connect
+    ON meters (account_number, customer_connect_date DESC NULLS LAST)
+    INCLUDE (meter_id, community);
+
+-- customers.customer_id_legacy: only when no existing index (unique or not,
+-- whatever its name) already leads with the column.
+SELECT 'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_customers_legacy_id
+            ON customers (customer_id_legacy)'
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM pg_index i
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+    WHERE i.indrelid = 'customers'::regclass
+      AND a.attname = 'customer_id_legacy'
+)
+\gexec
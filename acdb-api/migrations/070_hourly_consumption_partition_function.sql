@@ -0,0 +1,70 @@
+-- Migration 070: Keep creating hourly_consumption partitions after deploy
+--
+-- 065 pre-created the yearly partitions up to two years ahead, but like every
+-- migration it runs once: apply_incremental records it in
+-- cc_schema_migrations and skips it on later deploys, so the years after that
+-- first run would still end up in DEFAULT.
+--
+-- The same logic now lives in ensure_hourly_consumption_partitions(), which
+-- scripts/ops/refresh_consumption_rollup.py calls on every nightly run
+-- (cc-consumption-rollup.timer) before it refreshes the rollup. It creates
+-- the partition for every year from the current one through years_ahead
+-- years ahead, if missing, and returns how many it created. A year whose
+-- range already has rows in DEFAULT is skipped with a NOTICE.
+--
+-- SECURITY DEFINER: the nightly job connects as the API role, which doesn't
+-- own hourly_consumption; the function runs as its owner (the postgres user
+-- that applies migrations).
+--
+-- No-op on a DB where hourly_consumption isn't partitioned (044 not run).
+
+CREATE OR REPLACE FUNCTION ensure_hourly_consumption_partitions(years_ahead int DEFAULT 2)
+RETURNS int
+SECURITY DEFINER
+SET search_path = public, pg_temp
+AS $$
+DECLARE
+    yr      int;
+    lo      timestamptz;
+    hi      timestamptz;
+    part    text;
+    has_default boolean;
+    stray   boolean;
+    created int := 0;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'hourly_consumption'::regclass) <> 'p' THEN
+        RAISE NOTICE 'hourly_consumption is not partitioned; skipping';
+        RETURN 0;
+    END IF;
+
+    has_default := to_regclass('hourly_consumption_default') IS NOT NULL;
+
+    FOR yr IN EXTRACT(YEAR FROM now())::int .. EXTRACT(YEAR FROM now())::int + years_ahead LOOP
+        part := format('hourly_consumption_%s', yr);
+        CONTINUE WHEN to_regclass(part) IS NOT NULL;
+
+        lo := make_timestamptz(yr, 1, 1, 0, 0, 0, 'UTC');
+        hi := make_timestamptz(yr + 1, 1, 1, 0, 0, 0, 'UTC');
+
+        IF has_default THEN
+            EXECUTE 'SELECT EXISTS (SELECT 1 FROM hourly_consumption_default
+                                    WHERE reading_hour >= $1 AND reading_hour < $2)'
+                INTO stray USING lo, hi;
+            IF stray THEN
+                RAISE NOTICE '% has rows in hourly_consumption_default; move them before creating %',
+                    yr, part;
+                CONTINUE;
+            END IF;
+        END IF;
+
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF hourly_consumption FOR VALUES FROM (%L) TO (%L)',
+            part, lo, hi);
+        RAISE NOTICE 'created %', part;
+        created := created + 1;
+    END LOOP;
+    RETURN created;
+END
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_hourly_consumption_partitions();
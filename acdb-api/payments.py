@@ -21,8 +21,9 @@ from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException,
 from pydantic import BaseModel, Field
 
 from customer_api import get_connection
+from db_errors import PoolExhausted
 from sm_credit_retry import credit_sm_with_retry, process_due_sm_credit_retries
-from balance_engine import get_balance_kwh, record_payment_kwh, record_fee_transaction
+from balance_engine import get_balance_kwh, record_payment_kwh, record_fee_transaction, written_recently
 from financing import compute_financing_split, apply_financing_payment
 from advances import (
     apply_advance_payment,
@@ -413,7 +414,7 @@ def payment_webhook(
                 }
             return result
 
-    except HTTPException:
+    except (HTTPException, PoolExhausted):
         raise
     except Exception as e:
         logger.error("Payment webhook failed: %s", e)
@@ -695,6 +696,8 @@ def record_manual_payment(
             ) from e
         logger.error("Manual payment failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e)) from e
+    except PoolExhausted:
+        raise
     except Exception as e:
         logger.error("Manual payment failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -824,8 +827,14 @@ def _balance_payload_for_conn(conn, account_number: str) -> dict:
 
 
 def _balance_payload(account_number: str) -> dict:
-    """Canonical balance from 1PDB via ``get_balance_kwh`` (same engine as portal dashboard)."""
-    with get_connection() as conn:
+    """Canonical balance from 1PDB via ``get_balance_kwh`` (same engine as portal dashboard).
+
+    Read-only, so it goes to the replica when ``DATABASE_URL_RO`` is set --
+    except just after this process wrote the account (payment, ingest)."""
+    from customer_api import get_read_connection
+
+    primary = written_recently((account_number or "").strip().upper())
+    with get_read_connection(primary=primary) as conn:
         return _balance_payload_for_conn(conn, account_number)
 
 
@@ -839,6 +848,8 @@ def get_balance(account_number: str):
     """
     try:
         return _balance_payload(account_number)
+    except PoolExhausted:
+        raise
     except Exception as e:
         logger.error("Balance query failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -866,7 +877,7 @@ def get_balance_for_sms_gateway(
             record_balance_gateway_request(conn, rate_key)
             conn.commit()
         return payload
-    except HTTPException:
+    except (HTTPException, PoolExhausted):
         raise
     except Exception as e:
         logger.error("Gateway balance query failed: %s", e)
@@ -907,7 +918,7 @@ def get_balances_by_phone_for_sms_gateway(
             record_balance_gateway_request(conn, rate_key)
             conn.commit()
             return {"phone": phone, "accounts": balances, "count": len(balances)}
-    except HTTPException:
+    except (HTTPException, PoolExhausted):
         raise
     except Exception as e:
         logger.error("Gateway balances-by-phone failed: %s", e)
@@ -944,6 +955,8 @@ def get_payment_history(
             total = cur.fetchone()[0]
 
             return {"transactions": rows, "total": total, "limit": limit, "offset": offset}
+    except PoolExhausted:
+        raise
     except Exception as e:
         logger.error("Payment history failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
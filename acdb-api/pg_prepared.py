@@ -0,0 +1,99 @@
+"""
+Server-side prepared statements on pooled psycopg2 connections.
+
+psycopg2 has no client-side prepare, so hot queries are PREPAREd by name the
+first time each connection runs them and EXECUTEd after that, skipping parse
+and plan on every call. Which names a connection holds is tracked against the
+connection object itself (weakly, so recycled connections drop out);
+prepared statements are session-scoped and survive commits and rollbacks, so
+the tracking stays exact for the life of the connection.
+
+Queries are written with psycopg2 ``%(name)s`` placeholders, as elsewhere in
+the codebase; :func:`to_prepared_sql` turns the per-call ones into ``$n``
+parameters and inlines the rest as literals.
+"""
+
+from __future__ import annotations
+
+import threading
+import weakref
+from typing import Any, Iterable, Mapping, Sequence
+
+from psycopg2.extensions import adapt
+
+_prepared: "weakref.WeakKeyDictionary[Any, set[str]]" = weakref.WeakKeyDictionary()
+# Names still held by the session but whose plan no longer fits the schema;
+# DEALLOCATEd before they are prepared again.
+_stale: "weakref.WeakKeyDictionary[Any, set[str]]" = weakref.WeakKeyDictionary()
+_prepared_lock = threading.Lock()
+
+# SQLSTATEs after which the caller can roll back and run the statement again:
+# 26000 invalid_sql_statement_name (the session lost it, e.g. DISCARD ALL) and
+# 0A000 "cached plan must not change result type" (a table it reads gained or
+# changed a column, e.g. a migration applied under a running API).
+RETRY_PGCODES = frozenset({"26000", "0A000"})
+
+
+def to_prepared_sql(sql: str, args: Sequence[str], constants: Mapping[str, Any]) -> str:
+    """Rewrite ``%(name)s`` placeholders for PREPARE.
+
+    Names in *args* become ``$1``, ``$2``, ... in that order; names in
+    *constants* are inlined as quoted SQL literals.
+    """
+    mapping = {name: f"${i}" for i, name in enumerate(args, start=1)}
+    for name, value in constants.items():
+        mapping[name] = adapt(value).getquoted().decode()
+    return sql % mapping
+
+
+def forget(conn, name: str | None = None) -> None:
+    """Stop treating *name* (or every statement) as prepared on *conn*."""
+    with _prepared_lock:
+        names = _prepared.get(conn)
+        if names is None:
+            return
+        if name is None:
+            names.clear()
+        else:
+            names.discard(name)
+
+
+def execute_prepared(
+    conn, cur, name: str, sql: str, arg_types: Sequence[str], args: Iterable[Any],
+) -> None:
+    """EXECUTE statement *name* on *cur*, PREPAREing *sql* first if *conn*
+    hasn't yet. *sql* uses ``$n`` parameters (see :func:`to_prepared_sql`)
+    whose types are given by *arg_types*; declaring them up front avoids
+    "inconsistent types deduced" when one parameter meets columns of
+    different types (e.g. ``varchar`` vs ``text`` account numbers).
+
+    A missing statement (SQLSTATE 26000, e.g. after a ``DISCARD ALL``) is
+    forgotten and the error re-raised, so the next call prepares it again;
+    one whose plan went stale (0A000) is also DEALLOCATEd on that next call.
+    Both are in :data:`RETRY_PGCODES`.
+    """
+    with _prepared_lock:
+        names = _prepared.setdefault(conn, set())
+        ready = name in names
+        stale = name in _stale.get(conn, ())
+    if not ready:
+        if stale:
+            cur.execute(f"DEALLOCATE {name}")
+            with _prepared_lock:
+                _stale[conn].discard(name)
+        types = f"({', '.join(arg_types)})" if arg_types else ""
+        cur.execute(f"PREPARE {name}{types} AS {sql}")
+        with _prepared_lock:
+            names.add(name)
+    args = tuple(args)
+    stmt = f"EXECUTE {name}({', '.join(['%s'] * len(args))})" if args else f"EXECUTE {name}"
+    try:
+        cur.execute(stmt, args or None)
+    except Exception as exc:
+        code = getattr(exc, "pgcode", None)
+        if code in RETRY_PGCODES:
+            forget(conn, name)
+        if code == "0A000":
+            with _prepared_lock:
+                _stale.setdefault(conn, set()).add(name)
+        raise
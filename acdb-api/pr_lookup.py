@@ -25,6 +25,7 @@ Firebase Admin SDK authenticates via the service-account JSON referenced by
 import logging
 import os
 import sqlite3
+import threading
 from typing import Any, Optional
 
 from fastapi import APIRouter
@@ -125,50 +126,107 @@ def get_all_pr_departments() -> list[dict]:
 
 _SQLITE_PATH = os.path.join(os.path.dirname(__file__), "cc_auth.db")
 
+# One long-lived connection per worker thread instead of a connect/close per
+# call. WAL lets the login-path reads run alongside the mapping writer, and
+# synchronous=NORMAL drops the per-commit fsync that WAL makes safe to skip.
+_email_db_local = threading.local()
 
-def _ensure_email_table():
-    try:
+
+def _email_db() -> sqlite3.Connection:
+    conn = getattr(_email_db_local, "conn", None)
+    if conn is None:
         conn = sqlite3.connect(_SQLITE_PATH)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS cc_employee_emails (
-                employee_id TEXT PRIMARY KEY,
-                email TEXT NOT NULL
-            )
-        """)
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        logger.error("Failed to create cc_employee_emails table: %s", e)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _ensure_email_table(conn)
+        _email_db_local.conn = conn
+    return conn
+
+
+def _drop_email_db():
+    """Forget this thread's connection after an error; the next call reconnects."""
+    conn = getattr(_email_db_local, "conn", None)
+    _email_db_local.conn = None
+    if conn is not None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def _ensure_email_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cc_employee_emails (
+            employee_id TEXT PRIMARY KEY,
+            email TEXT NOT NULL
+        )
+    """)
+    conn.commit()
 
 
 def get_employee_email(employee_id: str) -> Optional[str]:
     try:
-        _ensure_email_table()
-        conn = sqlite3.connect(_SQLITE_PATH)
-        row = conn.execute(
+        row = _email_db().execute(
             "SELECT email FROM cc_employee_emails WHERE employee_id = ?",
             (str(employee_id),),
         ).fetchone()
-        conn.close()
         return row[0] if row else None
     except Exception as e:
         logger.error("SQLite email lookup failed for %s: %s", employee_id, e)
+        _drop_email_db()
         return None
 
 
+def list_employee_emails() -> list[dict]:
+    """All employee_id → email mappings, ordered by employee_id ([] on failure)."""
+    try:
+        rows = _email_db().execute(
+            "SELECT employee_id, email FROM cc_employee_emails ORDER BY employee_id"
+        ).fetchall()
+        return [{"employee_id": r[0], "email": r[1]} for r in rows]
+    except Exception as e:
+        logger.error("SQLite email listing failed: %s", e)
+        _drop_email_db()
+        return []
+
+
 def set_employee_email(employee_id: str, email: str):
     try:
-        _ensure_email_table()
-        conn = sqlite3.connect(_SQLITE_PATH)
-        conn.execute(
-            "INSERT OR REPLACE INTO cc_employee_emails (employee_id, email) VALUES (?, ?)",
-            (str(employee_id), email.lower().strip()),
-        )
-        conn.commit()
-        conn.close()
+        conn = _email_db()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cc_employee_emails (employee_id, email) VALUES (?, ?)",
+                (str(employee_id), email.lower().strip()),
+            )
         logger.info("Stored email mapping: %s → %s", employee_id, email)
     except Exception as e:
         logger.error("SQLite email store failed for %s: %s", employee_id, e)
+        _drop_email_db()
+
+
+def set_employee_emails_bulk(pairs: list[tuple[str, str]]) -> int:
+    """Upsert many employee_id → email mappings in one transaction.
+
+    Same normalisation as ``set_employee_email`` (last entry wins for a
+    repeated employee_id), but one commit instead of one fsync per row.
+    Returns the number of rows written (0 on failure)."""
+    rows = [(str(eid), email.lower().strip()) for eid, email in pairs]
+    if not rows:
+        return 0
+    try:
+        conn = _email_db()
+        with conn:
+            conn.executemany(
+                "INSERT INTO cc_employee_emails (employee_id, email) VALUES (?, ?) "
+                "ON CONFLICT(employee_id) DO UPDATE SET email = excluded.email",
+                rows,
+            )
+        logger.info("Stored %d email mappings", len(rows))
+        return len(rows)
+    except Exception as e:
+        logger.error("SQLite bulk email store failed (%d rows): %s", len(rows), e)
+        _drop_email_db()
+        return 0
 
 
 # ---------------------------------------------------------------------------
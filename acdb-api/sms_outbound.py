@@ -4,15 +4,25 @@ Outbound customer SMS via the national gateway (PHP ``generate_and_send.php``).
 Uses ``SMS_SERVER_URL`` (same as contract SMS). Country-aware MSISDN formatting
 via ``country_config.COUNTRY.dial_code``. Every send attempt is logged to
 ``sms_outbound_log``.
+
+Sends are paced process-wide to ``CC_SMS_GATEWAY_MAX_PER_S`` so a burst
+(bulk commissioning, receipt backlogs) queues here instead of being throttled
+by the gateway, and requests the gateway provably didn't take (connect
+timeout, connection refused, HTTP 429/503) are retried
+``CC_SMS_GATEWAY_RETRIES`` times with backoff. Read timeouts, dropped
+connections and other errors are not retried: the SMS may have gone out.
 """
 
 from __future__ import annotations
 
 import logging
 import os
+import threading
+import time
 from urllib.parse import quote
 
 import requests
+from urllib3.exceptions import NewConnectionError
 
 from country_config import COUNTRY
 
@@ -20,6 +30,58 @@ logger = logging.getLogger("cc-api.sms-outbound")
 
 SMS_SERVER_URL = os.environ.get("SMS_SERVER_URL")
 
+SMS_GATEWAY_MAX_PER_S = float(os.environ.get("CC_SMS_GATEWAY_MAX_PER_S", "3"))
+SMS_GATEWAY_RETRIES = int(os.environ.get("CC_SMS_GATEWAY_RETRIES", "2"))
+_RETRY_BACKOFF_S = 1.0
+_RETRYABLE_STATUS = (429, 503)
+
+_pace_lock = threading.Lock()
+_next_send_at = 0.0
+
+
+def _wait_for_send_slot() -> None:
+    """Block until this process may send again (CC_SMS_GATEWAY_MAX_PER_S)."""
+    global _next_send_at
+    if SMS_GATEWAY_MAX_PER_S <= 0:
+        return
+    with _pace_lock:
+        now = time.monotonic()
+        slot = max(now, _next_send_at)
+        _next_send_at = slot + 1.0 / SMS_GATEWAY_MAX_PER_S
+    if slot > now:
+        time.sleep(slot - now)
+
+
+def _never_reached_gateway(exc: requests.exceptions.ConnectionError) -> bool:
+    """True when no connection was made (connect timeout, refused, DNS).
+
+    requests also raises ConnectionError for a connection dropped mid-request
+    ("Connection aborted", urllib3 ProtocolError), by which time the gateway
+    may already have sent the SMS.
+    """
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    cause = exc.args[0] if exc.args else None
+    cause = getattr(cause, "reason", cause)  # urllib3 MaxRetryError wraps it
+    return isinstance(cause, NewConnectionError)
+
+
+def _gateway_get(url: str) -> requests.Response:
+    """Paced GET, retrying only failures where the gateway took nothing."""
+    attempt = 0
+    while True:
+        _wait_for_send_slot()
+        try:
+            resp = requests.get(url, timeout=20, allow_redirects=False)
+        except requests.exceptions.ConnectionError as exc:
+            if not _never_reached_gateway(exc) or attempt >= SMS_GATEWAY_RETRIES:
+                raise
+        else:
+            if resp.status_code not in _RETRYABLE_STATUS or attempt >= SMS_GATEWAY_RETRIES:
+                return resp
+        attempt += 1
+        time.sleep(_RETRY_BACKOFF_S * (2 ** (attempt - 1)))
+
 
 def format_phone_for_sms_gateway(phone: str, dial_code: str | None = None) -> str:
     """Normalize handset for CM.com / gateway (digits only, international)."""
@@ -111,7 +173,7 @@ def send_gateway_sms(
         f"?message={quote(message)}&type={quote(sms_type)}&number={phone_normalized}"
     )
     try:
-        resp = requests.get(url, timeout=20, allow_redirects=False)
+        resp = _gateway_get(url)
         # Treat non-2xx (including 3xx redirects) as gateway failures.
         if not (200 <= resp.status_code < 300):
             body_preview = (resp.text or "").strip().replace("\n", " ")[:240]
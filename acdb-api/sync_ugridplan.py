@@ -917,22 +917,17 @@ def _compute_commissioning_date(cursor, account_number: str) -> Optional[str]:
     Returns ISO date string (YYYY-MM-DD) or None if insufficient data.
     """
     try:
-        # First transaction date for this account
+        # First transaction date, then the earliest consumption on or after
+        # it, in one round-trip (NULL when either is missing).
         cursor.execute(
-            "SELECT MIN(transaction_date) FROM transactions "
-            "WHERE account_number = %s AND transaction_date IS NOT NULL",
-            (account_number,),
-        )
-        row = cursor.fetchone()
-        if not row or not row[0]:
-            return None
-        first_txn = row[0]
-
-        # Earliest consumption on or after first transaction
-        cursor.execute(
-            "SELECT MIN(reading_hour) FROM hourly_consumption "
-            "WHERE account_number = %s AND reading_hour >= %s AND kwh > 0",
-            (account_number, first_txn),
+            "SELECT h.first_hour "
+            "FROM (SELECT MIN(transaction_date) AS first_txn FROM transactions "
+            "      WHERE account_number = %(acct)s AND transaction_date IS NOT NULL) t "
+            "CROSS JOIN LATERAL ("
+            "    SELECT MIN(reading_hour) AS first_hour FROM hourly_consumption "
+            "    WHERE account_number = %(acct)s AND reading_hour >= t.first_txn AND kwh > 0"
+            ") h",
+            {"acct": account_number},
         )
         row = cursor.fetchone()
         if not row or not row[0]:
@@ -1893,7 +1888,7 @@ def sync_preview(
         raise HTTPException(status_code=502, detail=f"uGridPLAN fetch failed: {e}")
 
     # Fetch customers + meter data for this site
-    from customer_api import get_connection, _row_to_dict, _normalize_customer
+    from customer_api import get_connection, _rows_to_dicts, _normalize_customer
     from om_report import SITE_ABBREV
 
     site_code = site.upper()
@@ -1906,7 +1901,7 @@ def sync_preview(
             (site_code, f"%{concession_name}%"),
         )
         rows = cursor.fetchall()
-        cc_customers = [_normalize_customer(_row_to_dict(cursor, r)) for r in rows]
+        cc_customers = [_normalize_customer(rd) for rd in _rows_to_dicts(cursor, rows)]
 
         # Also load meter data for this site (community = site code)
         cc_meters = _load_meter_data(cursor, site_code)
@@ -1968,7 +1963,7 @@ def sync_execute(
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"uGridPLAN fetch failed: {e}")
 
-    from customer_api import get_connection, _row_to_dict, _normalize_customer
+    from customer_api import get_connection, _rows_to_dicts, _normalize_customer
     from om_report import SITE_ABBREV
 
     site_code = req.site.upper()
@@ -1988,7 +1983,7 @@ def sync_execute(
             (site_code, f"%{concession_name}%"),
         )
         rows = cursor.fetchall()
-        cc_customers = [_normalize_customer(_row_to_dict(cursor, r)) for r in rows]
+        cc_customers = [_normalize_customer(rd) for rd in _rows_to_dicts(cursor, rows)]
 
         cc_meters = _load_meter_data(cursor, site_code)
 
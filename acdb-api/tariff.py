@@ -20,6 +20,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
 
 from db_auth import get_auth_db
+from db_errors import PoolExhausted
 from models import CCRole, CurrentUser
 from middleware import require_employee
 from mutations import try_log_mutation
@@ -347,6 +348,8 @@ def update_global_rate(
                     (req.rate_lsl,),
                 )
                 conn.commit()
+        except PoolExhausted:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to update system_config: {e}")
 
@@ -0,0 +1,207 @@
+"""Unit tests for customer account-number handling in auth.py."""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+os.environ.setdefault("CC_JWT_SECRET", "unit-test-secret")
+
+
+# Stub customer_api so auth.py imports without a database -- same pattern as
+# test_auth_pin_broadcast.
+def _install_stubs():
+    if "customer_api" not in sys.modules:
+        m = types.ModuleType("customer_api")
+        m.get_connection = lambda: None  # type: ignore[attr-defined]
+        m._row_to_dict = lambda *a, **k: {}  # type: ignore[attr-defined]
+        m._normalize_customer = lambda d: d  # type: ignore[attr-defined]
+        sys.modules["customer_api"] = m
+
+
+_install_stubs()
+
+import auth  # noqa: E402
+import db_auth  # noqa: E402
+import pg_prepared  # noqa: E402
+
+
+class NormalizeAccountNumberTests(unittest.TestCase):
+    def test_canonical(self):
+        self.assertEqual(auth.normalize_account_number("0045MAK"), "0045MAK")
+
+    def test_lowercase_site(self):
+        self.assertEqual(auth.normalize_account_number(" 0045mak "), "0045MAK")
+
+    def test_reversed(self):
+        self.assertEqual(auth.normalize_account_number("MAK0045"), "0045MAK")
+        self.assertEqual(auth.normalize_account_number("mak0045"), "0045MAK")
+
+    def test_unrecognised_returned_stripped(self):
+        for raw in ("45MAK", "0045MAKX", "00-5MAK", "", "  1234567 "):
+            self.assertEqual(auth.normalize_account_number(raw), raw.strip())
+
+    def test_matches_regex_slow_path(self):
+        # Fast path must agree with the regex forms it short-circuits.
+        for raw in ("0045MAK", "0045mak", "MAK0045", "maK0045", "1234ABC", "ABC1234"):
+            m = auth._RE_DB_FMT.match(raw)
+            expected = m.group(1) + m.group(2).upper() if m else None
+            if expected is None:
+                m = auth._RE_REVERSE_FMT.match(raw)
+                expected = m.group(2) + m.group(1).upper()
+            self.assertEqual(auth.normalize_account_number(raw), expected)
+
+
+class AccountCacheTests(unittest.TestCase):
+    def setUp(self):
+        auth.invalidate_account_cache()
+
+    def tearDown(self):
+        auth.invalidate_account_cache()
+
+    def _fake_lookup(self, acct):
+        return {"account_number": acct, "customer_id_legacy": "45", "name": "Jane Doe",
+                "customer": {"first_name": "Jane"}}
+
+    def test_second_lookup_is_served_from_cache(self):
+        with patch.object(auth, "_lookup_account", side_effect=self._fake_lookup) as lookup:
+            first = auth._validate_account_exists("0045MAK")
+            second = auth._validate_account_exists("mak0045")
+        self.assertEqual(lookup.call_count, 1)
+        self.assertEqual(first, second)
+
+    def test_cached_result_is_a_copy(self):
+        with patch.object(auth, "_lookup_account", side_effect=self._fake_lookup):
+            first = auth._validate_account_exists("0045MAK")
+            first["customer"]["first_name"] = "mutated"
+            again = auth._validate_account_exists("0045MAK")
+        self.assertEqual(again["customer"]["first_name"], "Jane")
+
+    def test_not_found_is_not_cached(self):
+        err = auth.HTTPException(status_code=404, detail="nope")
+        with patch.object(auth, "_lookup_account", side_effect=err) as lookup:
+            for _ in range(2):
+                with self.assertRaises(auth.HTTPException):
+                    auth._validate_account_exists("0099MAK")
+        self.assertEqual(lookup.call_count, 2)
+
+    def test_invalidate_single_account(self):
+        with patch.object(auth, "_lookup_account", side_effect=self._fake_lookup) as lookup:
+            auth._validate_account_exists("0045MAK")
+            auth.invalidate_account_cache("MAK0045")
+            auth._validate_account_exists("0045MAK")
+        self.assertEqual(lookup.call_count, 2)
+
+
+class PreparedAccountLookupTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = MagicMock()
+        self.cur = self.conn.cursor.return_value
+
+    def _verbs(self):
+        return [c.args[0].split()[0] for c in self.cur.execute.call_args_list]
+
+    def test_prepares_once_per_connection(self):
+        for _ in range(3):
+            auth._execute_account_lookup(self.conn, self.cur, "0045MAK")
+        self.assertEqual(self._verbs(), ["PREPARE", "EXECUTE", "EXECUTE", "EXECUTE"])
+
+    def test_reprepares_when_statement_is_missing(self):
+        auth._execute_account_lookup(self.conn, self.cur, "0045MAK")
+        self.cur.execute.reset_mock()
+        missing = Exception("prepared statement does not exist")
+        missing.pgcode = "26000"
+        self.cur.execute.side_effect = [missing, None, None]
+        auth._execute_account_lookup(self.conn, self.cur, "0045MAK")
+        self.assertEqual(self._verbs(), ["EXECUTE", "PREPARE", "EXECUTE"])
+        self.conn.rollback.assert_called_once()
+
+    def test_stale_plan_is_deallocated_and_reprepared(self):
+        auth._execute_account_lookup(self.conn, self.cur, "0045MAK")
+        self.cur.execute.reset_mock()
+        stale = Exception("cached plan must not change result type")
+        stale.pgcode = "0A000"
+        self.cur.execute.side_effect = [stale, None, None, None]
+        auth._execute_account_lookup(self.conn, self.cur, "0045MAK")
+        self.assertEqual(self._verbs(), ["EXECUTE", "DEALLOCATE", "PREPARE", "EXECUTE"])
+        self.conn.rollback.assert_called_once()
+
+        self.cur.execute.reset_mock()
+        self.cur.execute.side_effect = None
+        auth._execute_account_lookup(self.conn, self.cur, "0045MAK")
+        self.assertEqual(self._verbs(), ["EXECUTE"])
+
+    def test_lookup_names_its_customer_columns(self):
+        self.assertNotIn("c.*", auth._ACCOUNT_LOOKUP_SQL)
+
+
+class CustomerLoginNameTests(unittest.TestCase):
+    """Login takes the display name from the password row, not the DB."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._db = patch.object(db_auth, "AUTH_DB_PATH", os.path.join(self._tmp.name, "auth.db"))
+        self._db.start()
+        db_auth.init_auth_db()
+
+    def tearDown(self):
+        self._db.stop()
+        self._tmp.cleanup()
+
+    def _login(self):
+        req = auth.CustomerLoginRequest(customer_id="0045MAK", password="pw")
+        with patch.object(auth, "_verify_password", return_value=True):
+            return auth.customer_login(req)
+
+    def test_stored_name_skips_account_lookup(self):
+        db_auth.set_customer_password("0045MAK", "hash", display_name="Jane Doe")
+        with patch.object(auth, "_validate_account_exists") as lookup:
+            resp = self._login()
+        lookup.assert_not_called()
+        self.assertEqual(resp.user["name"], "Jane Doe")
+
+    def test_missing_name_is_looked_up_once_and_backfilled(self):
+        db_auth.set_customer_password("0045MAK", "hash")
+        with patch.object(auth, "_validate_account_exists", return_value={"name": "Jane Doe"}) as lookup:
+            self._login()
+            resp = self._login()
+        self.assertEqual(lookup.call_count, 1)
+        self.assertEqual(resp.user["name"], "Jane Doe")
+        self.assertEqual(db_auth.get_customer_credentials("0045MAK"), ("hash", "Jane Doe"))
+
+    def test_register_without_customer_record_stores_no_name(self):
+        mod = sys.modules["customer_api"]
+        conn = MagicMock()
+        conn.__enter__.return_value = conn
+        row = {"_acct_exists": True, "id": None}
+        with patch.object(mod, "get_connection", return_value=conn, create=True), \
+             patch.object(mod, "_row_to_dict", return_value=row, create=True), \
+             patch.object(mod, "_normalize_customer", lambda d: d, create=True), \
+             patch.object(auth, "try_log_mutation"):
+            auth.invalidate_account_cache()
+            resp = auth.customer_register(
+                auth.CustomerRegisterRequest(customer_id="0045MAK", password="secret1")
+            )
+        auth.invalidate_account_cache()
+        self.assertEqual(resp["name"], "0045MAK")
+        self.assertIsNone(db_auth.get_customer_credentials("0045MAK")[1])
+
+        # Once the customer record is named, the next login picks it up.
+        with patch.object(auth, "_validate_account_exists", return_value={"name": "Jane Doe"}):
+            resp = self._login()
+        self.assertEqual(resp.user["name"], "Jane Doe")
+
+    def test_password_reset_keeps_name(self):
+        db_auth.set_customer_password("0045MAK", "old", display_name="Jane Doe")
+        db_auth.set_customer_password("0045MAK", "new")
+        self.assertEqual(db_auth.get_customer_credentials("0045MAK"), ("new", "Jane Doe"))
+
+
+if __name__ == "__main__":
+    unittest.main()
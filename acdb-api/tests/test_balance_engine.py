@@ -0,0 +1,272 @@
+"""Unit tests for balance_engine helpers that don't need a live database."""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import unittest
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+os.environ.setdefault("CC_JWT_SECRET", "unit-test-secret")
+
+import customer_api  # noqa: E402,F401  (production import order; relay_control is patched below)
+import balance_engine  # noqa: E402
+
+_AS_OF = datetime(2026, 5, 1, tzinfo=timezone.utc)
+
+
+class GetBalanceKwhTests(unittest.TestCase):
+    def _conn(self, row):
+        conn = MagicMock()
+        conn.cursor.return_value.fetchone.return_value = row
+        return conn
+
+    def test_single_round_trip_with_priority_resolved_in_sql(self):
+        conn = self._conn((Decimal("74.5000"),))
+        with patch.object(balance_engine, "USE_PREPARED", False):
+            balance, _ = balance_engine.get_balance_kwh(conn, "0045MAK")
+        self.assertEqual(balance, 74.5)
+        cur = conn.cursor.return_value
+        self.assertEqual(cur.execute.call_count, 1)
+        self.assertIsNone(cur.execute.call_args.args[1]["priority"])
+
+    def test_as_of_is_passed_through(self):
+        conn = self._conn((Decimal("1.0000"),))
+        self.assertEqual(balance_engine.get_balance_kwh(conn, "0045MAK", as_of=_AS_OF), (1.0, _AS_OF))
+
+    def test_prepared_once_per_connection(self):
+        conn = self._conn((Decimal("1.0000"),))
+        cur = conn.cursor.return_value
+        balance_engine.get_balance_kwh(conn, "0045MAK")
+        balance_engine.get_balance_kwh(conn, "0046MAK", priority="1m")
+        stmts = [c.args[0] for c in cur.execute.call_args_list]
+        self.assertEqual([s.split()[0] for s in stmts], ["PREPARE", "EXECUTE", "EXECUTE"])
+        self.assertTrue(stmts[0].startswith("PREPARE bal_balance(text, text) AS"))
+        self.assertNotIn("%(", stmts[0])
+        self.assertEqual(cur.execute.call_args.args[1], ("0046MAK", "1m"))
+
+
+class GetBalancesKwhTests(unittest.TestCase):
+    def test_batches_and_dedupes(self):
+        conn = MagicMock()
+        cur = conn.cursor.return_value
+        cur.fetchall.side_effect = [
+            [("A", Decimal("6.5000")), ("B", Decimal("0.0000"))],
+            [("C", Decimal("0.0000"))],
+        ]
+        with patch.object(balance_engine, "BALANCES_BATCH_SIZE", 2):
+            out = balance_engine.get_balances_kwh(conn, ["A", "B", "A", "", "C"])
+        self.assertEqual(out, {"A": 6.5, "B": 0.0, "C": 0.0})
+        batches = [c.args[1]["accts"] for c in cur.execute.call_args_list]
+        self.assertEqual(batches, [["A", "B"], ["C"]])
+
+    def test_empty(self):
+        conn = MagicMock()
+        self.assertEqual(balance_engine.get_balances_kwh(conn, []), {})
+        conn.cursor.return_value.execute.assert_not_called()
+
+
+class GetBalanceKwhWhatIfTests(unittest.TestCase):
+    def test_both_priorities_in_one_round_trip(self):
+        conn = MagicMock()
+        cur = conn.cursor.return_value
+        cur.fetchone.return_value = ("1m", Decimal("12.3400"), Decimal("12.2000"))
+        out = balance_engine.get_balance_kwh_what_if(conn, "0045MAK")
+        self.assertEqual(cur.execute.call_count, 1)
+        self.assertEqual(out, {
+            "actual_priority": "1m",
+            "actual_balance_kwh": 12.2,
+            "what_if_priority": "sm",
+            "what_if_balance_kwh": 12.34,
+            "implied_balance_delta_kwh": 0.14,
+        })
+
+
+class RecordPaymentKwhTests(unittest.TestCase):
+    def test_locks_and_inserts_in_one_round_trip(self):
+        conn = MagicMock()
+        cur = conn.cursor.return_value
+        cur.fetchone.return_value = (7, Decimal("-1.0000"), Decimal("1.5000"))
+        with patch("relay_control.maybe_auto_close_relay") as reconnect:
+            out = balance_engine.record_payment_kwh(conn, "0045MAK", "m1", 25.0, 10.0)
+        self.assertEqual(out, (7, 2.5, 1.5))
+        stmts = [c.args[0] for c in cur.execute.call_args_list]
+        self.assertEqual(len(stmts), 1)
+        self.assertLess(stmts[0].index("pg_advisory_xact_lock"), stmts[0].index("INSERT INTO transactions"))
+        params = cur.execute.call_args.args[1]
+        self.assertEqual(params["kwh"], 2.5)
+        self.assertEqual(params["lock_key"], "balance:0045MAK")
+        reconnect.assert_called_once()
+
+    def test_kwh_override_is_quantised(self):
+        conn = MagicMock()
+        cur = conn.cursor.return_value
+        cur.fetchone.return_value = (8, Decimal("1.0000"), Decimal("1.3000"))
+        out = balance_engine.record_payment_kwh(conn, "0045MAK", "m1", 3.0, 10.0, kwh_override=0.1 + 0.2)
+        self.assertEqual(out[1], 0.3)
+        self.assertEqual(cur.execute.call_args.args[1]["kwh"], 0.3)
+
+
+class RecordFeeTransactionTests(unittest.TestCase):
+    def test_snapshot_and_insert_in_one_statement(self):
+        conn = MagicMock()
+        cur = conn.cursor.return_value
+        cur.fetchone.return_value = (11, Decimal("4.2500"))
+        out = balance_engine.record_fee_transaction(
+            conn, "0045MAK", "m1", 50.0, "connection_fee", extra_columns={"sms_sender": "x"})
+        self.assertEqual(out, (11, 4.25))
+        self.assertEqual(cur.execute.call_count, 1)
+        sql, params = cur.execute.call_args.args
+        self.assertIn("payment_category, advance_portion, electricity_portion, "
+                      "financing_portion, sms_sender, current_balance)", sql)
+        self.assertIn("(SELECT b FROM prev)", sql)
+        self.assertEqual(params["col9"], "connection_fee")
+        self.assertEqual(params["col13"], "x")
+
+
+class RefreshConsumptionRollupTests(unittest.TestCase):
+    def _cur(self, watermark):
+        conn = MagicMock()
+        cur = conn.cursor.return_value
+        cur.fetchone.return_value = (watermark,)
+        cur.rowcount = 3
+        return conn, cur
+
+    def test_current_watermark_is_a_no_op(self):
+        conn, cur = self._cur(date(2026, 5, 2))
+        self.assertEqual(balance_engine.refresh_consumption_rollup(conn, "0045MAK", date(2026, 5, 2)), 0)
+        self.assertEqual(cur.execute.call_count, 2)
+
+    def test_rebuilds_from_watermark_and_advances_it(self):
+        conn, cur = self._cur(date.min)
+        self.assertEqual(balance_engine.refresh_consumption_rollup(conn, "0045MAK", date(2026, 5, 2)), 3)
+        stmts = [c.args[0] for c in cur.execute.call_args_list]
+        self.assertIn("FOR UPDATE", stmts[1])
+        self.assertIn("DELETE FROM consumption_daily_rollup", stmts[2])
+        self.assertIn("INSERT INTO consumption_daily_rollup", stmts[3])
+        self.assertEqual(cur.execute.call_args_list[3].args[1]["from_day"], date.min)
+        self.assertIn("UPDATE consumption_rollup_watermark", stmts[4])
+        self.assertEqual(cur.execute.call_args.args[1], (date(2026, 5, 2), "0045MAK"))
+
+
+class BalancesToCurrencyTests(unittest.TestCase):
+    def test_matches_scalar_form(self):
+        balances = [12.3456, -3.25, 0.0]
+        rates = [5.0, 7.123, 9.0]
+        out = balance_engine.balances_to_currency(balances, rates)
+        self.assertEqual(
+            out.tolist(),
+            [balance_engine.balance_to_currency(b, r) for b, r in zip(balances, rates)],
+        )
+
+    def test_scalar_rate_broadcasts(self):
+        self.assertEqual(balance_engine.balances_to_currency([1.0, 2.0], 5.0).tolist(), [5.0, 10.0])
+
+
+class BalanceCacheTests(unittest.TestCase):
+    def setUp(self):
+        balance_engine.invalidate_balance_cache()
+        # TTL-only mode (no account_balance_versions) unless a test says otherwise.
+        self._version = patch.object(balance_engine, "_balance_version", return_value=None)
+        self.version = self._version.start()
+
+    def tearDown(self):
+        self._version.stop()
+        balance_engine.invalidate_balance_cache()
+
+    def test_hit_within_ttl(self):
+        with patch.object(balance_engine, "get_balance_kwh", return_value=(12.5, _AS_OF)) as calc:
+            self.assertEqual(balance_engine.get_balance_kwh_cached(MagicMock(), "0045MAK"), (12.5, _AS_OF))
+            self.assertEqual(balance_engine.get_balance_kwh_cached(MagicMock(), "0045MAK"), (12.5, _AS_OF))
+        self.assertEqual(calc.call_count, 1)
+
+    def test_accounts_are_cached_separately(self):
+        with patch.object(balance_engine, "get_balance_kwh", return_value=(1.0, _AS_OF)) as calc:
+            balance_engine.get_balance_kwh_cached(MagicMock(), "0045MAK")
+            balance_engine.get_balance_kwh_cached(MagicMock(), "0046MAK")
+        self.assertEqual(calc.call_count, 2)
+
+    def test_zero_max_age_bypasses_cache(self):
+        with patch.object(balance_engine, "get_balance_kwh", return_value=(1.0, _AS_OF)) as calc:
+            balance_engine.get_balance_kwh_cached(MagicMock(), "0045MAK", max_age_s=0)
+            balance_engine.get_balance_kwh_cached(MagicMock(), "0045MAK", max_age_s=0)
+        self.assertEqual(calc.call_count, 2)
+
+    def test_invalidate_forces_recompute(self):
+        with patch.object(balance_engine, "get_balance_kwh", side_effect=[(1.0, _AS_OF), (2.0, _AS_OF)]):
+            balance_engine.get_balance_kwh_cached(MagicMock(), "0045MAK")
+            balance_engine.invalidate_balance_cache("0045MAK")
+            self.assertEqual(balance_engine.get_balance_kwh_cached(MagicMock(), "0045MAK")[0], 2.0)
+
+    def test_version_bump_forces_recompute(self):
+        self.version.side_effect = [3, 3, 4]
+        with patch.object(balance_engine, "get_balance_kwh", side_effect=[(1.0, _AS_OF), (2.0, _AS_OF)]) as calc:
+            self.assertEqual(balance_engine.get_balance_kwh_cached(MagicMock(), "0045MAK")[0], 1.0)
+            self.assertEqual(balance_engine.get_balance_kwh_cached(MagicMock(), "0045MAK")[0], 1.0)
+            self.assertEqual(balance_engine.get_balance_kwh_cached(MagicMock(), "0045MAK")[0], 2.0)
+        self.assertEqual(calc.call_count, 2)
+
+    def test_versioned_entry_outlives_plain_ttl(self):
+        self.version.return_value = 3
+        with patch.object(balance_engine, "get_balance_kwh", return_value=(1.0, _AS_OF)) as calc, \
+                patch.object(balance_engine, "BALANCE_CACHE_TTL_S", 0.0):
+            balance_engine.get_balance_kwh_cached(MagicMock(), "0045MAK")
+            balance_engine.get_balance_kwh_cached(MagicMock(), "0045MAK")
+        self.assertEqual(calc.call_count, 1)
+
+
+class WrittenRecentlyTests(unittest.TestCase):
+    def setUp(self):
+        balance_engine._recent_writes.clear()
+
+    def tearDown(self):
+        balance_engine._recent_writes.clear()
+
+    def test_write_pins_account_for_the_window(self):
+        self.assertFalse(balance_engine.written_recently("0045MAK"))
+        balance_engine.invalidate_balance_cache("0045MAK")
+        self.assertTrue(balance_engine.written_recently("0045MAK"))
+        self.assertFalse(balance_engine.written_recently("0046MAK"))
+        with patch.object(balance_engine, "BALANCE_READ_PIN_S", 0.0), \
+                patch.object(balance_engine.time, "monotonic", return_value=time.monotonic() + 1):
+            self.assertFalse(balance_engine.written_recently("0045MAK"))
+
+
+class BalanceVersionTests(unittest.TestCase):
+    def tearDown(self):
+        balance_engine._balance_versions_available = None
+
+    def test_missing_table_is_checked_once_per_interval(self):
+        balance_engine._balance_versions_available = None
+        cur = MagicMock()
+        cur.fetchone.return_value = (False,)
+        self.assertIsNone(balance_engine._balance_version(cur, "0045MAK"))
+        self.assertIsNone(balance_engine._balance_version(cur, "0045MAK"))
+        self.assertEqual(cur.execute.call_count, 1)
+
+    def test_table_created_later_is_picked_up(self):
+        balance_engine._balance_versions_available = None
+        cur = MagicMock()
+        cur.fetchone.return_value = (False,)
+        self.assertIsNone(balance_engine._balance_version(cur, "0045MAK"))
+
+        cur.fetchone.side_effect = [(True,), (7,)]
+        later = time.monotonic() + balance_engine._BALANCE_VERSIONS_RECHECK_S + 1
+        with patch.object(balance_engine.time, "monotonic", return_value=later):
+            self.assertEqual(balance_engine._balance_version(cur, "0045MAK"), 7)
+        self.assertTrue(balance_engine._balance_versions_available)
+
+    def test_unseen_account_is_version_zero(self):
+        balance_engine._balance_versions_available = True
+        cur = MagicMock()
+        cur.fetchone.return_value = None
+        self.assertEqual(balance_engine._balance_version(cur, "0045MAK"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
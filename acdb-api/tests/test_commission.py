@@ -0,0 +1,472 @@
+"""Unit tests for the commission router (``commission.execute_commission``)."""
+
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from fastapi import BackgroundTasks, FastAPI
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("CC_JWT_SECRET", "unit-test-secret")
+
+import commission
+
+
+def employee() -> MagicMock:
+    return MagicMock(role="onm_team", user_id="operator-1")
+
+
+def connection_context(fetch_rows: list[tuple | None]):
+    conn = MagicMock()
+    cursor = conn.cursor.return_value
+    cursor.fetchone.side_effect = fetch_rows
+    cursor.rowcount = 1
+    context = MagicMock()
+    context.__enter__.return_value = conn
+    context.__exit__.return_value = False
+    return context, conn, cursor
+
+
+def commission_request(**overrides) -> commission.CommissionRequest:
+    fields = dict(
+        account_number="0045MAK",
+        customer_type="HH",
+        connection_date="2026-08-04",
+        service_phase="Single",
+        ampacity="Standard",
+        national_id="123",
+        phone_number="58000000",
+        customer_signature="x" * 40,
+    )
+    fields.update(overrides)
+    return commission.CommissionRequest(**fields)
+
+
+class TestCommissionRequestSignature(unittest.TestCase):
+    def test_data_url_prefix_is_dropped(self):
+        req = commission_request(customer_signature="data:image/jpeg;base64," + "QUJD" * 10)
+        self.assertEqual(req.customer_signature, "QUJD" * 10)
+
+    def test_non_base64_is_rejected(self):
+        with self.assertRaises(ValueError):
+            commission_request(customer_signature="not base64 at all, not base64 at all!")
+        with self.assertRaises(ValueError):
+            commission_request(customer_signature="QUJD" * 10 + "Q")
+
+
+class TestExecuteCommission(unittest.TestCase):
+    def _run(self, req, fetch_rows):
+        context, conn, cursor = connection_context(fetch_rows)
+        sm = MagicMock()
+        sm.sync_sparkmeter_customer_and_meter.return_value = {"ok": True}
+        ugp = MagicMock()
+        ugp.sync_commission_to_ugp.return_value = {"ugp_updated": True, "upstream_warnings": []}
+        with (
+            patch.object(commission, "_get_connection", return_value=context) as get_conn,
+            patch.object(
+                commission,
+                "_resolve_customer_for_commission",
+                return_value=({"customer_id_legacy": 45, "first_name": "A", "last_name": "B"}, None, "0045MAK"),
+            ),
+            patch.object(
+                commission,
+                "generate_contract",
+                return_value={"site_code": "MAK", "en_filename": "en.pdf", "so_filename": "so.pdf"},
+            ),
+            patch.object(commission, "send_contract_sms", return_value=True) as sms,
+            patch.object(commission, "_resolve_ugp_survey_id", return_value=None),
+            patch.dict(sys.modules, {"sparkmeter_customer": sm, "sync_ugridplan": ugp}),
+        ):
+            tasks = BackgroundTasks()
+            result = commission.execute_commission(req, tasks, employee())
+            # The SMS goes out after the response, not inline
+            sms.assert_not_called()
+            self.assertEqual(len(tasks.tasks), 1)
+            tasks.tasks[0].func(*tasks.tasks[0].args, **tasks.tasks[0].kwargs)
+            sms.assert_called_once()
+        self.ugp = ugp
+        return result, get_conn, conn, cursor, sm
+
+    def test_post_pdf_writes_share_one_connection(self):
+        req = commission_request(gateway_thing_name="MAK-GW-0001", survey_id="MAK 0045 HH")
+        result, get_conn, conn, cursor, sm = self._run(
+            req, [("SMRSD-01",), ("SMRSD-01",)]
+        )
+        # Phase 1 resolve + one checkout for every post-PDF write / lookup
+        self.assertEqual(get_conn.call_count, 2)
+        sql = [c.args[0] for c in cursor.execute.call_args_list]
+        self.assertIs(sql[0], commission._COMMISSION_PROFILE_UPDATE_SQL)
+        profile = cursor.execute.call_args_list[0].args[1]
+        self.assertIsNone(profile["gps_lat"])  # not sent: COALESCE keeps the stored value
+        self.assertEqual(profile["legacy_id"], 45)
+        self.assertTrue(any("meter_provisioning" in s for s in sql))
+        self.assertTrue(any("UPDATE accounts SET survey_id" in s for s in sql))
+        # Profile, gateway and survey binding land in one transaction
+        conn.commit.assert_called_once()
+        self.assertLess(
+            next(i for i, s in enumerate(sql) if "UPDATE accounts" in s),
+            next(i for i, s in enumerate(sql) if s.lstrip().startswith("SELECT meter_id")),
+        )
+        self.assertEqual(result["status"], "ok")
+        self.assertTrue(result["gateway_associated"])
+        self.assertTrue(result["sms_queued"])
+        sm.sync_sparkmeter_customer_and_meter.assert_called_once_with(
+            "0045MAK", "A B", "SMRSD-01", phone=None
+        )
+        self.ugp.sync_commission_to_ugp.assert_called_once()
+        self.assertEqual(result["ugp_sync"]["survey_id"], "MAK 0045 HH")
+        self.assertTrue(result["ugp_sync"]["updated"])
+
+    def test_missing_customer_row_is_500_and_rolled_back(self):
+        context, conn, cursor = connection_context([])
+        cursor.rowcount = 0
+        with (
+            patch.object(commission, "_get_connection", return_value=context),
+            patch.object(
+                commission,
+                "_resolve_customer_for_commission",
+                return_value=({"customer_id_legacy": 45}, None, "0045MAK"),
+            ),
+            patch.object(
+                commission,
+                "generate_contract",
+                return_value={"site_code": "MAK", "en_filename": "en.pdf", "so_filename": "so.pdf"},
+            ),
+            patch.object(commission, "_resolve_ugp_survey_id", return_value=None),
+            patch.object(commission, "send_contract_sms") as sms,
+        ):
+            with self.assertRaises(commission.HTTPException) as ctx:
+                commission.execute_commission(commission_request(), BackgroundTasks(), employee())
+        self.assertEqual(ctx.exception.status_code, 500)
+        conn.rollback.assert_called()
+        conn.commit.assert_not_called()
+        sms.assert_not_called()
+
+    def test_gateway_failure_rolls_back_to_savepoint_only(self):
+        context, conn, cursor = connection_context([("SMRSD-01",), ("SMRSD-01",)])
+
+        def execute(sql, *args):
+            if "meter_provisioning" in sql:
+                raise RuntimeError("no such table")
+
+        cursor.execute.side_effect = execute
+        req = commission_request(gateway_thing_name="MAK-GW-0001")
+        with (
+            patch.object(commission, "_get_connection", return_value=context),
+            patch.object(
+                commission,
+                "_resolve_customer_for_commission",
+                return_value=({"customer_id_legacy": 45}, None, "0045MAK"),
+            ),
+            patch.object(
+                commission,
+                "generate_contract",
+                return_value={"site_code": "MAK", "en_filename": "en.pdf", "so_filename": "so.pdf"},
+            ),
+            patch.object(commission, "_resolve_ugp_survey_id", return_value=None),
+            patch.dict(sys.modules, {"sparkmeter_customer": MagicMock(), "sync_ugridplan": MagicMock()}),
+        ):
+            result = commission.execute_commission(req, BackgroundTasks(), employee())
+        sql = [c.args[0] for c in cursor.execute.call_args_list]
+        self.assertIn("ROLLBACK TO SAVEPOINT commission_step", sql)
+        conn.commit.assert_called_once()
+        self.assertFalse(result["gateway_associated"])
+
+
+class TestBulkUpdateCommissioningStatus(unittest.TestCase):
+    def test_one_statement_per_step_and_missing_ids_reported(self):
+        context, conn, cursor = connection_context([])
+        req = commission.BulkStatusRequest(updates=[
+            commission.BulkStatusItem(customer_id=1, step="meter_installed", value=True),
+            commission.BulkStatusItem(customer_id=2, step="meter_installed", value=True),
+            commission.BulkStatusItem(customer_id=3, step="meter_installed", value=False),
+            commission.BulkStatusItem(customer_id=1, step="airdac_connected", value=True, date="2026-08-04"),
+            commission.BulkStatusItem(customer_id=1, step="not_a_step", value=True),
+        ])
+        with (
+            patch.object(commission, "_get_connection", return_value=context),
+            patch.object(
+                commission.psycopg2.extras,
+                "execute_values",
+                side_effect=[[(1,), (3,)], [(1,)]],
+            ) as ev,
+        ):
+            result = commission.bulk_update_commissioning_status(req, employee())
+
+        self.assertEqual(ev.call_count, 2)
+        meter_call = ev.call_args_list[0]
+        self.assertIn("meter_installed = d.v", meter_call.args[1])
+        self.assertEqual([r[3] for r in meter_call.args[2]], [1, 2, 3])
+        self.assertEqual(ev.call_args_list[1].args[2][0][1], "2026-08-04")
+        self.assertEqual(result["updated"], 3)
+        self.assertEqual(result["total_requested"], 5)
+        self.assertEqual(
+            sorted(e["error"] for e in result["errors"]),
+            ["Customer not found", "Invalid step: not_a_step"],
+        )
+        conn.commit.assert_called_once()
+
+
+class TestResolveCustomerForCommission(unittest.TestCase):
+    _COLS = ("id", "customer_id_legacy", "first_name", "_commission_account", "_commission_meter")
+
+    def _cursor(self, row):
+        cursor = MagicMock()
+        cursor.fetchone.return_value = dict(zip(self._COLS, row)) if row else None
+        return cursor
+
+    def test_account_number_resolves_in_one_query(self):
+        cursor = self._cursor((7, 45, "Ana", "0045MAK", {"meter_id": "SM-1", "community": "MAK"}))
+        with patch.object(commission, "USE_PREPARED", False):
+            customer, meter, acct = commission._resolve_customer_for_commission(cursor, " 0045mak ")
+        cursor.execute.assert_called_once()
+        self.assertEqual(cursor.execute.call_args.args[1], {"account_number": "0045MAK"})
+        self.assertEqual(customer, {"id": 7, "customer_id_legacy": 45, "first_name": "Ana"})
+        self.assertEqual(meter["meter_id"], "SM-1")
+        self.assertEqual(acct, "0045MAK")
+
+    def test_legacy_id_without_account_or_meter(self):
+        cursor = self._cursor((7, 45, "Ana", None, None))
+        with patch.object(commission, "USE_PREPARED", False):
+            customer, meter, acct = commission._resolve_customer_for_commission(cursor, "45")
+        self.assertEqual(cursor.execute.call_args.args[1], {"legacy_id": 45})
+        self.assertEqual(customer["customer_id_legacy"], 45)
+        self.assertIsNone(meter)
+        self.assertEqual(acct, "")
+
+    def test_prepared_once_per_connection(self):
+        cursor = self._cursor(None)
+        cursor.fetchone.side_effect = lambda: dict(zip(self._COLS, (7, 45, "Ana", "0045MAK", None)))
+        with patch.object(commission, "USE_PREPARED", True):
+            commission._resolve_customer_for_commission(cursor, "0045MAK")
+            commission._resolve_customer_for_commission(cursor, "0046MAK")
+        stmts = [c.args[0] for c in cursor.execute.call_args_list]
+        self.assertEqual(len(stmts), 3)
+        self.assertTrue(stmts[0].startswith("PREPARE cc_commission_by_account(text) AS"))
+        self.assertIn("a.account_number = $1", stmts[0])
+        self.assertEqual(stmts[1:], ["EXECUTE cc_commission_by_account(%s)"] * 2)
+        self.assertEqual(cursor.execute.call_args.args[1], ("0046MAK",))
+
+    def test_unknown_customer(self):
+        cursor = self._cursor(None)
+        self.assertEqual(
+            commission._resolve_customer_for_commission(cursor, "0045MAK"),
+            (None, None, ""),
+        )
+
+
+class TestGetCommissionData(unittest.TestCase):
+    def test_prefill_shape_and_contract_paths_stay_server_side(self):
+        customer = {"customer_id_legacy": 45, "first_name": "Ana", "last_name": None,
+                    "phone": "", "cell_phone_1": "58000000", "gps_lat": -29.3,
+                    "date_service_connected": date(2026, 8, 4)}
+        contracts = [{"filename": "0045MAK_Contract_en.pdf", "lang": "en", "site_code": "MAK",
+                      "path": "/srv/contracts/MAK/0045MAK_Contract_en.pdf", "url": "/dl"}]
+        app = FastAPI()
+        app.include_router(commission.router)
+        app.dependency_overrides[commission.require_employee] = employee
+        context, _, _ = connection_context([])
+        with patch.object(commission, "_get_connection", return_value=context), \
+                patch.object(commission, "_resolve_customer_for_commission",
+                             return_value=(customer, {"meter_id": "SM-1", "community": "MAK"}, "0045MAK")), \
+                patch.object(commission, "list_customer_contracts", return_value=contracts):
+            body = TestClient(app).get("/api/commission/customer/0045MAK").json()
+        self.assertEqual(body["customer"]["customer_id_legacy"], 45)
+        self.assertEqual(body["customer"]["phone"], "58000000")
+        self.assertIsNone(body["customer"]["last_name"])
+        self.assertEqual(body["customer"]["gps_x"], -29.3)
+        self.assertEqual(body["customer"]["date_connected"], "2026-08-04")
+        self.assertEqual(body["meter"], {"meter_id": "SM-1", "community": "MAK"})
+        self.assertEqual(body["existing_contracts"],
+                         [{"filename": "0045MAK_Contract_en.pdf", "lang": "en",
+                           "site_code": "MAK", "url": "/dl"}])
+
+    def test_only_dict_routes_use_the_orjson_response(self):
+        # A custom response class would take the typed route off pydantic's
+        # dump_json path, so it is set only where handlers return dicts.
+        classes = {r.path: r.response_class for r in commission.router.routes}
+        self.assertIs(classes["/api/commission/bulk-status"], commission.FastJSONResponse)
+        self.assertIsNot(classes["/api/commission/customer/{identifier}"],
+                         commission.FastJSONResponse)
+
+
+class TestDownloadContract(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self._tmp.name, "MAK"))
+        with open(os.path.join(self._tmp.name, "MAK", "0045MAK_Contract_en.pdf"), "wb") as f:
+            f.write(b"%PDF-1.4 test")
+        self._patch = patch.object(commission, "CONTRACTS_DIR", self._tmp.name)
+        self._patch.start()
+        commission._pdf_body_cache.clear()
+        commission._pdf_body_cache_size = 0
+        app = FastAPI()
+        app.include_router(commission.router)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self._patch.stop()
+        self._tmp.cleanup()
+
+    def test_repeat_download_with_matching_etag_is_304(self):
+        url = "/api/contracts/download/MAK/0045MAK_Contract_en.pdf"
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.content, b"%PDF-1.4 test")
+        etag = first.headers["etag"]
+
+        again = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b"")
+        self.assertEqual(again.headers["etag"], etag)
+
+        stale = self.client.get(url, headers={"If-None-Match": '"other"'})
+        self.assertEqual(stale.status_code, 200)
+
+    def test_if_modified_since_without_etag(self):
+        url = "/api/contracts/download/MAK/0045MAK_Contract_en.pdf"
+        last_modified = self.client.get(url).headers["last-modified"]
+        self.assertEqual(
+            self.client.get(url, headers={"If-Modified-Since": last_modified}).status_code, 304,
+        )
+        old = "Mon, 01 Jan 2001 00:00:00 GMT"
+        self.assertEqual(self.client.get(url, headers={"If-Modified-Since": old}).status_code, 200)
+        # If-None-Match wins when both are sent
+        both = {"If-Modified-Since": last_modified, "If-None-Match": '"other"'}
+        self.assertEqual(self.client.get(url, headers=both).status_code, 200)
+
+    def test_body_served_from_memory_until_the_file_changes(self):
+        url = "/api/contracts/download/MAK/0045MAK_Contract_en.pdf"
+        self.assertEqual(self.client.get(url).content, b"%PDF-1.4 test")
+        with patch("builtins.open", side_effect=AssertionError("read from disk")):
+            again = self.client.get(url)
+        self.assertEqual(again.content, b"%PDF-1.4 test")
+        self.assertEqual(again.headers["content-type"], "application/pdf")
+
+        with open(os.path.join(self._tmp.name, "MAK", "0045MAK_Contract_en.pdf"), "wb") as f:
+            f.write(b"%PDF-1.4 regenerated")
+        self.assertEqual(self.client.get(url).content, b"%PDF-1.4 regenerated")
+        self.assertEqual(commission._pdf_body_cache_size, len(b"%PDF-1.4 regenerated"))
+
+    def test_missing_contract_is_404(self):
+        self.assertEqual(self.client.get("/api/contracts/download/MAK/nope.pdf").status_code, 404)
+
+    def test_segments_outside_the_whitelist_are_404_without_touching_disk(self):
+        with patch.object(commission.os, "stat", side_effect=AssertionError("stat")):
+            for site, name in (
+                ("MAK", "..%2Fsecret.pdf"),
+                ("MAK", ".hidden.pdf"),
+                ("MAK", "0045MAK_Contract_en.txt"),
+                ("..", "0045MAK_Contract_en.pdf"),
+                ("mak", "0045MAK_Contract_en.pdf"),
+            ):
+                resp = self.client.get(f"/api/contracts/download/{site}/{name}")
+                self.assertEqual(resp.status_code, 404, (site, name))
+
+
+class TestUgpSurveyIdCache(unittest.TestCase):
+    def setUp(self):
+        commission._survey_id_cache.clear()
+
+    def test_hits_are_reused_until_the_binding_changes(self):
+        with patch.object(commission, "_lookup_ugp_survey_id", return_value="MAK 0045 HH") as lookup:
+            self.assertEqual(commission._resolve_ugp_survey_id(45, "0045MAK", "MAK"), "MAK 0045 HH")
+            self.assertEqual(commission._resolve_ugp_survey_id(45, "0045MAK", "MAK"), "MAK 0045 HH")
+            self.assertEqual(lookup.call_count, 1)
+            commission._invalidate_ugp_survey_id("0045MAK")
+            commission._resolve_ugp_survey_id(45, "0045MAK", "MAK")
+            self.assertEqual(lookup.call_count, 2)
+
+    def test_misses_are_not_cached(self):
+        with patch.object(commission, "_lookup_ugp_survey_id", return_value=None) as lookup:
+            commission._resolve_ugp_survey_id(45, "0045MAK", "MAK")
+            commission._resolve_ugp_survey_id(45, "0045MAK", "MAK")
+        self.assertEqual(lookup.call_count, 2)
+
+
+class TestResolveAccountNumber(unittest.TestCase):
+    def setUp(self):
+        commission._account_by_customer.clear()
+
+    def test_cached_until_forgotten(self):
+        context, conn, cursor = connection_context([("0045MAK",), ("0099MAK",)])
+        with patch.object(commission, "_get_connection", return_value=context) as get_conn:
+            self.assertEqual(commission._resolve_account_number(45), "0045MAK")
+            self.assertEqual(commission._resolve_account_number(45), "0045MAK")
+            self.assertEqual(get_conn.call_count, 1)
+            commission._forget_customer_account(45)
+            self.assertEqual(commission._resolve_account_number(45), "0099MAK")
+
+    def test_customer_without_account_is_not_cached(self):
+        context, conn, cursor = connection_context([None, None])
+        with patch.object(commission, "_get_connection", return_value=context) as get_conn:
+            self.assertEqual(commission._resolve_account_number(45), "")
+            self.assertEqual(commission._resolve_account_number(45), "")
+        self.assertEqual(get_conn.call_count, 2)
+
+
+class TestLookupUgpSurveyId(unittest.TestCase):
+    def _lookup(self, pg_row, sqlite_row=None):
+        context, conn, cursor = connection_context([pg_row])
+        auth = MagicMock()
+        auth.__enter__.return_value.execute.return_value.fetchone.return_value = sqlite_row
+        with (
+            patch.object(commission, "_get_connection", return_value=context) as get_conn,
+            patch("db_auth.get_auth_db", return_value=auth),
+        ):
+            survey_id = commission._lookup_ugp_survey_id(45, "0045MAK", "MAK")
+        self.assertEqual(get_conn.call_count, 1)
+        cursor.execute.assert_called_once()
+        return survey_id
+
+    def test_account_binding_wins(self):
+        self.assertEqual(self._lookup((" MAK 0045 HH ", "MAK 9 HH")), "MAK 0045 HH")
+
+    def test_sqlite_metadata_before_plot_number(self):
+        self.assertEqual(
+            self._lookup((None, "MAK 9 HH"), {"ugp_survey_id": "MAK 0045 SME"}),
+            "MAK 0045 SME",
+        )
+
+    def test_plot_number_then_account_derivation(self):
+        self.assertEqual(self._lookup((None, "MAK 9 HH")), "MAK 9 HH")
+        self.assertEqual(self._lookup((None, "None")), "MAK 0045 HH")
+
+
+class TestDecommissionCustomer(unittest.TestCase):
+    def test_reads_records_then_guarded_update(self):
+        context, conn, cursor = connection_context([("2025-01-02",)])
+        cursor.fetchall.return_value = [
+            ("meter", "SM-1", "0045MAK", "MAK"),
+            ("account", "0045MAK", "SM-1", None),
+        ]
+        with patch.object(commission, "_get_connection", return_value=context):
+            result = commission.decommission_customer(45, employee())
+        self.assertEqual(cursor.execute.call_count, 2)
+        self.assertIn("RETURNING date_service_connected", cursor.execute.call_args_list[1].args[0])
+        self.assertEqual(result["connected_date"], "2025-01-02")
+        self.assertEqual(result["meters"], [{"meterid": "SM-1", "accountnumber": "0045MAK", "community": "MAK"}])
+        self.assertEqual(result["accounts"], [{"accountnumber": "0045MAK", "meterid": "SM-1"}])
+        conn.commit.assert_called_once()
+
+    def test_refused_update_explains_why(self):
+        for state, code, detail in (
+            (None, 404, "Customer not found"),
+            (("2025-03-01",), 400, "Customer is already terminated."),
+            ((None,), 400, "Customer has not been commissioned"),
+        ):
+            context, conn, cursor = connection_context([None, state])
+            cursor.fetchall.return_value = []
+            with patch.object(commission, "_get_connection", return_value=context):
+                with self.assertRaises(commission.HTTPException) as ctx:
+                    commission.decommission_customer(45, employee())
+            self.assertEqual(ctx.exception.status_code, code)
+            self.assertTrue(ctx.exception.detail.startswith(detail))
+            conn.commit.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
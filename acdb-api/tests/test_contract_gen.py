@@ -0,0 +1,105 @@
+"""Unit tests for contract file listing (``contract_gen.list_customer_contracts``)."""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import contract_gen
+
+
+class TestListCustomerContracts(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        os.makedirs(os.path.join(self.root, "MAK"))
+        self._touch("MAK", "0045MAK_Contract_en.pdf")
+        self._touch("MAK", "0046MAK_Contract_en.pdf")
+        self._patch = patch.object(contract_gen, "CONTRACTS_DIR", self.root)
+        self._patch.start()
+        contract_gen._dir_scan_cache.clear()
+        contract_gen._contract_list_cache.clear()
+
+    def tearDown(self):
+        self._patch.stop()
+        self._tmp.cleanup()
+
+    def _touch(self, site, name):
+        with open(os.path.join(self.root, site, name), "wb") as f:
+            f.write(b"%PDF")
+
+    def test_lists_only_the_accounts_pdfs(self):
+        found = contract_gen.list_customer_contracts("0045mak")
+        self.assertEqual([c["filename"] for c in found], ["0045MAK_Contract_en.pdf"])
+        self.assertEqual(found[0]["site_code"], "MAK")
+
+    def test_unchanged_directories_are_not_rescanned(self):
+        contract_gen.list_customer_contracts("0045MAK")
+        contract_gen._contract_list_cache.clear()
+        with patch.object(contract_gen.os, "listdir", side_effect=AssertionError("rescanned")):
+            found = contract_gen.list_customer_contracts("0046MAK")
+        self.assertEqual([c["filename"] for c in found], ["0046MAK_Contract_en.pdf"])
+
+    def test_new_file_is_picked_up(self):
+        contract_gen.list_customer_contracts("0045MAK")
+        self._touch("MAK", "0045MAK_Contract_so.pdf")
+        site = os.path.join(self.root, "MAK")
+        st = os.stat(site)
+        # Guarantee a visible mtime change on coarse-timestamp filesystems
+        os.utime(site, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        contract_gen.invalidate_customer_contracts("0045mak")
+        found = contract_gen.list_customer_contracts("0045MAK")
+        self.assertEqual(
+            sorted(c["lang"] for c in found), ["en", "so"],
+        )
+
+    def test_account_listing_is_reused_within_ttl(self):
+        contract_gen.list_customer_contracts("0045MAK")
+        with patch.object(contract_gen.os, "stat", side_effect=AssertionError("stat")):
+            found = contract_gen.list_customer_contracts("0045mak")
+        self.assertEqual([c["filename"] for c in found], ["0045MAK_Contract_en.pdf"])
+
+    def test_ttl_zero_disables_the_account_cache(self):
+        with patch.object(contract_gen, "CONTRACT_LIST_TTL_S", 0):
+            contract_gen.list_customer_contracts("0045MAK")
+        self.assertEqual(contract_gen._contract_list_cache, {})
+
+
+class TestRenderPdfs(unittest.TestCase):
+    def test_inline_when_pool_disabled(self):
+        with (
+            patch.object(contract_gen, "PDF_PROCS", 0),
+            patch.object(contract_gen, "_html_to_pdf") as to_pdf,
+        ):
+            contract_gen._render_pdfs([("<en/>", "en.pdf"), ("<so/>", "so.pdf")])
+        self.assertEqual([c.args for c in to_pdf.call_args_list], [("<en/>", "en.pdf"), ("<so/>", "so.pdf")])
+
+    def test_broken_pool_falls_back_inline(self):
+        pool = MagicMock()
+        pool.submit.return_value.result.side_effect = contract_gen.BrokenProcessPool("killed")
+        with (
+            patch.object(contract_gen, "_get_pdf_pool", return_value=pool),
+            patch.object(contract_gen, "_html_to_pdf") as to_pdf,
+        ):
+            contract_gen._render_pdfs([("<en/>", "en.pdf"), ("<so/>", "so.pdf")])
+        self.assertEqual(to_pdf.call_count, 2)
+        pool.shutdown.assert_called_once_with(wait=False)
+
+
+class TestSendContractSms(unittest.TestCase):
+    def test_gateway_log_carries_the_account(self):
+        with (
+            patch.object(contract_gen, "shorten_url", return_value="https://cutt.ly/x"),
+            patch("sms_outbound.send_gateway_sms", return_value=False) as send,
+        ):
+            ok = contract_gen.send_contract_sms(
+                first_name="A", last_name="B", phone_number="58000000",
+                en_url="https://e", so_url="https://s", account_number="0045MAK",
+            )
+        self.assertFalse(ok)
+        self.assertEqual(send.call_args.kwargs["account_number"], "0045MAK")
+        self.assertEqual(send.call_args.kwargs["trigger"], "contract")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+"""Unit tests for customer_api's waiting connection pool."""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+os.environ.setdefault("CC_JWT_SECRET", "unit-test-secret")
+
+import psycopg2.extensions  # noqa: E402
+import psycopg2.pool  # noqa: E402
+
+from db_errors import PoolExhausted  # noqa: E402
+
+# Other test modules stub customer_api at import time; these tests need the
+# real module, and put any stub back so those tests keep theirs.
+_stub = sys.modules.get("customer_api")
+if _stub is not None and not hasattr(_stub, "app"):
+    del sys.modules["customer_api"]
+import customer_api  # noqa: E402
+if _stub is not None and not hasattr(_stub, "app"):
+    sys.modules["customer_api"] = _stub
+
+
+class WaitingPoolTests(unittest.TestCase):
+    def setUp(self):
+        connect = patch.object(psycopg2.pool.psycopg2, "connect", side_effect=lambda *a, **k: MagicMock(closed=0))
+        connect.start()
+        self.addCleanup(connect.stop)
+        timeout = patch.object(customer_api, "DB_POOL_TIMEOUT_S", 0.05)
+        timeout.start()
+        self.addCleanup(timeout.stop)
+        self.pool = customer_api._WaitingPool(1, 1, dsn="postgresql://test")
+
+    def test_exhausted_pool_times_out_with_pool_exhausted(self):
+        self.pool.getconn()
+        started = time.monotonic()
+        with self.assertRaises(PoolExhausted) as cm:
+            self.pool.getconn()
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        self.assertIsInstance(cm.exception, psycopg2.pool.PoolError)
+
+    def test_returned_connection_frees_the_slot(self):
+        conn = self.pool.getconn()
+        self.pool.putconn(conn)
+        self.assertIs(self.pool.getconn(), conn)
+
+    def test_waiter_gets_a_connection_returned_within_the_timeout(self):
+        conn = self.pool.getconn()
+        timer = threading.Timer(0.01, self.pool.putconn, args=(conn,))
+        with patch.object(customer_api, "DB_POOL_TIMEOUT_S", 2.0):
+            timer.start()
+            self.assertIs(self.pool.getconn(), conn)
+        timer.join()
+
+    def test_failed_connect_releases_the_slot(self):
+        self.pool.putconn(self.pool.getconn(), close=True)  # next getconn connects
+        with patch.object(psycopg2.pool.psycopg2, "connect", side_effect=psycopg2.OperationalError("down")):
+            with self.assertRaises(psycopg2.OperationalError):
+                self.pool.getconn()
+        self.pool.getconn()
+
+    def test_failed_putconn_releases_the_slot(self):
+        # minconn 1: the connection is rolled back for reuse, and that fails.
+        conn = self.pool.getconn()
+        conn.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_INERROR
+        conn.rollback.side_effect = psycopg2.InterfaceError("connection already closed")
+        with self.assertRaises(psycopg2.InterfaceError):
+            self.pool.putconn(conn)
+        conn.close.assert_called_once()
+        self.assertIsNot(self.pool.getconn(), conn)
+
+
+class _Conn:
+    closed = 0
+
+
+class ConnectionAgeTests(unittest.TestCase):
+    def test_birth_time_is_dropped_with_the_connection(self):
+        # e.g. closed and dropped by ThreadedConnectionPool.putconn itself
+        before = len(customer_api._conn_born)
+        pool = MagicMock()
+        conn = pool.getconn.return_value = _Conn()
+        with customer_api._checkout(pool):
+            pass
+        self.assertIn(conn, customer_api._conn_born)
+        pool.reset_mock(return_value=True)
+        del conn
+        self.assertEqual(len(customer_api._conn_born), before)
+
+    def test_expired_connection_is_closed_on_return(self):
+        pool = MagicMock()
+        conn = pool.getconn.return_value = _Conn()
+        with patch.object(customer_api, "DB_POOL_RECYCLE_S", 60.0):
+            customer_api._conn_born[conn] = time.monotonic() - 61
+            with customer_api._checkout(pool):
+                pass
+        pool.putconn.assert_called_once_with(conn, close=True)
+        self.assertNotIn(conn, customer_api._conn_born)
+
+
+class PoolExhaustedResponseTests(unittest.TestCase):
+    def test_only_pool_exhaustion_is_a_503(self):
+        handlers = customer_api.app.exception_handlers
+        self.assertIn(PoolExhausted, handlers)
+        self.assertNotIn(psycopg2.pool.PoolError, handlers)
+        resp = customer_api._db_pool_exhausted(MagicMock(), PoolExhausted("busy"))
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp.headers["retry-after"], "1")
+
+    def test_handlers_reraise_instead_of_500(self):
+        with patch.object(customer_api, "get_connection", side_effect=PoolExhausted("busy")):
+            with self.assertRaises(PoolExhausted):
+                customer_api.customer_search(q="Ana", limit=10)
+
+
+if __name__ == "__main__":
+    unittest.main()
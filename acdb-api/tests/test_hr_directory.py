@@ -0,0 +1,161 @@
+"""Unit tests for the HR directory caches (sign-in lookups + directory pull)."""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import hr_directory  # noqa: E402
+
+
+class TestLookupEmployeeCache(unittest.TestCase):
+    def setUp(self):
+        hr_directory.clear_lookup_cache()
+
+    def tearDown(self):
+        hr_directory.clear_lookup_cache()
+
+    def test_hit_is_cached(self):
+        rec = {"employee_id": "1PWR137", "name": "A", "email": "a@x"}
+        with mock.patch.object(hr_directory, "_request", return_value=(200, rec)) as req:
+            self.assertEqual(hr_directory.lookup_employee_minimal("137"), rec)
+            self.assertEqual(hr_directory.lookup_employee_minimal(" 137 "), rec)
+        self.assertEqual(req.call_count, 1)
+
+    def test_cached_record_is_not_shared(self):
+        rec = {"employee_id": "1PWR137", "name": "A"}
+        with mock.patch.object(hr_directory, "_request", return_value=(200, rec)):
+            first = hr_directory.lookup_employee_minimal("137")
+            first["name"] = "mutated"
+            self.assertEqual(hr_directory.lookup_employee_minimal("137")["name"], "A")
+
+    def test_404_is_negatively_cached(self):
+        with mock.patch.object(hr_directory, "_request", return_value=(404, None)) as req:
+            self.assertIsNone(hr_directory.lookup_employee_minimal("999"))
+            self.assertIsNone(hr_directory.lookup_employee_minimal("999"))
+        self.assertEqual(req.call_count, 1)
+
+    def test_negative_entry_expires(self):
+        with mock.patch.object(hr_directory, "_request", return_value=(404, None)) as req, \
+                mock.patch.object(hr_directory, "HR_LOOKUP_NEGATIVE_TTL", 0):
+            hr_directory.lookup_employee_minimal("999")
+            hr_directory.lookup_employee_minimal("999")
+        self.assertEqual(req.call_count, 2)
+
+    def test_transport_failure_is_not_cached(self):
+        with mock.patch.object(hr_directory, "_request", return_value=(None, None)) as req:
+            self.assertIsNone(hr_directory.lookup_employee_minimal("137"))
+            self.assertIsNone(hr_directory.lookup_employee_minimal("137"))
+        self.assertEqual(req.call_count, 2)
+
+    def test_reload_clears_lookup_cache(self):
+        rec = {"employee_id": "1PWR137"}
+        with mock.patch.object(hr_directory, "_request", return_value=(200, rec)) as req:
+            hr_directory.lookup_employee_minimal("137")
+            hr_directory.reload()
+            hr_directory.lookup_employee_minimal("137")
+        self.assertEqual(req.call_count, 2)
+
+
+class TestLookupEmployeesBulk(unittest.TestCase):
+    def setUp(self):
+        hr_directory.clear_lookup_cache()
+
+    def test_dedupes_and_drops_unknown(self):
+        def fake(path, params=None, timeout=None):
+            eid = path.rsplit("/", 1)[-1]
+            if eid == "404":
+                return 404, None
+            return 200, {"employee_id": eid}
+
+        with mock.patch.object(hr_directory, "_request", side_effect=fake) as req:
+            out = hr_directory.lookup_employees_minimal(["1", "2", "1", "404", "", " 2 "])
+        self.assertEqual(set(out), {"1", "2"})
+        self.assertEqual(out["2"], {"employee_id": "2"})
+        self.assertEqual(req.call_count, 3)
+
+    def test_empty(self):
+        self.assertEqual(hr_directory.lookup_employees_minimal([]), {})
+
+
+class TestDirectoryLoad(unittest.TestCase):
+    def setUp(self):
+        hr_directory._invalidate()
+
+    def tearDown(self):
+        hr_directory._invalidate()
+
+    def test_concurrent_loads_share_one_fetch(self):
+        payload = {"employees": [{"employee_id": "1PWR1", "email": "A@x"}]}
+
+        def slow_get(path, params=None, timeout=None):
+            time.sleep(0.05)
+            return payload
+
+        with mock.patch.object(hr_directory, "_get", side_effect=slow_get) as get:
+            threads = [threading.Thread(target=hr_directory._load_directory) for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(hr_directory._dir_by_email["a@x"]["employee_id"], "1PWR1")
+
+    def test_prefetch_is_noop_when_fresh(self):
+        payload = {"employees": [{"employee_id": "1PWR1"}]}
+        with mock.patch.object(hr_directory, "_get", return_value=payload):
+            fut = hr_directory.prefetch_directory()
+            self.assertIsNotNone(fut)
+            fut.result(timeout=5)
+            self.assertIsNone(hr_directory.prefetch_directory())
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        hr_directory._record_success()
+        hr_directory.clear_lookup_cache()
+        self._sess = mock.patch.object(hr_directory, "_session")
+        self.sess = self._sess.start()
+        self.sess.get.side_effect = hr_directory.requests.ConnectTimeout("down")
+
+    def tearDown(self):
+        self._sess.stop()
+        hr_directory._record_success()
+        hr_directory.clear_lookup_cache()
+
+    def test_opens_after_threshold_and_fails_fast(self):
+        for _ in range(hr_directory.HR_BREAKER_FAILURES + 2):
+            self.assertEqual(hr_directory._request("/x"), (None, None))
+        self.assertEqual(self.sess.get.call_count, hr_directory.HR_BREAKER_FAILURES)
+        self.assertTrue(hr_directory._breaker_open())
+
+    def test_failed_probe_reopens_and_success_closes(self):
+        for _ in range(hr_directory.HR_BREAKER_FAILURES):
+            hr_directory._request("/x")
+        hr_directory._hr_breaker["open_until"] = 0.0  # open period elapsed
+        hr_directory._request("/x")
+        self.assertTrue(hr_directory._breaker_open())
+
+        hr_directory._hr_breaker["open_until"] = 0.0
+        ok = mock.Mock(status_code=200)
+        ok.json.return_value = {"a": 1}
+        self.sess.get.side_effect = None
+        self.sess.get.return_value = ok
+        self.assertEqual(hr_directory._request("/x"), (200, {"a": 1}))
+        self.assertFalse(hr_directory._hr_breaker["tripped"])
+
+    def test_lookup_serves_expired_record_while_hr_down(self):
+        rec = {"employee_id": "1PWR137", "name": "A"}
+        hr_directory._lookup_cache["137"] = (0.0, rec)  # long expired
+        self.assertEqual(hr_directory.lookup_employee_minimal("137"), rec)
+
+
+if __name__ == "__main__":
+    unittest.main()
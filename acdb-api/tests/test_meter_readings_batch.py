@@ -0,0 +1,91 @@
+"""Unit tests for the batch prototype-meter reading endpoint."""
+
+from __future__ import annotations
+
+import os
+import sys
+import unittest
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+os.environ.setdefault("CC_JWT_SECRET", "unit-test-secret")
+
+from fastapi import HTTPException  # noqa: E402
+
+import customer_api  # noqa: E402,F401  (production import order, see test_zambia_country_lane)
+import ingest  # noqa: E402
+
+
+def _reading(meter_id: str, ts: str = "202601011200") -> ingest.MeterReading:
+    return ingest.MeterReading(meter_id=meter_id, timestamp=ts, energy_active=1.0)
+
+
+class MeterReadingBatchTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = MagicMock()
+        self.cur = self.conn.cursor.return_value
+
+        @contextmanager
+        def fake_conn():
+            yield self.conn
+
+        self._patches = [patch.object(ingest, "get_connection", fake_conn)]
+        for p in self._patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self._patches:
+            p.stop()
+
+    def _statements(self):
+        return [c.args[0] for c in self.cur.execute.call_args_list]
+
+    def test_bad_reading_rolls_back_to_savepoint_and_batch_commits_once(self):
+        def fake_ingest(conn, reading, relay_hook=True):
+            self.assertFalse(relay_hook)
+            if reading.meter_id == "bad":
+                raise HTTPException(status_code=404, detail="Unknown prototype meter: bad")
+            return {"status": "ok", "meter_id": reading.meter_id, "account": "0045MAK", "delta_kwh": 0.5}
+
+        batch = ingest.MeterReadingBatch(readings=[_reading("m1"), _reading("bad"), _reading("m2")])
+        invalidated = []
+        self.conn.commit.side_effect = lambda: self.assertEqual(invalidated, [])
+        with patch.object(ingest, "_ingest_reading", side_effect=fake_ingest), \
+                patch.object(ingest, "invalidate_balance_cache", side_effect=invalidated.append), \
+                patch("relay_control.maybe_auto_open_relay") as hook:
+            out = ingest.ingest_meter_readings(batch, x_iot_key=ingest.IOT_KEY)
+
+        self.assertEqual((out["accepted"], out["rejected"]), (2, 1))
+        self.assertEqual(out["results"][1]["error"], 404)
+        self.assertEqual(
+            self._statements(),
+            [
+                "SAVEPOINT meter_reading", "RELEASE SAVEPOINT meter_reading",
+                "SAVEPOINT meter_reading", "ROLLBACK TO SAVEPOINT meter_reading",
+                "SAVEPOINT meter_reading", "RELEASE SAVEPOINT meter_reading",
+            ],
+        )
+        self.conn.commit.assert_called_once()
+        # Relay hook once per consuming account, not once per reading.
+        hook.assert_called_once_with(self.conn, "0045MAK", reason="zero_balance_after_consumption")
+        # Cached balance dropped once per consuming account, after the commit.
+        self.assertEqual(invalidated, ["0045MAK"])
+
+    def test_rejects_wrong_key(self):
+        batch = ingest.MeterReadingBatch(readings=[_reading("m1")])
+        with self.assertRaises(HTTPException) as ctx:
+            ingest.ingest_meter_readings(batch, x_iot_key="nope")
+        self.assertEqual(ctx.exception.status_code, 403)
+
+    def test_rejects_oversized_batch(self):
+        batch = ingest.MeterReadingBatch(
+            readings=[_reading("m1")] * (ingest.MAX_READINGS_PER_BATCH + 1))
+        with self.assertRaises(HTTPException) as ctx:
+            ingest.ingest_meter_readings(batch, x_iot_key=ingest.IOT_KEY)
+        self.assertEqual(ctx.exception.status_code, 413)
+
+
+if __name__ == "__main__":
+    unittest.main()
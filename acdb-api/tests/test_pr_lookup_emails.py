@@ -0,0 +1,58 @@
+"""Unit tests for the employee_id → email SQLite mapping in pr_lookup."""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import pr_lookup  # noqa: E402
+
+
+class EmployeeEmailStoreTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._path = patch.object(pr_lookup, "_SQLITE_PATH", os.path.join(self._tmp.name, "auth.db"))
+        self._path.start()
+        pr_lookup._drop_email_db()
+
+    def tearDown(self):
+        pr_lookup._drop_email_db()
+        self._path.stop()
+        self._tmp.cleanup()
+
+    def test_round_trip_and_listing(self):
+        pr_lookup.set_employee_email("87", " Someone@1PWRafrica.com ")
+        self.assertEqual(pr_lookup.set_employee_emails_bulk([("156", "b@x.com"), ("87", "a@x.com")]), 2)
+        self.assertEqual(pr_lookup.get_employee_email("87"), "a@x.com")
+        self.assertEqual(
+            pr_lookup.list_employee_emails(),
+            [{"employee_id": "156", "email": "b@x.com"}, {"employee_id": "87", "email": "a@x.com"}],
+        )
+
+    def test_connection_reused_per_thread_and_in_wal_mode(self):
+        conn = pr_lookup._email_db()
+        pr_lookup.get_employee_email("87")
+        self.assertIs(pr_lookup._email_db(), conn)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+        other = []
+
+        def worker():
+            other.append(pr_lookup._email_db())
+            pr_lookup._drop_email_db()
+
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+        self.assertIsNot(other[0], conn)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""Unit tests for gateway pacing / retries in ``sms_outbound``."""
+
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+os.environ.setdefault("CC_JWT_SECRET", "unit-test-secret")
+
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+import sms_outbound
+
+
+def refused() -> requests.exceptions.ConnectionError:
+    cause = NewConnectionError(None, "Connection refused")
+    return requests.exceptions.ConnectionError(MaxRetryError(None, "http://gw/", cause))
+
+
+def response(status: int) -> MagicMock:
+    resp = MagicMock()
+    resp.status_code = status
+    resp.text = ""
+    return resp
+
+
+class TestGatewayGet(unittest.TestCase):
+    def setUp(self):
+        sms_outbound._next_send_at = 0.0
+        sleep = patch.object(sms_outbound.time, "sleep")
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def test_throttled_request_is_retried(self):
+        with patch.object(sms_outbound.requests, "get", side_effect=[response(429), response(200)]) as get:
+            resp = sms_outbound._gateway_get("http://gw/generate_and_send.php")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(get.call_count, 2)
+
+    def test_refused_connection_gives_up_after_retries(self):
+        with (
+            patch.object(sms_outbound, "SMS_GATEWAY_RETRIES", 2),
+            patch.object(sms_outbound.requests, "get", side_effect=[refused() for _ in range(3)]) as get,
+        ):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                sms_outbound._gateway_get("http://gw/generate_and_send.php")
+        self.assertEqual(get.call_count, 3)
+
+    def test_connect_timeout_is_retried(self):
+        side_effect = [requests.exceptions.ConnectTimeout(), response(200)]
+        with patch.object(sms_outbound.requests, "get", side_effect=side_effect) as get:
+            self.assertEqual(sms_outbound._gateway_get("http://gw/x").status_code, 200)
+        self.assertEqual(get.call_count, 2)
+
+    def test_aborted_connection_is_not_retried(self):
+        # Dropped after the request went out: the SMS may already be sent.
+        aborted = requests.exceptions.ConnectionError(
+            ProtocolError("Connection aborted.", ConnectionResetError()))
+        with patch.object(sms_outbound.requests, "get", side_effect=aborted) as get:
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                sms_outbound._gateway_get("http://gw/generate_and_send.php")
+        self.assertEqual(get.call_count, 1)
+
+    def test_read_timeout_and_server_errors_are_not_retried(self):
+        with patch.object(sms_outbound.requests, "get", side_effect=requests.exceptions.ReadTimeout()) as get:
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                sms_outbound._gateway_get("http://gw/generate_and_send.php")
+        self.assertEqual(get.call_count, 1)
+        with patch.object(sms_outbound.requests, "get", return_value=response(500)) as get:
+            self.assertEqual(sms_outbound._gateway_get("http://gw/x").status_code, 500)
+        self.assertEqual(get.call_count, 1)
+
+    def test_sends_are_spaced_to_the_configured_rate(self):
+        with (
+            patch.object(sms_outbound, "SMS_GATEWAY_MAX_PER_S", 2.0),
+            patch.object(sms_outbound.time, "monotonic", return_value=100.0),
+        ):
+            sms_outbound._wait_for_send_slot()
+            sms_outbound._wait_for_send_slot()
+            sms_outbound._wait_for_send_slot()
+        self.assertEqual([c.args[0] for c in self.sleep.call_args_list], [0.5, 1.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,6 +7,10 @@ effectively performing what Access's Compact and Repair does internally.
 Usage:
     python compact_accdb.py [source.accdb]
 
+Tables are migrated in parallel, each worker on its own pair of ODBC
+connections; COMPACT_WORKERS sets the worker count (default 4, 1 for the
+old one-table-at-a-time run).
+
 The clean file is created alongside the source with a _clean suffix.
 After verifying, rename manually to replace the original.
 """
@@ -15,6 +19,7 @@ import os
 import sys
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import pyodbc
 
@@ -28,6 +33,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 DRIVER = "{Microsoft Access Driver (*.mdb, *.accdb)}"
+WORKERS = max(1, int(os.environ.get("COMPACT_WORKERS", "4")))
 
 # Access ODBC type_name → DDL type
 DDL_TYPE_MAP = {
@@ -127,9 +133,10 @@ def copy_table_data(src_conn, dst_conn, table_name, col_meta, batch_size=2000):
         rows = src_cur.fetchmany(batch_size)
         if not rows:
             break
-        for row in rows:
-            dst_cur.execute(insert_sql, tuple(row))
-            inserted += 1
+        # One prepared INSERT per batch. fast_executemany stays off: the
+        # Access ODBC driver doesn't support parameter arrays.
+        dst_cur.executemany(insert_sql, [tuple(row) for row in rows])
+        inserted += len(rows)
         if inserted % 50000 == 0 and inserted > 0:
             logger.info("  %s: %d rows...", table_name, inserted)
 
@@ -138,6 +145,52 @@ def copy_table_data(src_conn, dst_conn, table_name, col_meta, batch_size=2000):
     return inserted
 
 
+def _connect(path):
+    return pyodbc.connect(f"DRIVER={DRIVER};DBQ={path}", autocommit=True)
+
+
+def _migrate_table(src_path, dst_path, tbl):
+    """Create and fill one table on its own connections.
+
+    Returns ``(rows copied, None)`` or ``(0, "stage: error")``.
+    """
+    src_conn = _connect(src_path)
+    try:
+        dst_conn = _connect(dst_path)
+    except Exception:
+        src_conn.close()
+        raise
+    try:
+        # Build DDL
+        try:
+            src_cur = src_conn.cursor()
+            ddl, col_meta = build_create_ddl(src_cur, tbl)
+            src_cur.close()
+        except Exception as e:
+            logger.error("  %s: schema read failed: %s", tbl, e)
+            return 0, f"schema: {e}"
+
+        # Create table in destination
+        try:
+            dst_cur = dst_conn.cursor()
+            dst_cur.execute(ddl)
+            dst_cur.close()
+        except Exception as e:
+            logger.error("  %s: CREATE TABLE failed: %s", tbl, e)
+            logger.error("  DDL: %s", ddl)
+            return 0, f"create: {e}"
+
+        # Copy data
+        try:
+            return copy_table_data(src_conn, dst_conn, tbl, col_meta), None
+        except Exception as e:
+            logger.error("  %s: data copy failed: %s", tbl, e)
+            return 0, f"data: {e}"
+    finally:
+        src_conn.close()
+        dst_conn.close()
+
+
 def main():
     # Paths
     src_path = (
@@ -173,63 +226,43 @@ def main():
         )
         sys.exit(1)
 
-    # Open connections
-    src_conn = pyodbc.connect(
-        f"DRIVER={DRIVER};DBQ={src_path}", autocommit=True
-    )
-    dst_conn = pyodbc.connect(
-        f"DRIVER={DRIVER};DBQ={dst_path}", autocommit=True
-    )
-
-    src_cur = src_conn.cursor()
-
     # Enumerate tables
-    tables = get_user_tables(src_cur)
-    logger.info("Found %d user tables to migrate", len(tables))
+    src_conn = _connect(src_path)
+    tables = get_user_tables(src_conn.cursor())
+    src_conn.close()
+    logger.info(
+        "Found %d user tables to migrate (%d workers)", len(tables), WORKERS
+    )
 
     t0 = time.time()
     total_rows = 0
     succeeded = 0
     failed = []
 
-    for i, tbl in enumerate(tables, 1):
-        logger.info("[%d/%d] %s", i, len(tables), tbl)
-
-        # Build DDL
-        try:
-            ddl, col_meta = build_create_ddl(src_cur, tbl)
-        except Exception as e:
-            logger.error("  Schema read failed: %s", e)
-            failed.append((tbl, f"schema: {e}"))
-            continue
-
-        # Create table in destination
-        try:
-            dst_cur = dst_conn.cursor()
-            dst_cur.execute(ddl)
-            dst_cur.close()
-        except Exception as e:
-            logger.error("  CREATE TABLE failed: %s", e)
-            logger.error("  DDL: %s", ddl)
-            failed.append((tbl, f"create: {e}"))
-            continue
-
-        # Copy data
-        try:
-            n = copy_table_data(src_conn, dst_conn, tbl, col_meta)
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        futures = {
+            pool.submit(_migrate_table, src_path, dst_path, tbl): tbl
+            for tbl in tables
+        }
+        for done, fut in enumerate(as_completed(futures), 1):
+            tbl = futures[fut]
+            try:
+                n, error = fut.result()
+            except Exception as e:  # connect failed
+                n, error = 0, f"connect: {e}"
+            if error:
+                failed.append((tbl, error))
+                logger.info("[%d/%d] %s: FAILED", done, len(tables), tbl)
+                continue
             total_rows += n
             succeeded += 1
             if n > 0:
-                logger.info("  Copied %d rows", n)
+                logger.info("[%d/%d] %s: copied %d rows", done, len(tables), tbl, n)
             else:
-                logger.info("  Empty table (schema only)")
-        except Exception as e:
-            logger.error("  Data copy failed: %s", e)
-            failed.append((tbl, f"data: {e}"))
+                logger.info("[%d/%d] %s: empty table (schema only)", done, len(tables), tbl)
 
     elapsed = time.time() - t0
-    src_conn.close()
-    dst_conn.close()
+    failed.sort()
 
     # Summary
     logger.info("=" * 60)
@@ -48,7 +48,7 @@ for path in (ACDB_API, OPS):
     if str(path) not in sys.path:
         sys.path.insert(0, str(path))
 
-from balance_engine import get_balance_kwh  # noqa: E402
+from balance_engine import get_balances_kwh  # noqa: E402
 from country_config import get_tariff_rate_for_site  # noqa: E402
 from cutover_ls_common import is_bulk_excluded_account  # noqa: E402
 from sparkmeter_customer import THUNDERCLOUD_SITES  # noqa: E402
@@ -192,12 +192,7 @@ def compute_1pdb_balances(conn) -> dict[str, float]:
     cur.execute("SELECT DISTINCT account_number FROM accounts ORDER BY account_number")
     accounts = [row[0] for row in cur.fetchall()]
     cur.close()
-
-    balances: dict[str, float] = {}
-    for account in accounts:
-        balance, _ = get_balance_kwh(conn, account)
-        balances[account] = round(float(balance), 4)
-    return balances
+    return get_balances_kwh(conn, accounts)
 
 
 def run_audit(conn) -> list[tuple[str, float, float, float, str, bool]]:
@@ -207,10 +202,8 @@ def run_audit(conn) -> list[tuple[str, float, float, float, str, bool]]:
 
     log.info("Computing 1PDB balances...")
     pdb_balances = compute_1pdb_balances(conn)
-    for account in sm_balances:
-        if account not in pdb_balances:
-            balance, _ = get_balance_kwh(conn, account)
-            pdb_balances[account] = round(float(balance), 4)
+    pdb_balances.update(
+        get_balances_kwh(conn, [a for a in sm_balances if a not in pdb_balances]))
     log.info("  %d 1PDB accounts", len(pdb_balances))
 
     all_accounts = sorted(set(sm_balances) | set(pdb_balances))
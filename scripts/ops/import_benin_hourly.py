@@ -150,20 +150,18 @@ def import_day(conn, date_str: str, dry_run: bool = False) -> int:
         return len(batch)
 
     cur = conn.cursor()
-    CHUNK = 2000
-    for i in range(0, len(batch), CHUNK):
-        psycopg2.extras.execute_batch(
-            cur,
-            """
-            INSERT INTO hourly_consumption
-                (account_number, meter_id, reading_hour, kwh, community, source)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON CONFLICT (meter_id, reading_hour)
-                DO UPDATE SET kwh = EXCLUDED.kwh
-            """,
-            batch[i:i + CHUNK],
-            page_size=500,
-        )
+    psycopg2.extras.execute_values(
+        cur,
+        """
+        INSERT INTO hourly_consumption
+            (account_number, meter_id, reading_hour, kwh, community, source)
+        VALUES %s
+        ON CONFLICT (meter_id, reading_hour)
+            DO UPDATE SET kwh = EXCLUDED.kwh
+        """,
+        batch,
+        page_size=2000,
+    )
     conn.commit()
     return len(batch)
 
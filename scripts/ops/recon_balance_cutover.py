@@ -54,7 +54,7 @@ for _root in (Path("/opt/cc-portal/backend"), Path("/opt/cc-portal/backend/scrip
     if _root.exists() and str(_root) not in sys.path:
         sys.path.insert(0, str(_root))
 
-from balance_engine import get_balance_kwh  # noqa: E402
+from balance_engine import get_balances_kwh  # noqa: E402
 from country_config import get_country, get_tariff_rate_for_site  # noqa: E402
 
 try:
@@ -250,6 +250,9 @@ def main() -> int:
         cur.execute("SELECT DISTINCT account_number FROM accounts ORDER BY account_number")
         accounts = [r[0] for r in cur.fetchall()]
         st["accounts"] = len(accounts)
+        # Each anchor only moves its own account, so one batched read up front
+        # matches computing every balance just before its anchor.
+        engine_balances = get_balances_kwh(conn, accounts)
         for acct in accounts:
             if is_bulk_excluded_account(acct):
                 st["skip_excluded"] += 1
@@ -259,7 +262,7 @@ def main() -> int:
                 st["skip_no_sm"] += 1
                 continue
             sm_kwh, rate = info
-            engine, _ = get_balance_kwh(conn, acct)
+            engine = engine_balances.get(acct, 0.0)
             anchor = round(sm_kwh - float(engine), 4)
             rows_dump.append((acct, sm_kwh, round(float(engine), 4), anchor, rate))
             if abs(anchor) <= args.tolerance:
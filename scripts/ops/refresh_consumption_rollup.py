@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Bring consumption_daily_rollup (migration 067) up to yesterday for every account.
+
+The balance engine reads closed days from the rollup when the API runs with
+``CC_BALANCE_DAILY_ROLLUP=1``; days whose hours changed since the last run
+(late SM imports, 1Meter backfills) are rewound by trigger and rebuilt here.
+Safe to re-run: an account whose watermark is already current costs one
+row lock. Driven nightly by ``cc-consumption-rollup.timer``.
+
+Runs per database (LS ``DATABASE_URL``, BN ``DATABASE_URL_BN`` and, where
+the env file sets it, ZM ``DATABASE_URL_ZM``), committing per account so
+hourly imports never wait on more than one account's refresh.
+Each run first tops up hourly_consumption's yearly partitions
+(``ensure_hourly_consumption_partitions()``, migration 070), so the years
+ahead never fall into the DEFAULT partition.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import psycopg2
+
+# Allow `import balance_engine` whether run from the repo or /opt/cc-portal/backend.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "acdb-api"))
+sys.path.insert(0, "/opt/cc-portal/backend")
+
+
+def _parse_env_file(path: str) -> dict[str, str]:
+    out: dict[str, str] = {}
+    text = Path(path).read_text(encoding="utf-8")
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        k, v = line.split("=", 1)
+        k = k.strip()
+        v = v.strip()
+        if (v.startswith('"') and v.endswith('"')) or (v.startswith("'") and v.endswith("'")):
+            v = v[1:-1]
+        out[k] = v
+    return out
+
+
+def refresh_db(db_url: str, label: str, *, account: str | None = None) -> int:
+    from balance_engine import refresh_consumption_rollup
+
+    conn = psycopg2.connect(db_url)
+    try:
+        cur = conn.cursor()
+        partition_failures = 0
+        try:
+            cur.execute("SELECT ensure_hourly_consumption_partitions()")
+            created = cur.fetchone()[0]
+            conn.commit()
+            if created:
+                print(f"[{label}] created {created} hourly_consumption partition(s)")
+        except Exception as e:
+            conn.rollback()
+            partition_failures = 1
+            print(f"[{label}] partition top-up failed: {e}")
+
+        if account:
+            accounts = [account]
+        else:
+            cur.execute("SELECT account_number FROM accounts ORDER BY account_number")
+            accounts = [r[0] for r in cur.fetchall() if r[0]]
+
+        t0 = time.monotonic()
+        days = failures = 0
+        for acct in accounts:
+            try:
+                days += refresh_consumption_rollup(conn, acct)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                failures += 1
+                print(f"[{label}] {acct}: {e}")
+        print(
+            f"[{label}] {len(accounts)} accounts, {days} days rebuilt, "
+            f"{failures} failed in {time.monotonic() - t0:.1f}s"
+        )
+        return failures + partition_failures
+    finally:
+        conn.close()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--env-file", default="/opt/1pdb/.env")
+    ap.add_argument("--country", choices=["LS", "BN", "ZM"], help="Restrict to one country DB.")
+    ap.add_argument("--account", help="Refresh a single account.")
+    args = ap.parse_args()
+
+    vals = _parse_env_file(args.env_file)
+    jobs: list[tuple[str, str]] = []
+    if args.country in (None, "LS") and vals.get("DATABASE_URL"):
+        jobs.append(("LS", vals["DATABASE_URL"]))
+    if args.country in (None, "BN") and vals.get("DATABASE_URL_BN"):
+        jobs.append(("BN", vals["DATABASE_URL_BN"]))
+    if args.country in (None, "ZM") and vals.get("DATABASE_URL_ZM"):
+        jobs.append(("ZM", vals["DATABASE_URL_ZM"]))
+    if not jobs:
+        raise SystemExit("No database URLs found in env file")
+
+    failures = 0
+    for label, db_url in jobs:
+        try:
+            failures += refresh_db(db_url, label, account=args.account)
+        except Exception as e:
+            failures += 1
+            print(f"[{label}] FAILED: {e}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())